@@ -0,0 +1,54 @@
+"""
+Fachada assíncrona para o banco de dados.
+Os backends (SQLite, PostgreSQL, MongoDB) são síncronos; esta classe executa cada
+método em um pool de threads limitado para não travar o event loop do discord.py.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from config import DB_EXECUTOR_MAX_WORKERS
+
+
+class AsyncDatabase:
+    """
+    Expõe os mesmos métodos do Database, mas como corrotinas.
+    Exemplo: `await db.get_gearscore(user_id)` em vez de `db.get_gearscore(user_id)`.
+    """
+
+    def __init__(self, database, max_workers=None):
+        self._db = database
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or DB_EXECUTOR_MAX_WORKERS,
+            thread_name_prefix='db'
+        )
+        self._methods = {}
+
+    @property
+    def sync(self):
+        """Acesso ao Database síncrono (para código que já roda fora do event loop)"""
+        return self._db
+
+    async def run(self, func, *args, **kwargs):
+        """Executa uma função síncrona qualquer no executor do banco"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def __getattr__(self, name):
+        # Só é chamado para atributos que não existem na fachada
+        attr = getattr(self._db, name)
+        if not callable(attr):
+            return attr
+
+        method = self._methods.get(name)
+        if method is None:
+            @functools.wraps(attr)
+            async def method(*args, **kwargs):
+                return await self.run(attr, *args, **kwargs)
+            self._methods[name] = method
+        return method
+
+    def close(self):
+        """Encerra o executor e fecha o banco (se o backend suportar)"""
+        self._executor.shutdown(wait=True)
+        if hasattr(self._db, 'close'):
+            self._db.close()
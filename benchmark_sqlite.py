@@ -0,0 +1,67 @@
+"""
+Benchmark do backend SQLite: compara o modo padrão (uma conexão por chamada, journal DELETE,
+synchronous FULL) com o perfil otimizado (conexão persistente por thread, WAL, synchronous NORMAL,
+mmap, cache de páginas e de comandos preparados).
+
+Uso: python benchmark_sqlite.py [quantidade_de_jogadores]
+Os bancos são criados em um diretório temporário; o bdo_gearscore.db não é tocado.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from config import BDO_CLASSES
+from database import Database
+
+
+def _run(label, db, users):
+    """Mede registro, atualização e consulta para a lista de jogadores"""
+    results = {}
+    classes = list(BDO_CLASSES)
+
+    start = time.perf_counter()
+    for i, user_id in enumerate(users):
+        db.register_gearscore(user_id, f"Familia{i}", random.choice(classes),
+                              random.randint(250, 330), random.randint(250, 330), random.randint(300, 450),
+                              f"https://garmoth.com/character/{i}")
+    results['registro'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for user_id in users:
+        db.update_gearscore(user_id, ap=random.randint(250, 330), dp=random.randint(300, 450))
+    results['atualização'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for user_id in users:
+        db.get_gearscore(user_id)
+    results['consulta'] = time.perf_counter() - start
+
+    print(f"\n{label}")
+    for operacao, duracao in results.items():
+        print(f"  {operacao:<12} {len(users) / duracao:>10.0f} ops/s  ({duracao:.2f}s)")
+    return results
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    users = [str(100000000000000000 + i) for i in range(total)]
+    print(f"🏁 Benchmark SQLite com {total} jogadores")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        random.seed(42)
+        padrao = _run("📦 Modo padrão", Database(os.path.join(tmp, 'padrao.db'), tuned=False), users)
+
+        random.seed(42)
+        db = Database(os.path.join(tmp, 'otimizado.db'), tuned=True)
+        otimizado = _run("⚡ Modo otimizado", db, users)
+        db.close()
+
+    print("\nGanho:")
+    for operacao in padrao:
+        print(f"  {operacao:<12} {padrao[operacao] / otimizado[operacao]:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Cache do censo ativo, compartilhado pelos backends SQL.
+get_censo_ativo é chamado a cada abertura do formulário do censo; com o cache a
+consulta (e o parse do campos_json/exemplos_json) só acontece quando o censo muda
+(criar_censo / finalizar_censo invalidam) ou quando o TTL de segurança expira.
+"""
+import copy
+import threading
+import time
+
+
+class CensoAtivoCache:
+    """Guarda o último resultado de get_censo_ativo (inclusive None = nenhum censo ativo)"""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._censo = None
+        self._expira_em = 0.0
+        self._geracao = 0  # Incrementada a cada invalidação
+
+    def get(self, loader):
+        """
+        Retorna uma cópia do censo em cache ou chama loader() para buscar no banco.
+        Se o cache for invalidado enquanto o loader roda, o resultado não é guardado
+        (evita guardar um censo que acabou de ser finalizado/substituído).
+        """
+        with self._lock:
+            if time.monotonic() < self._expira_em:
+                return copy.deepcopy(self._censo)
+            geracao = self._geracao
+
+        censo = loader()
+
+        with self._lock:
+            if geracao == self._geracao:
+                self._censo = censo
+                self._expira_em = time.monotonic() + self.ttl
+        return copy.deepcopy(censo)
+
+    def invalidate(self):
+        with self._lock:
+            self._geracao += 1
+            self._censo = None
+            self._expira_em = 0.0
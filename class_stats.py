@@ -0,0 +1,168 @@
+"""
+Estatísticas por classe mantidas em memória.
+Carregadas uma vez a partir do banco e atualizadas a cada registro/atualização/exclusão
+e a cada mudança de cargo, então /estatisticas_classes e o perfil não precisam rodar o
+GROUP BY com a lista de todos os membros da guilda.
+"""
+from bisect import bisect_left, insort
+
+from records import ClassStatistics
+
+
+class _ClassAggregate:
+    """Contagem, somas e GS ordenados (para mínimo/máximo) de uma classe"""
+
+    __slots__ = ('total', 'sum_gs', 'sum_ap', 'sum_aap', 'sum_dp', 'gs_values')
+
+    def __init__(self):
+        self.total = 0
+        self.sum_gs = 0
+        self.sum_ap = 0
+        self.sum_aap = 0
+        self.sum_dp = 0
+        self.gs_values = []
+
+    def add(self, entry):
+        ap, aap, dp, gs = entry
+        self.total += 1
+        self.sum_gs += gs
+        self.sum_ap += ap
+        self.sum_aap += aap
+        self.sum_dp += dp
+        insort(self.gs_values, gs)
+
+    def remove(self, entry):
+        ap, aap, dp, gs = entry
+        self.total -= 1
+        self.sum_gs -= gs
+        self.sum_ap -= ap
+        self.sum_aap -= aap
+        self.sum_dp -= dp
+        idx = bisect_left(self.gs_values, gs)
+        if idx < len(self.gs_values) and self.gs_values[idx] == gs:
+            del self.gs_values[idx]
+
+    def to_statistics(self, class_pvp):
+        return ClassStatistics(
+            class_pvp, self.total,
+            self.sum_gs / self.total, self.sum_ap / self.total,
+            self.sum_aap / self.total, self.sum_dp / self.total,
+            self.gs_values[0], self.gs_values[-1]
+        )
+
+
+class ClassStatisticsIndex:
+    """
+    Mantém os registros de cada usuário ({class_pvp: (ap, aap, dp, gs)}) e, por servidor,
+    os agregados por classe apenas dos usuários que têm o cargo da guilda.
+    Mesmo formato de carga/atualização do GearscoreRanking.
+    """
+
+    def __init__(self):
+        self._entries = {}  # {user_id: {class_pvp: (ap, aap, dp, gs)}} - todos os registros do banco
+        self._boards = {}   # {guild_id: {'members': set(user_id), 'classes': {class_pvp: _ClassAggregate}}}
+        self.loaded = False
+
+    # ==================== CARGA ====================
+
+    def load(self, records):
+        """Carrega todos os registros (GearscoreRecord)"""
+        entries = {}
+        for record in records:
+            if not record.user_id:
+                continue
+            entries.setdefault(record.user_id, {})[record.class_pvp] = (record.ap, record.aap, record.dp, record.gs)
+
+        self._entries = entries
+        for board in self._boards.values():
+            self._rebuild_board(board)
+        self.loaded = True
+
+    def set_members(self, guild_id, member_ids):
+        """Define os membros elegíveis de um servidor (normalmente vindos do índice de membros)"""
+        board = {'members': set(member_ids), 'classes': {}}
+        self._rebuild_board(board)
+        self._boards[guild_id] = board
+
+    def _rebuild_board(self, board):
+        board['classes'] = {}
+        for user_id in board['members']:
+            self._add_user(board, self._entries.get(user_id))
+
+    # ==================== ATUALIZAÇÕES ====================
+
+    @staticmethod
+    def _add_user(board, user_entries):
+        if not user_entries:
+            return
+        classes = board['classes']
+        for class_pvp, entry in user_entries.items():
+            aggregate = classes.get(class_pvp)
+            if aggregate is None:
+                aggregate = classes[class_pvp] = _ClassAggregate()
+            aggregate.add(entry)
+
+    @staticmethod
+    def _remove_user(board, user_entries):
+        if not user_entries:
+            return
+        classes = board['classes']
+        for class_pvp, entry in user_entries.items():
+            aggregate = classes.get(class_pvp)
+            if aggregate is None:
+                continue
+            aggregate.remove(entry)
+            if aggregate.total <= 0:
+                del classes[class_pvp]
+
+    def set_user(self, user_id, records):
+        """Substitui os registros de um usuário (após registro/atualização); lista vazia remove"""
+        user_id = str(user_id)
+        new_entries = {record.class_pvp: (record.ap, record.aap, record.dp, record.gs) for record in records}
+        old_entries = self._entries.get(user_id)
+        if old_entries == new_entries:
+            return
+
+        if new_entries:
+            self._entries[user_id] = new_entries
+        else:
+            self._entries.pop(user_id, None)
+
+        for board in self._boards.values():
+            if user_id in board['members']:
+                self._remove_user(board, old_entries)
+                self._add_user(board, new_entries)
+
+    def remove(self, user_id):
+        """Remove os registros do usuário (registro excluído)"""
+        self.set_user(user_id, [])
+
+    def set_member(self, guild_id, user_id, is_member):
+        """Inclui/exclui um usuário dos agregados do servidor (ganhou/perdeu o cargo da guilda)"""
+        board = self._boards.get(guild_id)
+        if board is None:
+            return
+        user_id = str(user_id)
+        if is_member and user_id not in board['members']:
+            board['members'].add(user_id)
+            self._add_user(board, self._entries.get(user_id))
+        elif not is_member and user_id in board['members']:
+            board['members'].discard(user_id)
+            self._remove_user(board, self._entries.get(user_id))
+
+    def forget_guild(self, guild_id):
+        self._boards.pop(guild_id, None)
+
+    # ==================== CONSULTAS ====================
+
+    def has_guild(self, guild_id):
+        return guild_id in self._boards
+
+    def statistics(self, guild_id):
+        """Lista de ClassStatistics do servidor, na mesma ordem do banco (total e GS médio decrescentes)"""
+        board = self._boards.get(guild_id)
+        if not board:
+            return []
+        stats = [aggregate.to_statistics(class_pvp) for class_pvp, aggregate in board['classes'].items()]
+        stats.sort(key=lambda stat: (-stat.total, -stat.avg_gs))
+        return stats
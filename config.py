@@ -10,9 +10,42 @@ DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 # Para SQLite (local):
 DATABASE_NAME = 'bdo_gearscore.db'
 
+# Perfil de desempenho do SQLite
+# SQLITE_TUNED: conexão persistente por thread + PRAGMAs abaixo (false = uma conexão padrão por chamada)
+# SQLITE_SYNCHRONOUS: NORMAL é seguro com WAL (só as últimas transações podem se perder numa queda de energia)
+# SQLITE_MMAP_SIZE: bytes do arquivo lidos via memory-mapped I/O
+# SQLITE_CACHE_SIZE_KB: tamanho do cache de páginas por conexão, em KB
+# SQLITE_STATEMENT_CACHE: quantidade de comandos preparados reaproveitados por conexão
+SQLITE_TUNED = os.getenv('SQLITE_TUNED', 'true').lower() == 'true'
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', str(64 * 1024)))
+SQLITE_STATEMENT_CACHE = int(os.getenv('SQLITE_STATEMENT_CACHE', '256'))
+
 # Para PostgreSQL (Supabase, Railway, Neon, etc.):
 DATABASE_URL = os.getenv('DATABASE_URL')
 
+# Pool de conexões do PostgreSQL
+# POSTGRES_POOL_MIN_SIZE: conexões mantidas abertas mesmo ociosas
+# POSTGRES_POOL_MAX_SIZE: limite de conexões simultâneas (o resto espera na fila)
+# POSTGRES_POOL_TIMEOUT: segundos esperando uma conexão livre antes de falhar
+# POSTGRES_POOL_MAX_IDLE: segundos que uma conexão extra pode ficar ociosa antes de ser fechada
+# POSTGRES_POOL_HEALTHCHECK_INTERVAL: segundos ociosa após os quais a conexão é testada (SELECT 1) antes do uso
+POSTGRES_POOL_MIN_SIZE = int(os.getenv('POSTGRES_POOL_MIN_SIZE', '1'))
+POSTGRES_POOL_MAX_SIZE = int(os.getenv('POSTGRES_POOL_MAX_SIZE', '10'))
+POSTGRES_POOL_TIMEOUT = float(os.getenv('POSTGRES_POOL_TIMEOUT', '30'))
+POSTGRES_POOL_MAX_IDLE = float(os.getenv('POSTGRES_POOL_MAX_IDLE', '300'))
+POSTGRES_POOL_HEALTHCHECK_INTERVAL = float(os.getenv('POSTGRES_POOL_HEALTHCHECK_INTERVAL', '60'))
+# POSTGRES_POOL_STATS_INTERVAL: minutos entre os logs de uso do pool (espera, saturação, timeouts); 0 desativa
+POSTGRES_POOL_STATS_INTERVAL = float(os.getenv('POSTGRES_POOL_STATS_INTERVAL', '15'))
+
+# Número máximo de threads executando consultas ao banco em paralelo (fachada assíncrona)
+# Mantenha menor ou igual a POSTGRES_POOL_MAX_SIZE para não enfileirar threads no pool
+DB_EXECUTOR_MAX_WORKERS = int(os.getenv('DB_EXECUTOR_MAX_WORKERS', '5'))
+
+# Segundos que o censo ativo fica em cache (criar/finalizar censo já invalidam; o TTL é só uma rede de segurança)
+CENSO_CACHE_TTL = float(os.getenv('CENSO_CACHE_TTL', '300'))
+
 # Para MongoDB Atlas:
 MONGODB_URI = os.getenv('MONGODB_URI')
 MONGODB_DB_NAME = os.getenv('MONGODB_DB_NAME', 'bdo_gearscore')
@@ -66,15 +99,43 @@ CENSO_COMPLETO_ROLE_ID = int(CENSO_COMPLETO_ROLE_ID) if CENSO_COMPLETO_ROLE_ID e
 SEM_CENSO_ROLE_ID = os.getenv('SEM_CENSO_ROLE_ID')
 SEM_CENSO_ROLE_ID = int(SEM_CENSO_ROLE_ID) if SEM_CENSO_ROLE_ID else None
 
+# Envio de DMs em massa: quantas DMs podem estar em envio ao mesmo tempo
+DM_DISPATCH_CONCURRENCY = int(os.getenv('DM_DISPATCH_CONCURRENCY', '5'))
+
+# /mover_sala: quantas movimentações de voz podem ocorrer ao mesmo tempo
+VOICE_MOVE_CONCURRENCY = int(os.getenv('VOICE_MOVE_CONCURRENCY', '10'))
+
+# Sincronização de cargos de registro: quantas edições de membro podem ocorrer ao mesmo tempo
+ROLE_SYNC_CONCURRENCY = int(os.getenv('ROLE_SYNC_CONCURRENCY', '5'))
+
+# Limpeza mensal de eventos: eventos antigos removidos por transação (depois de consolidados no resumo mensal)
+EVENTOS_CLEANUP_BATCH_SIZE = int(os.getenv('EVENTOS_CLEANUP_BATCH_SIZE', '500'))
+
+# /stats: players por página do ranking paginado (máximo 25, limite de campos de um embed)
+STATS_PAGE_SIZE = min(25, int(os.getenv('STATS_PAGE_SIZE', '10')))
+
 # Configurações de lembrete automático de atualização de GS
 GS_UPDATE_REMINDER_DAYS = 10  # Dias sem atualizar para enviar lembrete
 GS_REMINDER_CHECK_HOUR = 12  # Hora do dia para verificar (12 = meio-dia)
 
+# Compactação do histórico de GS (opcional, roda uma vez por dia)
+# Entradas com mais de HISTORY_WEEKLY_AFTER_DAYS dias ficam reduzidas à última de cada semana
+# e com mais de HISTORY_MONTHLY_AFTER_DAYS dias à última de cada mês (o resumo de progressão não muda)
+HISTORY_COMPACTION_ENABLED = os.getenv('HISTORY_COMPACTION_ENABLED', 'false').lower() == 'true'
+HISTORY_WEEKLY_AFTER_DAYS = int(os.getenv('HISTORY_WEEKLY_AFTER_DAYS', '90'))
+HISTORY_MONTHLY_AFTER_DAYS = int(os.getenv('HISTORY_MONTHLY_AFTER_DAYS', '365'))
+
+# /admin_progresso_guilda: dias sem mudança de GS para um player ser considerado estagnado
+PROGRESSION_STAGNANT_DAYS = int(os.getenv('PROGRESSION_STAGNANT_DAYS', '30'))
+
 # Configurações do Google Sheets para Censo (opcional)
 GOOGLE_SHEETS_ENABLED = os.getenv('GOOGLE_SHEETS_ENABLED', 'false').lower() == 'true'
 GOOGLE_SHEETS_SPREADSHEET_ID = os.getenv('GOOGLE_SHEETS_SPREADSHEET_ID')
 GOOGLE_SHEETS_WORKSHEET_NAME = os.getenv('GOOGLE_SHEETS_WORKSHEET_NAME', 'Censo')
 GOOGLE_SHEETS_CREDENTIALS_PATH = os.getenv('GOOGLE_SHEETS_CREDENTIALS_PATH', 'credentials.json')
+# Respostas do censo são gravadas em lote: a cada X segundos ou quando a fila atingir N linhas
+GOOGLE_SHEETS_FLUSH_INTERVAL = float(os.getenv('GOOGLE_SHEETS_FLUSH_INTERVAL', '5'))
+GOOGLE_SHEETS_BATCH_SIZE = int(os.getenv('GOOGLE_SHEETS_BATCH_SIZE', '50'))
 
 
 # Lista de classes do Black Desert Online (ordem alfabética)
@@ -1,22 +1,64 @@
 import sqlite3
 import os
-from config import DATABASE_NAME
+import threading
+from datetime import datetime, timedelta
+from config import (
+    DATABASE_NAME,
+    CENSO_CACHE_TTL,
+    EVENTOS_CLEANUP_BATCH_SIZE,
+    SQLITE_TUNED,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_MMAP_SIZE,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_STATEMENT_CACHE,
+)
+from censo_cache import CensoAtivoCache
+from migrations import run_sql_migrations
+from records import GearscoreRecord, ClassStatistics, ProgressionStats, ParticipationRow
+from timestamps import parse_timestamp, to_utc_naive, utcnow
 
-class Database:
-    def __init__(self):
-        self.db_path = DATABASE_NAME
-        self.init_database()
-    
-    def get_connection(self):
-        """Retorna uma conexão com o banco de dados"""
-        return sqlite3.connect(self.db_path)
-    
-    def init_database(self):
-        """Inicializa o banco de dados criando a tabela se não existir"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+# Colunas declaradas como TIMESTAMP voltam como datetime com timezone (UTC);
+# datetimes gravados como parâmetro são convertidos para UTC sem offset, no mesmo formato do CURRENT_TIMESTAMP
+sqlite3.register_converter('TIMESTAMP', parse_timestamp)
+sqlite3.register_adapter(datetime, lambda value: to_utc_naive(value).isoformat(' '))
+
+
+# Função helper para adicionar coluna apenas se ainda não existir (SQLite não tem ADD COLUMN IF NOT EXISTS)
+def _add_column_if_missing(table, column, definition):
+    def step(cursor):
+        # table_xinfo também lista colunas geradas (table_info as esconde)
+        cursor.execute(f'PRAGMA table_xinfo({table})')
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    return step
+
+
+# Função helper para gravar uma entrada de histórico e atualizar o resumo do personagem na mesma transação
+def _record_history(cursor, user_id, class_pvp, ap, aap, dp):
+    total_gs = max(ap, aap) + dp
+    cursor.execute('''
+        INSERT INTO gearscore_history 
+        (user_id, class_pvp, ap, aap, dp, total_gs, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ''', (user_id, class_pvp, ap, aap, dp, total_gs))
+    cursor.execute('''
+        INSERT INTO gearscore_history_summary 
+        (user_id, class_pvp, first_gs, current_gs, peak_gs, updates, first_update, last_update)
+        VALUES (?, ?, ?, ?, ?, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id, class_pvp) DO UPDATE SET 
+            current_gs = excluded.current_gs,
+            peak_gs = MAX(peak_gs, excluded.peak_gs),
+            updates = updates + 1,
+            last_update = excluded.last_update
+    ''', (user_id, class_pvp, total_gs, total_gs, total_gs))
+    return total_gs
+
+
+# Migrações de schema em ordem (ver migrations.py). Nunca altere uma migração já publicada;
+# adicione uma nova versão no final.
+MIGRATIONS = [
+    (1, 'Estrutura inicial (gearscore, histórico, eventos e censo)', [
+        '''
             CREATE TABLE IF NOT EXISTS gearscore (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id TEXT NOT NULL,
@@ -30,16 +72,10 @@ class Database:
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 UNIQUE(user_id, class_pvp)
             )
-        ''')
-        
-        # Adicionar coluna character_name se não existir (migração)
-        try:
-            cursor.execute('ALTER TABLE gearscore ADD COLUMN character_name TEXT')
-        except sqlite3.OperationalError:
-            pass  # Coluna já existe
-        
+        ''',
+        _add_column_if_missing('gearscore', 'character_name', 'TEXT'),
         # Tabela de histórico para rastrear progressão
-        cursor.execute('''
+        '''
             CREATE TABLE IF NOT EXISTS gearscore_history (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id TEXT NOT NULL,
@@ -50,16 +86,13 @@ class Database:
                 total_gs INTEGER NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        ''')
-        
-        # Índice para melhor performance em consultas de histórico
-        cursor.execute('''
+        ''',
+        '''
             CREATE INDEX IF NOT EXISTS idx_history_user_class 
             ON gearscore_history(user_id, class_pvp, created_at)
-        ''')
-        
+        ''',
         # Tabela de eventos (GvG, Treino, etc)
-        cursor.execute('''
+        '''
             CREATE TABLE IF NOT EXISTS eventos (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 tipo TEXT NOT NULL,
@@ -70,10 +103,9 @@ class Database:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 mes_referencia TEXT NOT NULL
             )
-        ''')
-        
+        ''',
         # Tabela de participações em eventos
-        cursor.execute('''
+        '''
             CREATE TABLE IF NOT EXISTS participacoes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 evento_id INTEGER NOT NULL,
@@ -83,21 +115,17 @@ class Database:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (evento_id) REFERENCES eventos(id)
             )
-        ''')
-        
-        # Índices para performance
-        cursor.execute('''
+        ''',
+        '''
             CREATE INDEX IF NOT EXISTS idx_eventos_mes 
             ON eventos(mes_referencia, tipo)
-        ''')
-        
-        cursor.execute('''
+        ''',
+        '''
             CREATE INDEX IF NOT EXISTS idx_participacoes_evento 
             ON participacoes(evento_id, user_id)
-        ''')
-        
+        ''',
         # Tabela de eventos de censo
-        cursor.execute('''
+        '''
             CREATE TABLE IF NOT EXISTS censo_events (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 nome TEXT NOT NULL,
@@ -109,33 +137,11 @@ class Database:
                 exemplos_json TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        ''')
-        
-        # Adicionar coluna campos_json se não existir (migração)
-        try:
-            cursor.execute('''
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name='censo_events'
-            ''')
-            if cursor.fetchone():
-                # Verificar se a coluna existe
-                cursor.execute('PRAGMA table_info(censo_events)')
-                columns = [row[1] for row in cursor.fetchall()]
-                if 'campos_json' not in columns:
-                    cursor.execute('''
-                        ALTER TABLE censo_events 
-                        ADD COLUMN campos_json TEXT
-                    ''')
-                if 'exemplos_json' not in columns:
-                    cursor.execute('''
-                        ALTER TABLE censo_events 
-                        ADD COLUMN exemplos_json TEXT
-                    ''')
-        except Exception as e:
-            print(f"Aviso ao adicionar colunas: {e}")
-        
+        ''',
+        _add_column_if_missing('censo_events', 'campos_json', 'TEXT'),
+        _add_column_if_missing('censo_events', 'exemplos_json', 'TEXT'),
         # Tabela de respostas do censo
-        cursor.execute('''
+        '''
             CREATE TABLE IF NOT EXISTS censo_responses (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 censo_id INTEGER NOT NULL,
@@ -146,20 +152,200 @@ class Database:
                 FOREIGN KEY (censo_id) REFERENCES censo_events(id) ON DELETE CASCADE,
                 UNIQUE(censo_id, user_id)
             )
-        ''')
-        
-        # Índices para censo
-        cursor.execute('''
+        ''',
+        '''
             CREATE INDEX IF NOT EXISTS idx_censo_events_ativo 
             ON censo_events(ativo, data_limite)
-        ''')
-        cursor.execute('''
+        ''',
+        '''
             CREATE INDEX IF NOT EXISTS idx_censo_responses_censo 
             ON censo_responses(censo_id, user_id)
-        ''')
-        
-        conn.commit()
-        conn.close()
+        ''',
+    ]),
+    (2, 'Índice case-insensitive por nome de família', [
+        '''
+            CREATE INDEX IF NOT EXISTS idx_gearscore_family_lower 
+            ON gearscore(LOWER(family_name))
+        ''',
+    ]),
+    (3, 'Tabela de membros com cargo da guilda (sincronizada do índice de membros)', [
+        '''
+            CREATE TABLE IF NOT EXISTS guild_members (
+                guild_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                PRIMARY KEY (guild_id, user_id)
+            )
+        ''',
+    ]),
+    # SQLite só permite adicionar coluna gerada VIRTUAL via ALTER TABLE; o valor fica persistido nos índices
+    (4, 'Coluna gerada gs (MAX(ap, aap) + dp) com índices', [
+        _add_column_if_missing('gearscore', 'gs', 'INTEGER GENERATED ALWAYS AS (MAX(ap, aap) + dp) VIRTUAL'),
+        '''
+            CREATE INDEX IF NOT EXISTS idx_gearscore_class_gs 
+            ON gearscore(class_pvp, gs DESC)
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS idx_gearscore_gs 
+            ON gearscore(gs)
+        ''',
+    ]),
+    (5, 'Resumo do histórico por personagem (primeiro/atual/maior GS, atualizações)', [
+        '''
+            CREATE TABLE IF NOT EXISTS gearscore_history_summary (
+                user_id TEXT NOT NULL,
+                class_pvp TEXT NOT NULL,
+                first_gs INTEGER NOT NULL,
+                current_gs INTEGER NOT NULL,
+                peak_gs INTEGER NOT NULL,
+                updates INTEGER NOT NULL,
+                first_update TIMESTAMP,
+                last_update TIMESTAMP,
+                PRIMARY KEY (user_id, class_pvp)
+            )
+        ''',
+        # Preencher a partir do histórico existente
+        '''
+            INSERT OR IGNORE INTO gearscore_history_summary 
+            (user_id, class_pvp, first_gs, current_gs, peak_gs, updates, first_update, last_update)
+            SELECT h.user_id, h.class_pvp,
+                (SELECT f.total_gs FROM gearscore_history f 
+                 WHERE f.user_id = h.user_id AND f.class_pvp = h.class_pvp 
+                 ORDER BY f.created_at, f.id LIMIT 1),
+                (SELECT l.total_gs FROM gearscore_history l 
+                 WHERE l.user_id = h.user_id AND l.class_pvp = h.class_pvp 
+                 ORDER BY l.created_at DESC, l.id DESC LIMIT 1),
+                MAX(h.total_gs), COUNT(*), MIN(h.created_at), MAX(h.created_at)
+            FROM gearscore_history h
+            GROUP BY h.user_id, h.class_pvp
+        ''',
+    ]),
+    (6, 'Resumo mensal de eventos e participações (consolidado antes da limpeza mensal)', [
+        '''
+            CREATE TABLE IF NOT EXISTS eventos_mensal (
+                mes_referencia TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                PRIMARY KEY (mes_referencia, tipo)
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS participacoes_mensal (
+                mes_referencia TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                display_name TEXT,
+                family_name TEXT,
+                PRIMARY KEY (mes_referencia, user_id, tipo)
+            )
+        ''',
+    ]),
+    # O índice de eventos (mes_referencia, tipo) já cobre o id (rowid) no SQLite
+    (7, 'Índice cobrindo participacoes para o relatório de participação', [
+        '''
+            CREATE INDEX IF NOT EXISTS idx_participacoes_evento_cobertura 
+            ON participacoes(evento_id, user_id, family_name, display_name)
+        ''',
+        'DROP INDEX IF EXISTS idx_participacoes_evento',
+    ]),
+]
+
+
+class ThreadConnection:
+    """
+    Conexão persistente emprestada à thread atual.
+    close() não fecha a conexão: só descarta uma transação pendente quando o último
+    empréstimo da thread é devolvido (métodos que chamam outros métodos compartilham
+    a mesma conexão sem que o close() interno desfaça o trabalho do externo).
+    """
+    
+    def __init__(self, state):
+        self._state = state
+        self._raw_conn = state.conn
+        self._returned = False
+    
+    def __getattr__(self, name):
+        return getattr(self._raw_conn, name)
+    
+    def close(self):
+        """Devolve a conexão à thread (idempotente)"""
+        if self._returned:
+            return
+        self._returned = True
+        self._state.depth -= 1
+        if self._state.depth == 0 and self._raw_conn.in_transaction:
+            self._raw_conn.rollback()
+    
+    def __del__(self):
+        # Métodos que levantam exceção antes do close() não podem deixar a transação (e o lock de escrita) aberta
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class Database:
+    def __init__(self, db_path=None, tuned=None):
+        self.db_path = db_path or DATABASE_NAME
+        self.tuned = SQLITE_TUNED if tuned is None else tuned
+        self.censo_cache = CensoAtivoCache(ttl=CENSO_CACHE_TTL)
+        self._local = threading.local()
+        self._connections = []  # Conexões persistentes de todas as threads (para o close)
+        self._connections_lock = threading.Lock()
+        self.init_database()
+    
+    def _connect(self):
+        """Abre uma conexão aplicando o perfil de desempenho"""
+        conn = sqlite3.connect(
+            self.db_path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=SQLITE_STATEMENT_CACHE,
+            check_same_thread=False  # Cada conexão é usada só pela sua thread; o close() final vem de outra
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={SQLITE_SYNCHRONOUS}')
+        conn.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+        conn.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+    
+    def get_connection(self):
+        """
+        Retorna uma conexão com o banco de dados.
+        No modo otimizado é a conexão persistente da thread atual (conn.close() apenas a devolve);
+        caso contrário, uma conexão nova com as configurações padrão do SQLite.
+        """
+        if not self.tuned:
+            return sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+        
+        state = self._local
+        if getattr(state, 'conn', None) is None:
+            state.conn = self._connect()
+            state.depth = 0
+            with self._connections_lock:
+                self._connections.append(state.conn)
+        state.depth += 1
+        return ThreadConnection(state)
+    
+    def close(self):
+        """Fecha as conexões persistentes de todas as threads"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        # As threads que ainda tiverem a conexão guardada abrem uma nova no próximo uso
+        self._local = threading.local()
+    
+    def init_database(self):
+        """Inicializa o banco de dados aplicando as migrações de schema pendentes"""
+        conn = self.get_connection()
+        try:
+            run_sql_migrations(conn, MIGRATIONS, placeholder='?')
+        finally:
+            conn.close()
     
     def register_gearscore(self, user_id, family_name, class_pvp, ap, aap, dp, linkgear, character_name=None):
         """Registra um novo gearscore (primeira vez)"""
@@ -185,12 +371,7 @@ class Database:
         ''', (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear))
         
         # Salvar histórico
-        total_gs = max(ap, aap) + dp
-        cursor.execute('''
-            INSERT INTO gearscore_history 
-            (user_id, class_pvp, ap, aap, dp, total_gs, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (user_id, class_pvp, ap, aap, dp, total_gs))
+        _record_history(cursor, user_id, class_pvp, ap, aap, dp)
         
         conn.commit()
         conn.close()
@@ -270,12 +451,7 @@ class Database:
         ''', (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear))
         
         # Salvar histórico
-        total_gs = max(ap, aap) + dp
-        cursor.execute('''
-            INSERT INTO gearscore_history 
-            (user_id, class_pvp, ap, aap, dp, total_gs, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (user_id, class_pvp, ap, aap, dp, total_gs))
+        _record_history(cursor, user_id, class_pvp, ap, aap, dp)
         
         conn.commit()
         conn.close()
@@ -300,7 +476,7 @@ class Database:
                 ORDER BY updated_at DESC
             ''', (user_id,))
         
-        result = cursor.fetchall()
+        result = [GearscoreRecord.from_row(row) for row in cursor.fetchall()]
         conn.close()
         return result
     
@@ -319,20 +495,30 @@ class Database:
         conn.close()
         return result[0] if result else None
     
-    def get_all_gearscores(self, valid_user_ids=None):
+    def get_all_gearscores(self, valid_user_ids=None, guild_id=None):
         """
         Busca todos os gearscores
         
         Args:
             valid_user_ids: Set ou lista de user_ids válidos (que têm o cargo da guilda).
                            Se None, retorna todos os registros.
+            guild_id: Se informado, filtra pelos membros da guilda na tabela guild_members
+                     (JOIN indexado, sem um parâmetro por membro na consulta)
         """
         conn = self.get_connection()
         cursor = conn.cursor()
         
         # Usar colunas explícitas para garantir ordem consistente
         # (importante porque ALTER TABLE ADD COLUMN adiciona no final)
-        if valid_user_ids:
+        if guild_id is not None:
+            cursor.execute('''
+                SELECT g.id, g.user_id, g.family_name, g.character_name, g.class_pvp, g.ap, g.aap, g.dp, g.linkgear, g.updated_at
+                FROM gearscore g
+                JOIN guild_members m ON m.user_id = g.user_id
+                WHERE m.guild_id = ?
+                ORDER BY g.updated_at DESC
+            ''', (str(guild_id),))
+        elif valid_user_ids:
             placeholders = ','.join(['?'] * len(valid_user_ids))
             query = f'''
                 SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
@@ -348,29 +534,45 @@ class Database:
                 ORDER BY updated_at DESC
             ''')
         
-        result = cursor.fetchall()
+        result = [GearscoreRecord.from_row(row) for row in cursor.fetchall()]
         conn.close()
         return result
     
-    def get_class_statistics(self, valid_user_ids=None):
+    def get_class_statistics(self, valid_user_ids=None, guild_id=None):
         """
         Retorna estatísticas por classe
         
         Args:
             valid_user_ids: Set ou lista de user_ids válidos (que têm o cargo da guilda).
                            Se None, retorna todos os registros.
+            guild_id: Se informado, filtra pelos membros da guilda na tabela guild_members
         """
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        if valid_user_ids:
+        if guild_id is not None:
+            cursor.execute('''
+                SELECT 
+                    g.class_pvp,
+                    COUNT(*) as total,
+                    AVG(g.gs) as avg_gs,
+                    AVG(g.ap) as avg_ap,
+                    AVG(g.aap) as avg_aap,
+                    AVG(g.dp) as avg_dp
+                FROM gearscore g
+                JOIN guild_members m ON m.user_id = g.user_id
+                WHERE m.guild_id = ?
+                GROUP BY g.class_pvp
+                ORDER BY total DESC, avg_gs DESC
+            ''', (str(guild_id),))
+        elif valid_user_ids:
             # Criar placeholders para a query IN
             placeholders = ','.join(['?'] * len(valid_user_ids))
             query = f'''
                 SELECT 
                     class_pvp,
                     COUNT(*) as total,
-                    AVG(CASE WHEN ap > aap THEN ap ELSE aap END + dp) as avg_gs,
+                    AVG(gs) as avg_gs,
                     AVG(ap) as avg_ap,
                     AVG(aap) as avg_aap,
                     AVG(dp) as avg_dp
@@ -385,7 +587,7 @@ class Database:
                 SELECT 
                     class_pvp,
                     COUNT(*) as total,
-                    AVG(CASE WHEN ap > aap THEN ap ELSE aap END + dp) as avg_gs,
+                    AVG(gs) as avg_gs,
                     AVG(ap) as avg_ap,
                     AVG(aap) as avg_aap,
                     AVG(dp) as avg_dp
@@ -394,11 +596,11 @@ class Database:
                 ORDER BY total DESC, avg_gs DESC
             ''')
         
-        result = cursor.fetchall()
+        result = [ClassStatistics.from_row(row) for row in cursor.fetchall()]
         conn.close()
         return result
     
-    def get_class_members(self, class_pvp, valid_user_ids=None):
+    def get_class_members(self, class_pvp, valid_user_ids=None, guild_id=None):
         """
         Retorna todos os membros de uma classe específica
         
@@ -406,18 +608,27 @@ class Database:
             class_pvp: Nome da classe
             valid_user_ids: Set ou lista de user_ids válidos (que têm o cargo da guilda).
                            Se None, retorna todos os registros.
+            guild_id: Se informado, filtra pelos membros da guilda na tabela guild_members
         """
         conn = self.get_connection()
         cursor = conn.cursor()
         
         # Usar colunas explícitas para garantir ordem consistente
-        if valid_user_ids:
+        if guild_id is not None:
+            cursor.execute('''
+                SELECT g.id, g.user_id, g.family_name, g.character_name, g.class_pvp, g.ap, g.aap, g.dp, g.linkgear, g.updated_at
+                FROM gearscore g
+                JOIN guild_members m ON m.user_id = g.user_id
+                WHERE m.guild_id = ? AND g.class_pvp = ?
+                ORDER BY g.gs DESC
+            ''', (str(guild_id), class_pvp))
+        elif valid_user_ids:
             placeholders = ','.join(['?'] * len(valid_user_ids))
             query = f'''
                 SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
                 FROM gearscore 
                 WHERE class_pvp = ? AND user_id IN ({placeholders})
-                ORDER BY (CASE WHEN ap > aap THEN ap ELSE aap END + dp) DESC
+                ORDER BY gs DESC
             '''
             cursor.execute(query, [class_pvp] + list(valid_user_ids))
         else:
@@ -425,13 +636,149 @@ class Database:
                 SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
                 FROM gearscore 
                 WHERE class_pvp = ?
-                ORDER BY (CASE WHEN ap > aap THEN ap ELSE aap END + dp) DESC
+                ORDER BY gs DESC
             ''', (class_pvp,))
         
-        result = cursor.fetchall()
+        result = [GearscoreRecord.from_row(row) for row in cursor.fetchall()]
+        conn.close()
+        return result
+    
+    def get_gs_summary(self, guild_id=None):
+        """
+        Retorna (quantidade de registros, soma do GS), opcionalmente só dos membros da guilda
+        (tabela guild_members). Usado para calcular o GS médio sem trazer os registros.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        if guild_id is not None:
+            cursor.execute('''
+                SELECT COUNT(*), COALESCE(SUM(g.gs), 0)
+                FROM gearscore g
+                JOIN guild_members m ON m.user_id = g.user_id
+                WHERE m.guild_id = ?
+            ''', (str(guild_id),))
+        else:
+            cursor.execute('SELECT COUNT(*), COALESCE(SUM(gs), 0) FROM gearscore')
+        
+        total, soma = cursor.fetchone()
+        conn.close()
+        return total, soma
+    
+    def get_gearscores_below(self, max_gs, guild_id=None):
+        """Retorna os registros com GS menor que max_gs, do menor para o maior (varredura no índice de gs)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        if guild_id is not None:
+            cursor.execute('''
+                SELECT g.id, g.user_id, g.family_name, g.character_name, g.class_pvp, g.ap, g.aap, g.dp, g.linkgear, g.updated_at
+                FROM gearscore g
+                JOIN guild_members m ON m.user_id = g.user_id
+                WHERE m.guild_id = ? AND g.gs < ?
+                ORDER BY g.gs ASC
+            ''', (str(guild_id), max_gs))
+        else:
+            cursor.execute('''
+                SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
+                FROM gearscore
+                WHERE gs < ?
+                ORDER BY gs ASC
+            ''', (max_gs,))
+        
+        result = [GearscoreRecord.from_row(row) for row in cursor.fetchall()]
         conn.close()
         return result
     
+    def get_gearscores_page(self, guild_id=None, limit=10, after=None):
+        """
+        Página do ranking por GS (maior primeiro), com paginação por keyset.
+        after: (gs, id) do último registro da página anterior (None = primeira página).
+        O custo é o mesmo em qualquer página: a consulta continua do ponto onde a anterior parou.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        conditions = []
+        params = []
+        join = ''
+        if guild_id is not None:
+            # CROSS JOIN fixa a ordem no SQLite: percorre o índice de gs e confere cada linha em guild_members,
+            # parando no LIMIT (sem ordenar todos os membros a cada página)
+            join = 'CROSS JOIN guild_members m ON m.user_id = g.user_id'
+            conditions.append('m.guild_id = ?')
+            params.append(str(guild_id))
+        if after is not None:
+            conditions.append('(g.gs, g.id) < (?, ?)')
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        cursor.execute(f'''
+            SELECT g.id, g.user_id, g.family_name, g.character_name, g.class_pvp, g.ap, g.aap, g.dp, g.linkgear, g.updated_at
+            FROM gearscore g
+            {join}
+            {where}
+            ORDER BY g.gs DESC, g.id DESC
+            LIMIT ?
+        ''', params + [limit])
+        
+        result = [GearscoreRecord.from_row(row) for row in cursor.fetchall()]
+        conn.close()
+        return result
+    
+    def sync_guild_members(self, guild_id, user_ids):
+        """
+        Substitui os membros da guilda na tabela guild_members pelo conjunto informado
+        (só grava a diferença). Retorna (adicionados, removidos).
+        """
+        guild_id = str(guild_id)
+        user_ids = {str(user_id) for user_id in user_ids}
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT user_id FROM guild_members WHERE guild_id = ?', (guild_id,))
+            current = {row[0] for row in cursor.fetchall()}
+            to_add = user_ids - current
+            to_remove = current - user_ids
+            
+            cursor.executemany(
+                'INSERT OR IGNORE INTO guild_members (guild_id, user_id) VALUES (?, ?)',
+                [(guild_id, user_id) for user_id in to_add]
+            )
+            cursor.executemany(
+                'DELETE FROM guild_members WHERE guild_id = ? AND user_id = ?',
+                [(guild_id, user_id) for user_id in to_remove]
+            )
+            conn.commit()
+            conn.close()
+            return len(to_add), len(to_remove)
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            raise e
+    
+    def set_guild_member(self, guild_id, user_id, is_member):
+        """Inclui/exclui um usuário da tabela guild_members (ganhou/perdeu o cargo da guilda)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            if is_member:
+                cursor.execute(
+                    'INSERT OR IGNORE INTO guild_members (guild_id, user_id) VALUES (?, ?)',
+                    (str(guild_id), str(user_id))
+                )
+            else:
+                cursor.execute(
+                    'DELETE FROM guild_members WHERE guild_id = ? AND user_id = ?',
+                    (str(guild_id), str(user_id))
+                )
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            raise e
+    
     def get_user_history(self, user_id, class_pvp=None):
         """Retorna histórico de progressão de um usuário"""
         conn = self.get_connection()
@@ -459,19 +806,23 @@ class Database:
         return result
     
     def get_user_progress(self, user_id, class_pvp):
-        """Calcula progressão de um personagem"""
+        """
+        Progressão de um personagem, lida do resumo mantido a cada registro/atualização.
+        Retorna (first_gs, current_gs, progress, updates, first_update, last_update, peak_gs) ou None.
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
             SELECT 
-                MIN(total_gs) as first_gs,
-                MAX(total_gs) as current_gs,
-                MAX(total_gs) - MIN(total_gs) as progress,
-                COUNT(*) as updates,
-                MIN(created_at) as first_update,
-                MAX(created_at) as last_update
-            FROM gearscore_history
+                first_gs,
+                current_gs,
+                current_gs - first_gs as progress,
+                updates,
+                first_update,
+                last_update,
+                peak_gs
+            FROM gearscore_history_summary
             WHERE user_id = ? AND class_pvp = ?
         ''', (user_id, class_pvp))
         
@@ -479,6 +830,108 @@ class Database:
         conn.close()
         return result
     
+    def get_progression_analytics(self, guild_id=None, now=None):
+        """
+        Progressão de todos os personagens (classe atual) em uma única consulta: variação de GS
+        em 7/30/90 dias, atualizações em 30/90 dias e a última vez que o GS mudou.
+        O GS de referência de cada janela é a entrada do histórico em vigor no início dela
+        (LEAD/LAG sobre o histórico do personagem); sem histórico, as variações são 0.
+        Retorna [ProgressionStats].
+        """
+        now = now or utcnow()
+        params = {
+            'c7': now - timedelta(days=7),
+            'c30': now - timedelta(days=30),
+            'c90': now - timedelta(days=90),
+            'guild_id': str(guild_id) if guild_id is not None else None,
+        }
+        member_join = 'JOIN guild_members m ON m.user_id = g.user_id AND m.guild_id = :guild_id' if guild_id is not None else ''
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+            WITH hist AS (
+                SELECT h.user_id, h.class_pvp, h.total_gs, h.created_at,
+                    LAG(h.total_gs) OVER (PARTITION BY h.user_id, h.class_pvp ORDER BY h.created_at, h.id) AS prev_gs,
+                    LAG(h.created_at) OVER (PARTITION BY h.user_id, h.class_pvp ORDER BY h.created_at, h.id) AS prev_at,
+                    LEAD(h.created_at) OVER (PARTITION BY h.user_id, h.class_pvp ORDER BY h.created_at, h.id) AS next_at
+                FROM gearscore g
+                {member_join}
+                JOIN gearscore_history h ON h.user_id = g.user_id AND h.class_pvp = g.class_pvp
+            ), resumo AS (
+                SELECT user_id, class_pvp,
+                    COALESCE(
+                        MAX(CASE WHEN created_at <= :c7 AND (next_at IS NULL OR next_at > :c7) THEN total_gs END),
+                        MAX(CASE WHEN prev_at IS NULL THEN total_gs END)
+                    ) AS gs_7d,
+                    COALESCE(
+                        MAX(CASE WHEN created_at <= :c30 AND (next_at IS NULL OR next_at > :c30) THEN total_gs END),
+                        MAX(CASE WHEN prev_at IS NULL THEN total_gs END)
+                    ) AS gs_30d,
+                    COALESCE(
+                        MAX(CASE WHEN created_at <= :c90 AND (next_at IS NULL OR next_at > :c90) THEN total_gs END),
+                        MAX(CASE WHEN prev_at IS NULL THEN total_gs END)
+                    ) AS gs_90d,
+                    SUM(CASE WHEN created_at > :c30 THEN 1 ELSE 0 END) AS updates_30d,
+                    SUM(CASE WHEN created_at > :c90 THEN 1 ELSE 0 END) AS updates_90d,
+                    MAX(CASE WHEN prev_gs IS NULL OR total_gs <> prev_gs THEN created_at END) AS last_change
+                FROM hist
+                GROUP BY user_id, class_pvp
+            )
+            SELECT g.user_id, g.family_name, g.class_pvp, g.gs,
+                g.gs - COALESCE(r.gs_7d, g.gs),
+                g.gs - COALESCE(r.gs_30d, g.gs),
+                g.gs - COALESCE(r.gs_90d, g.gs),
+                r.updates_30d, r.updates_90d,
+                COALESCE(r.last_change, g.updated_at), g.updated_at
+            FROM gearscore g
+            {member_join}
+            LEFT JOIN resumo r ON r.user_id = g.user_id AND r.class_pvp = g.class_pvp
+            ORDER BY g.gs DESC, g.id DESC
+        ''', params)
+        
+        result = [ProgressionStats.from_row(row) for row in cursor.fetchall()]
+        conn.close()
+        return result
+    
+    def compact_gearscore_history(self, weekly_before, monthly_before):
+        """
+        Reduz o histórico antigo à última entrada de cada período, por personagem:
+        entradas anteriores a monthly_before ficam uma por mês; entre monthly_before e
+        weekly_before, uma por semana. O resumo (primeiro/maior GS, atualizações) não muda.
+        Retorna a quantidade de entradas removidas.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('''
+                DELETE FROM gearscore_history 
+                WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY user_id, class_pvp,
+                                CASE WHEN created_at < ? 
+                                    THEN 'M' || strftime('%Y-%m', created_at) 
+                                    ELSE 'W' || strftime('%Y-%W', created_at) END
+                            ORDER BY created_at DESC, id DESC
+                        ) AS posicao
+                        FROM gearscore_history
+                        WHERE created_at < ?
+                    )
+                    WHERE posicao > 1
+                )
+            ''', (monthly_before, weekly_before))
+            deleted_count = cursor.rowcount
+            conn.commit()
+            conn.close()
+            return deleted_count
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            raise e
+    
     def clear_all_data(self):
         """Limpa todos os dados do banco (gearscore e histórico)"""
         conn = self.get_connection()
@@ -486,6 +939,7 @@ class Database:
         
         try:
             cursor.execute('DELETE FROM gearscore_history')
+            cursor.execute('DELETE FROM gearscore_history_summary')
             cursor.execute('DELETE FROM gearscore')
             conn.commit()
             conn.close()
@@ -503,6 +957,7 @@ class Database:
         try:
             cursor.execute('DELETE FROM gearscore_history')
             deleted_count = cursor.rowcount
+            cursor.execute('DELETE FROM gearscore_history_summary')
             conn.commit()
             conn.close()
             return True, f"Histórico limpo! {deleted_count} registro(s) removido(s)."
@@ -532,6 +987,7 @@ class Database:
             
             # Deletar histórico do usuário
             cursor.execute('DELETE FROM gearscore_history WHERE user_id = ?', (user_id,))
+            cursor.execute('DELETE FROM gearscore_history_summary WHERE user_id = ?', (user_id,))
             
             conn.commit()
             conn.close()
@@ -582,12 +1038,7 @@ class Database:
             ''', (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear))
             
             # Salvar histórico
-            total_gs = max(ap, aap) + dp
-            cursor.execute('''
-                INSERT INTO gearscore_history 
-                (user_id, class_pvp, ap, aap, dp, total_gs, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (user_id, class_pvp, ap, aap, dp, total_gs))
+            total_gs = _record_history(cursor, user_id, class_pvp, ap, aap, dp)
             
             conn.commit()
             conn.close()
@@ -608,30 +1059,78 @@ class Database:
             WHERE LOWER(family_name) = LOWER(?)
         ''', (family_name,))
         
-        result = cursor.fetchone()
+        row = cursor.fetchone()
+        result = GearscoreRecord.from_row(row) if row else None
         conn.close()
         return result
     
     def get_gearscores_by_family_names(self, family_names):
-        """Busca o gearscore de múltiplos usuários pelos nomes de família"""
+        """
+        Busca o gearscore de múltiplos usuários pelos nomes de família.
+        Uma única consulta IN (usa o índice em LOWER(family_name)), em lotes
+        para não passar do limite de parâmetros do SQLite.
+        Retorna: {nome.strip().lower(): registro}
+        """
+        names = list(dict.fromkeys(name.strip() for name in family_names if name and name.strip()))
+        if not names:
+            return {}
+        
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        results = {}
-        for name in family_names:
-            cursor.execute('''
+        rows_by_name = {}
+        batch_size = 500
+        for i in range(0, len(names), batch_size):
+            batch = names[i:i + batch_size]
+            placeholders = ','.join(['LOWER(?)'] * len(batch))
+            cursor.execute(f'''
                 SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
                 FROM gearscore 
-                WHERE LOWER(family_name) = LOWER(?)
-            ''', (name.strip(),))
+                WHERE LOWER(family_name) IN ({placeholders})
+                ORDER BY id
+            ''', batch)
             
-            result = cursor.fetchone()
-            if result:
-                results[name.strip().lower()] = result
+            for row in cursor.fetchall():
+                # Manter o primeiro registro encontrado para cada nome
+                rows_by_name.setdefault(row[2].lower(), GearscoreRecord.from_row(row))
         
         conn.close()
+        
+        results = {}
+        for name in names:
+            row = rows_by_name.get(name.lower())
+            if row:
+                results[name.lower()] = row
         return results
     
+    def get_family_names_by_user_ids(self, user_ids):
+        """
+        Busca o nome de família de vários usuários de uma vez (ex: todos de um canal de voz).
+        Retorna: {user_id: family_name} (apenas usuários com registro)
+        """
+        user_ids = list(dict.fromkeys(str(uid) for uid in user_ids))
+        if not user_ids:
+            return {}
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        family_names = {}
+        batch_size = 500
+        for i in range(0, len(user_ids), batch_size):
+            batch = user_ids[i:i + batch_size]
+            placeholders = ','.join(['?'] * len(batch))
+            cursor.execute(f'''
+                SELECT user_id, family_name FROM gearscore 
+                WHERE user_id IN ({placeholders})
+                ORDER BY id
+            ''', batch)
+            for user_id, family_name in cursor.fetchall():
+                family_names.setdefault(user_id, family_name)
+        
+        conn.close()
+        return family_names
+    
     # ============================================
     # MÉTODOS PARA EVENTOS E PARTICIPAÇÕES
     # ============================================
@@ -658,12 +1157,11 @@ class Database:
             
             evento_id = cursor.lastrowid
             
-            # Inserir participações
-            for p in participantes:
-                cursor.execute('''
-                    INSERT INTO participacoes (evento_id, user_id, family_name, display_name)
-                    VALUES (?, ?, ?, ?)
-                ''', (evento_id, p['user_id'], p.get('family_name'), p.get('display_name')))
+            # Inserir participações (todas de uma vez)
+            cursor.executemany('''
+                INSERT INTO participacoes (evento_id, user_id, family_name, display_name)
+                VALUES (?, ?, ?, ?)
+            ''', [(evento_id, p['user_id'], p.get('family_name'), p.get('display_name')) for p in participantes])
             
             conn.commit()
             conn.close()
@@ -673,102 +1171,171 @@ class Database:
             conn.close()
             raise e
     
-    def get_relatorio_participacoes(self, mes_referencia=None):
+    def get_relatorio_participacoes(self, mes_referencia=None, tipos=()):
         """
-        Retorna relatório de participações do mês.
-        Se mes_referencia for None, usa o mês atual.
+        Retorna o relatório de participações do mês em uma única consulta, já pivotado:
+        uma linha por player com uma coluna por tipo (na ordem de `tipos`), total e taxa de presença.
+        Se mes_referencia for None, usa o mês atual. Meses já consolidados pela limpeza mensal
+        são lidos do resumo (eventos_mensal/participacoes_mensal); os demais dos eventos brutos,
+        pelos índices cobrindo eventos(mes_referencia, tipo) e participacoes(evento_id, user_id, ...).
+        Eventos de tipos fora de `tipos` entram apenas nos totais.
         Retorna: {
+            'tipos': [tipo],
             'eventos_por_tipo': {tipo: quantidade},
-            'participacoes_por_player': {user_id: {tipo: quantidade, 'display_name': nome}},
+            'players': [ParticipationRow] (maior total primeiro),
             'total_eventos': int,
             'mes': str
         }
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         from datetime import datetime
         if mes_referencia is None:
             mes_referencia = datetime.now().strftime("%Y-%m")
+        tipos = list(tipos)
         
-        # Contar eventos por tipo
-        cursor.execute('''
-            SELECT tipo, COUNT(*) as total
-            FROM eventos
-            WHERE mes_referencia = ?
-            GROUP BY tipo
-        ''', (mes_referencia,))
+        params = {'mes': mes_referencia}
+        somas_tipo = ''
+        colunas_tipo = ''
+        for i, tipo in enumerate(tipos):
+            params[f'tipo{i}'] = tipo
+            somas_tipo += f'SUM(CASE WHEN tipo = :tipo{i} THEN total ELSE 0 END) AS qtd_{i}, '
+            colunas_tipo += f'qtd_{i}, '
         
-        eventos_por_tipo = {}
-        for row in cursor.fetchall():
-            eventos_por_tipo[row[0]] = row[1]
-        
-        total_eventos = sum(eventos_por_tipo.values())
-        
-        # Contar participações por player e tipo
-        cursor.execute('''
-            SELECT p.user_id, p.display_name, p.family_name, e.tipo, COUNT(*) as total
-            FROM participacoes p
-            JOIN eventos e ON p.evento_id = e.id
-            WHERE e.mes_referencia = ?
-            GROUP BY p.user_id, e.tipo
-        ''', (mes_referencia,))
-        
-        participacoes_por_player = {}
-        for row in cursor.fetchall():
-            user_id = row[0]
-            display_name = row[1]
-            family_name = row[2]
-            tipo = row[3]
-            quantidade = row[4]
-            
-            if user_id not in participacoes_por_player:
-                participacoes_por_player[user_id] = {
-                    'display_name': display_name or family_name or user_id,
-                    'family_name': family_name
-                }
-            participacoes_por_player[user_id][tipo] = quantidade
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
+        # A primeira linha (user_id NULL) traz a quantidade de eventos por tipo; as demais, um player cada
+        cursor.execute(f'''
+            WITH consolidado AS (
+                SELECT EXISTS (SELECT 1 FROM eventos_mensal WHERE mes_referencia = :mes) AS sim
+            ), eventos_tipo AS (
+                SELECT tipo, COUNT(*) AS total
+                FROM eventos
+                WHERE mes_referencia = :mes AND NOT (SELECT sim FROM consolidado)
+                GROUP BY tipo
+                UNION ALL
+                SELECT tipo, total
+                FROM eventos_mensal
+                WHERE mes_referencia = :mes
+            ), participacao AS (
+                SELECT p.user_id, p.display_name, p.family_name, e.tipo, 1 AS total
+                FROM eventos e
+                JOIN participacoes p ON p.evento_id = e.id
+                WHERE e.mes_referencia = :mes AND NOT (SELECT sim FROM consolidado)
+                UNION ALL
+                SELECT user_id, display_name, family_name, tipo, total
+                FROM participacoes_mensal
+                WHERE mes_referencia = :mes
+            )
+            SELECT user_id, display_name, family_name, {colunas_tipo}total, taxa FROM (
+                SELECT NULL AS user_id, NULL AS display_name, NULL AS family_name, {somas_tipo}
+                    SUM(total) AS total, NULL AS taxa
+                FROM eventos_tipo
+                UNION ALL
+                SELECT user_id, MAX(display_name), MAX(family_name), {somas_tipo}
+                    SUM(total), SUM(total) * 1.0 / (SELECT SUM(total) FROM eventos_tipo)
+                FROM participacao
+                GROUP BY user_id
+            ) relatorio
+            ORDER BY user_id IS NOT NULL, total DESC, user_id
+        ''', params)
+        rows = cursor.fetchall()
         conn.close()
         
+        eventos = rows[0]
         return {
-            'eventos_por_tipo': eventos_por_tipo,
-            'participacoes_por_player': participacoes_por_player,
-            'total_eventos': total_eventos,
+            'tipos': tipos,
+            'eventos_por_tipo': {tipo: int(eventos[3 + i] or 0) for i, tipo in enumerate(tipos) if eventos[3 + i]},
+            'players': [ParticipationRow.from_row(row, len(tipos)) for row in rows[1:]],
+            'total_eventos': int(eventos[3 + len(tipos)] or 0),
             'mes': mes_referencia
         }
     
-    def limpar_eventos_mes_anterior(self):
-        """Limpa eventos de meses anteriores ao atual (chamado no dia 1)"""
+    def consolidar_eventos_mes(self, mes_referencia):
+        """
+        Grava o resumo mensal (eventos por tipo e participações por player/tipo) de um mês.
+        Um mês já consolidado não é recalculado: a limpeza pode ter apagado parte dos eventos brutos.
+        Retorna True se o mês foi consolidado agora.
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        from datetime import datetime
-        mes_atual = datetime.now().strftime("%Y-%m")
-        
         try:
-            # Deletar participações de eventos antigos
-            cursor.execute('''
-                DELETE FROM participacoes 
-                WHERE evento_id IN (
-                    SELECT id FROM eventos WHERE mes_referencia < ?
-                )
-            ''', (mes_atual,))
+            cursor.execute('SELECT 1 FROM eventos_mensal WHERE mes_referencia = ? LIMIT 1', (mes_referencia,))
+            if cursor.fetchone():
+                conn.close()
+                return False
             
-            # Deletar eventos antigos
             cursor.execute('''
-                DELETE FROM eventos WHERE mes_referencia < ?
-            ''', (mes_atual,))
+                INSERT INTO eventos_mensal (mes_referencia, tipo, total)
+                SELECT mes_referencia, tipo, COUNT(*)
+                FROM eventos
+                WHERE mes_referencia = ?
+                GROUP BY mes_referencia, tipo
+            ''', (mes_referencia,))
+            cursor.execute('''
+                INSERT INTO participacoes_mensal (mes_referencia, user_id, tipo, total, display_name, family_name)
+                SELECT e.mes_referencia, p.user_id, e.tipo, COUNT(*), MAX(p.display_name), MAX(p.family_name)
+                FROM participacoes p
+                JOIN eventos e ON p.evento_id = e.id
+                WHERE e.mes_referencia = ?
+                GROUP BY e.mes_referencia, p.user_id, e.tipo
+            ''', (mes_referencia,))
             
-            deleted = cursor.rowcount
             conn.commit()
             conn.close()
-            return deleted
+            return True
         except Exception as e:
             conn.rollback()
             conn.close()
             raise e
     
+    def limpar_eventos_mes_anterior(self):
+        """
+        Limpa eventos de meses anteriores ao atual (chamado no dia 1).
+        Cada mês é consolidado no resumo mensal antes; os eventos brutos são apagados em lotes
+        de EVENTOS_CLEANUP_BATCH_SIZE, cada lote em sua transação (sem um DELETE longo travando o banco).
+        """
+        from datetime import datetime
+        mes_atual = datetime.now().strftime("%Y-%m")
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT DISTINCT mes_referencia FROM eventos WHERE mes_referencia < ?', (mes_atual,))
+        meses = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        
+        for mes in meses:
+            self.consolidar_eventos_mes(mes)
+        
+        deleted = 0
+        while True:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute('''
+                    SELECT id FROM eventos WHERE mes_referencia < ? ORDER BY id LIMIT ?
+                ''', (mes_atual, EVENTOS_CLEANUP_BATCH_SIZE))
+                evento_ids = [row[0] for row in cursor.fetchall()]
+                if not evento_ids:
+                    conn.close()
+                    break
+                
+                placeholders = ','.join('?' * len(evento_ids))
+                # Deletar participações dos eventos do lote
+                cursor.execute(f'DELETE FROM participacoes WHERE evento_id IN ({placeholders})', evento_ids)
+                # Deletar eventos do lote
+                cursor.execute(f'DELETE FROM eventos WHERE id IN ({placeholders})', evento_ids)
+                
+                deleted += cursor.rowcount
+                conn.commit()
+                conn.close()
+            except Exception as e:
+                conn.rollback()
+                conn.close()
+                raise e
+        
+        return deleted
+    
     # ==================== MÉTODOS DE CENSO ====================
     
     def criar_censo(self, nome: str, data_limite, criado_por: str, criado_por_nome: str, campos_json=None, exemplos_json=None):
@@ -801,34 +1368,16 @@ class Database:
             else:
                 exemplos_json_str = None
             
-            # Verificar se a coluna exemplos_json existe, se não, adicionar
-            try:
-                cursor.execute('PRAGMA table_info(censo_events)')
-                columns = [row[1] for row in cursor.fetchall()]
-                if 'exemplos_json' not in columns:
-                    cursor.execute('''
-                        ALTER TABLE censo_events 
-                        ADD COLUMN exemplos_json TEXT
-                    ''')
-            except Exception as e:
-                print(f"Aviso ao verificar/adicionar exemplos_json: {e}")
-            
-            # Criar novo censo (com ou sem exemplos_json dependendo se a coluna existe)
-            try:
-                cursor.execute('''
-                    INSERT INTO censo_events (nome, data_limite, criado_por, criado_por_nome, ativo, campos_json, exemplos_json)
-                    VALUES (?, ?, ?, ?, 1, ?, ?)
-                ''', (nome, data_limite, criado_por, criado_por_nome, campos_json_str, exemplos_json_str))
-            except:
-                # Se falhar (coluna não existe), inserir sem exemplos_json
-                cursor.execute('''
-                    INSERT INTO censo_events (nome, data_limite, criado_por, criado_por_nome, ativo, campos_json)
-                    VALUES (?, ?, ?, ?, 1, ?)
-                ''', (nome, data_limite, criado_por, criado_por_nome, campos_json_str))
+            # Criar novo censo
+            cursor.execute('''
+                INSERT INTO censo_events (nome, data_limite, criado_por, criado_por_nome, ativo, campos_json, exemplos_json)
+                VALUES (?, ?, ?, ?, 1, ?, ?)
+            ''', (nome, data_limite, criado_por, criado_por_nome, campos_json_str, exemplos_json_str))
             
             censo_id = cursor.lastrowid
             conn.commit()
             conn.close()
+            self.censo_cache.invalidate()
             return censo_id
         except Exception as e:
             conn.rollback()
@@ -836,38 +1385,23 @@ class Database:
             raise e
     
     def get_censo_ativo(self):
-        """Retorna o censo ativo atual, ou None se não houver"""
+        """Retorna o censo ativo atual, ou None se não houver (em cache até criar/finalizar censo ou expirar o TTL)"""
+        return self.censo_cache.get(self._buscar_censo_ativo)
+    
+    def _buscar_censo_ativo(self):
+        """Busca o censo ativo no banco"""
         import json
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            # Verificar se a coluna exemplos_json existe
-            try:
-                cursor.execute('PRAGMA table_info(censo_events)')
-                columns = [row[1] for row in cursor.fetchall()]
-                has_exemplos_col = 'exemplos_json' in columns
-            except Exception as e:
-                # Se der erro, assumir que não existe
-                has_exemplos_col = False
-            
-            # Buscar censo com ou sem exemplos_json
-            if has_exemplos_col:
-                cursor.execute('''
-                    SELECT id, nome, data_limite, criado_por, criado_por_nome, created_at, campos_json, exemplos_json
-                    FROM censo_events
-                    WHERE ativo = 1
-                    ORDER BY created_at DESC
-                    LIMIT 1
-                ''')
-            else:
-                cursor.execute('''
-                    SELECT id, nome, data_limite, criado_por, criado_por_nome, created_at, campos_json
-                    FROM censo_events
-                    WHERE ativo = 1
-                    ORDER BY created_at DESC
-                    LIMIT 1
-                ''')
+            cursor.execute('''
+                SELECT id, nome, data_limite, criado_por, criado_por_nome, created_at, campos_json, exemplos_json
+                FROM censo_events
+                WHERE ativo = 1
+                ORDER BY created_at DESC
+                LIMIT 1
+            ''')
             
             result = cursor.fetchone()
             
@@ -882,7 +1416,7 @@ class Database:
                         campos = result[6]
                 
                 exemplos = None
-                if has_exemplos_col and len(result) > 7 and result[7]:
+                if result[7]:
                     try:
                         exemplos = json.loads(result[7])
                     except:
@@ -1037,6 +1571,7 @@ class Database:
             
             conn.commit()
             conn.close()
+            self.censo_cache.invalidate()
             return True
         except Exception as e:
             conn.rollback()
@@ -3,28 +3,170 @@ Versão do banco de dados usando MongoDB Atlas
 Instale: pip install pymongo
 """
 from pymongo import MongoClient
-from datetime import datetime
+from datetime import datetime, timedelta
+from timestamps import utcnow
 from config import MONGODB_URI, MONGODB_DB_NAME
+from migrations import run_mongo_migrations
+from records import GearscoreRecord, ClassStatistics, ProgressionStats
+
+# Collation que ignora maiúsculas/minúsculas (deve ser a mesma do índice para ele ser usado)
+FAMILY_NAME_COLLATION = {"locale": "en", "strength": 2}
+
+# Migrações de schema em ordem (ver migrations.py). Nunca altere uma migração já publicada;
+# adicione uma nova versão no final.
+MIGRATIONS = [
+    (1, 'Índices de gearscore e histórico', [
+        # Índice único para user_id + class_pvp
+        lambda db: db.collection.create_index([("user_id", 1), ("class_pvp", 1)], unique=True),
+        # Índice para histórico
+        lambda db: db.history_collection.create_index([("user_id", 1), ("class_pvp", 1), ("created_at", -1)]),
+    ]),
+    (2, 'Índice case-insensitive por nome de família', [
+        lambda db: db.collection.create_index(
+            [("family_name", 1)],
+            name="idx_family_name_ci",
+            collation=FAMILY_NAME_COLLATION
+        ),
+    ]),
+    (3, 'Índices de eventos e participações', [
+        lambda db: db.eventos_collection.create_index([("mes_referencia", 1), ("tipo", 1)]),
+        lambda db: db.participacoes_collection.create_index([("evento_id", 1), ("user_id", 1)]),
+    ]),
+    (4, 'Coleção de membros com cargo da guilda (sincronizada do índice de membros)', [
+        lambda db: db.guild_members_collection.create_index([("user_id", 1), ("guild_id", 1)], unique=True),
+    ]),
+    (5, 'Campo gs (MAX(ap, aap) + dp) mantido na escrita, com índices', [
+        # Preencher o gs dos documentos existentes (os novos já são gravados com o campo)
+        lambda db: db.collection.update_many({}, [{"$set": {"gs": {"$add": [{"$max": ["$ap", "$aap"]}, "$dp"]}}}]),
+        lambda db: db.collection.create_index([("class_pvp", 1), ("gs", -1)]),
+        lambda db: db.collection.create_index([("gs", 1)]),
+    ]),
+    (6, 'Índice para paginação do ranking por (gs, _id)', [
+        lambda db: db.collection.create_index([("gs", -1), ("_id", -1)]),
+    ]),
+    (7, 'Resumo do histórico por personagem (primeiro/atual/maior GS, atualizações)', [
+        lambda db: db.history_summary_collection.create_index([("user_id", 1), ("class_pvp", 1)], unique=True),
+        # Preencher a partir do histórico existente
+        lambda db: db.history_collection.aggregate([
+            {"$sort": {"created_at": 1, "_id": 1}},
+            {
+                "$group": {
+                    "_id": {"user_id": "$user_id", "class_pvp": "$class_pvp"},
+                    "first_gs": {"$first": "$total_gs"},
+                    "current_gs": {"$last": "$total_gs"},
+                    "peak_gs": {"$max": "$total_gs"},
+                    "updates": {"$sum": 1},
+                    "first_update": {"$first": "$created_at"},
+                    "last_update": {"$last": "$created_at"}
+                }
+            },
+            {"$addFields": {"user_id": "$_id.user_id", "class_pvp": "$_id.class_pvp"}},
+            {"$project": {"_id": 0}},
+            {
+                "$merge": {
+                    "into": "gearscore_history_summary",
+                    "on": ["user_id", "class_pvp"],
+                    "whenMatched": "keepExisting",
+                    "whenNotMatched": "insert"
+                }
+            }
+        ], allowDiskUse=True),
+    ]),
+]
+
+
+# Função helper para filtrar um pipeline pelos membros da guilda (lookup indexado em guild_members)
+def _guild_member_stages(guild_id):
+    return [
+        {
+            "$lookup": {
+                "from": "guild_members",
+                "localField": "user_id",
+                "foreignField": "user_id",
+                "pipeline": [{"$match": {"guild_id": str(guild_id)}}, {"$project": {"_id": 1}}],
+                "as": "_guild_member"
+            }
+        },
+        {"$match": {"_guild_member": {"$ne": []}}},
+        {"$project": {"_guild_member": 0}}
+    ]
+
+
+# Função helper para calcular a progressão de um personagem a partir do seu histórico (ordenado por data)
+def _progression_from_history(doc, history, now):
+    gs = max(doc.get("ap", 0), doc.get("aap", 0)) + doc.get("dp", 0)
+    
+    def gs_at(cutoff):
+        # Entrada em vigor no início da janela; se o personagem é mais novo, a primeira registrada
+        previous = [entry["total_gs"] for entry in history if entry["created_at"] <= cutoff]
+        return previous[-1] if previous else history[0]["total_gs"]
+    
+    def updates_since(cutoff):
+        return sum(1 for entry in history if entry["created_at"] > cutoff)
+    
+    last_change = doc.get("updated_at")
+    if history:
+        changes = [
+            entry["created_at"] for i, entry in enumerate(history)
+            if i == 0 or entry["total_gs"] != history[i - 1]["total_gs"]
+        ]
+        last_change = changes[-1]
+    
+    c7, c30, c90 = now - timedelta(days=7), now - timedelta(days=30), now - timedelta(days=90)
+    return ProgressionStats.from_document({
+        "user_id": doc.get("user_id"),
+        "family_name": doc.get("family_name"),
+        "class_pvp": doc.get("class_pvp"),
+        "gs": gs,
+        "delta_7d": gs - gs_at(c7) if history else 0,
+        "delta_30d": gs - gs_at(c30) if history else 0,
+        "delta_90d": gs - gs_at(c90) if history else 0,
+        "updates_30d": updates_since(c30),
+        "updates_90d": updates_since(c90),
+        "last_change": last_change,
+        "updated_at": doc.get("updated_at"),
+    })
 
 class Database:
     def __init__(self):
-        self.client = MongoClient(MONGODB_URI)
+        self.client = MongoClient(MONGODB_URI, tz_aware=True)
         self.db = self.client[MONGODB_DB_NAME]
         self.collection = self.db['gearscore']
         self.history_collection = self.db['gearscore_history']
+        self.history_summary_collection = self.db['gearscore_history_summary']
+        self.eventos_collection = self.db['eventos']
+        self.participacoes_collection = self.db['participacoes']
+        self.guild_members_collection = self.db['guild_members']
         self.init_database()
     
     def init_database(self):
-        """Inicializa o banco de dados criando índices"""
-        # Criar índice único para user_id + class_pvp
-        self.collection.create_index(
-            [("user_id", 1), ("class_pvp", 1)],
-            unique=True
-        )
-        # Índice para histórico
-        self.history_collection.create_index(
-            [("user_id", 1), ("class_pvp", 1), ("created_at", -1)]
+        """Inicializa o banco de dados aplicando as migrações de schema pendentes (índices)"""
+        run_mongo_migrations(self, MIGRATIONS)
+    
+    def _record_history(self, user_id, class_pvp, ap, aap, dp):
+        """Grava uma entrada de histórico e atualiza o resumo do personagem"""
+        total_gs = max(ap, aap) + dp
+        now = utcnow()
+        self.history_collection.insert_one({
+            "user_id": user_id,
+            "class_pvp": class_pvp,
+            "ap": ap,
+            "aap": aap,
+            "dp": dp,
+            "total_gs": total_gs,
+            "created_at": now
+        })
+        self.history_summary_collection.update_one(
+            {"user_id": user_id, "class_pvp": class_pvp},
+            {
+                "$setOnInsert": {"first_gs": total_gs, "first_update": now},
+                "$set": {"current_gs": total_gs, "last_update": now},
+                "$max": {"peak_gs": total_gs},
+                "$inc": {"updates": 1}
+            },
+            upsert=True
         )
+        return total_gs
     
     def register_gearscore(self, user_id, family_name, class_pvp, ap, aap, dp, linkgear, character_name=None):
         """Registra um novo gearscore (primeira vez)"""
@@ -46,25 +188,16 @@ class Database:
             "ap": ap,
             "aap": aap,
             "dp": dp,
+            "gs": max(ap, aap) + dp,
             "linkgear": linkgear,
-            "updated_at": datetime.utcnow(),
+            "updated_at": utcnow(),
             "is_active": 1
         }
         
         self.collection.insert_one(document)
         
         # Salvar histórico
-        total_gs = max(ap, aap) + dp
-        history_doc = {
-            "user_id": user_id,
-            "class_pvp": class_pvp,
-            "ap": ap,
-            "aap": aap,
-            "dp": dp,
-            "total_gs": total_gs,
-            "created_at": datetime.utcnow()
-        }
-        self.history_collection.insert_one(history_doc)
+        self._record_history(user_id, class_pvp, ap, aap, dp)
     
     def get_user_current_data(self, user_id):
         """Retorna os dados atuais do usuário (family_name, character_name, class_pvp)"""
@@ -134,8 +267,9 @@ class Database:
             "ap": ap,
             "aap": aap,
             "dp": dp,
+            "gs": max(ap, aap) + dp,
             "linkgear": linkgear,
-            "updated_at": datetime.utcnow()
+            "updated_at": utcnow()
         }
         # Manter is_active se já existir, senão definir como 1
         existing = self.collection.find_one({"user_id": user_id, "class_pvp": class_pvp})
@@ -151,17 +285,7 @@ class Database:
         )
         
         # Salvar histórico
-        total_gs = max(ap, aap) + dp
-        history_doc = {
-            "user_id": user_id,
-            "class_pvp": class_pvp,
-            "ap": ap,
-            "aap": aap,
-            "dp": dp,
-            "total_gs": total_gs,
-            "created_at": datetime.utcnow()
-        }
-        self.history_collection.insert_one(history_doc)
+        self._record_history(user_id, class_pvp, ap, aap, dp)
     
     def get_gearscore(self, user_id, class_pvp=None):
         """Busca o gearscore de um usuário"""
@@ -170,60 +294,56 @@ class Database:
                 "user_id": user_id,
                 "class_pvp": class_pvp
             })
-            return [result] if result else []
+            return [GearscoreRecord.from_document(result)] if result else []
         else:
-            results = list(self.collection.find(
-                {"user_id": user_id}
-            ).sort("updated_at", -1))
-            return results
+            cursor = self.collection.find({"user_id": user_id}).sort("updated_at", -1)
+            return [GearscoreRecord.from_document(doc) for doc in cursor]
     
     def get_user_current_class(self, user_id):
         """Retorna a classe atual do usuário"""
         result = self.collection.find_one({"user_id": user_id})
         return result.get("class_pvp") if result else None
     
-    def get_all_gearscores(self, valid_user_ids=None):
+    def get_all_gearscores(self, valid_user_ids=None, guild_id=None):
         """
         Busca todos os gearscores
         
         Args:
             valid_user_ids: Set ou lista de user_ids válidos (que têm o cargo da guilda).
                            Se None, retorna todos os registros.
+            guild_id: Se informado, filtra pelos membros da guilda na coleção guild_members
         """
+        if guild_id is not None:
+            pipeline = _guild_member_stages(guild_id) + [{"$sort": {"updated_at": -1}}]
+            return [GearscoreRecord.from_document(doc) for doc in self.collection.aggregate(pipeline)]
+        
         query = {}
         if valid_user_ids:
             query = {"user_id": {"$in": list(valid_user_ids)}}
         
-        results = list(self.collection.find(query).sort("updated_at", -1))
-        return results
+        cursor = self.collection.find(query).sort("updated_at", -1)
+        return [GearscoreRecord.from_document(doc) for doc in cursor]
     
-    def get_class_statistics(self, valid_user_ids=None):
+    def get_class_statistics(self, valid_user_ids=None, guild_id=None):
         """
         Retorna estatísticas por classe
         
         Args:
             valid_user_ids: Set ou lista de user_ids válidos (que têm o cargo da guilda).
                            Se None, retorna todos os registros.
+            guild_id: Se informado, filtra pelos membros da guilda na coleção guild_members
         """
         pipeline = []
         
-        # Adicionar filtro de user_ids se fornecido
-        if valid_user_ids:
+        # Adicionar filtro de membros da guilda / user_ids se fornecido
+        if guild_id is not None:
+            pipeline.extend(_guild_member_stages(guild_id))
+        elif valid_user_ids:
             pipeline.append({
                 "$match": {"user_id": {"$in": list(valid_user_ids)}}
             })
         
         pipeline.extend([
-            {
-                "$addFields": {
-                    "gs": {
-                        "$add": [
-                            {"$max": ["$ap", "$aap"]},
-                            "$dp"
-                        ]
-                    }
-                }
-            },
             {
                 "$group": {
                     "_id": "$class_pvp",
@@ -248,10 +368,9 @@ class Database:
             {"$sort": {"total": -1, "avg_gs": -1}}
         ])
         
-        results = list(self.collection.aggregate(pipeline))
-        return results
+        return [ClassStatistics.from_document(doc) for doc in self.collection.aggregate(pipeline)]
     
-    def get_class_members(self, class_pvp, valid_user_ids=None):
+    def get_class_members(self, class_pvp, valid_user_ids=None, guild_id=None):
         """
         Retorna todos os membros de uma classe específica
         
@@ -259,32 +378,84 @@ class Database:
             class_pvp: Nome da classe
             valid_user_ids: Set ou lista de user_ids válidos (que têm o cargo da guilda).
                            Se None, retorna todos os registros.
+            guild_id: Se informado, filtra pelos membros da guilda na coleção guild_members
         """
-        # Ordenar por GS (MAX(AP, AAP) + DP)
+        # Ordenar por GS (campo gs, mantido na escrita)
         match_conditions = {"class_pvp": class_pvp}
         
-        if valid_user_ids:
+        if valid_user_ids and guild_id is None:
             match_conditions["user_id"] = {"$in": list(valid_user_ids)}
         
-        pipeline = [
-            {"$match": match_conditions},
-            {
-                "$addFields": {
-                    "gs": {
-                        "$add": [
-                            {"$max": ["$ap", "$aap"]},
-                            "$dp"
-                        ]
-                    }
-                }
-            },
-            {"$sort": {"gs": -1}}
-        ]
+        # Ordenar antes do filtro de membros para usar o índice (class_pvp, gs)
+        pipeline = [{"$match": match_conditions}, {"$sort": {"gs": -1}}]
+        if guild_id is not None:
+            pipeline.extend(_guild_member_stages(guild_id))
+        return [GearscoreRecord.from_document(doc) for doc in self.collection.aggregate(pipeline)]
+    
+    def get_gs_summary(self, guild_id=None):
+        """
+        Retorna (quantidade de registros, soma do GS), opcionalmente só dos membros da guilda
+        (coleção guild_members). Usado para calcular o GS médio sem trazer os registros.
+        """
+        pipeline = _guild_member_stages(guild_id) if guild_id is not None else []
+        pipeline.append({"$group": {"_id": None, "total": {"$sum": 1}, "soma": {"$sum": "$gs"}}})
         results = list(self.collection.aggregate(pipeline))
-        # Remover campo calculado antes de retornar
-        for result in results:
-            result.pop('gs', None)
-        return results
+        if not results:
+            return 0, 0
+        return results[0].get("total", 0), results[0].get("soma", 0)
+    
+    def get_gearscores_below(self, max_gs, guild_id=None):
+        """Retorna os registros com GS menor que max_gs, do menor para o maior (varredura no índice de gs)"""
+        pipeline = [{"$match": {"gs": {"$lt": max_gs}}}, {"$sort": {"gs": 1}}]
+        if guild_id is not None:
+            pipeline.extend(_guild_member_stages(guild_id))
+        return [GearscoreRecord.from_document(doc) for doc in self.collection.aggregate(pipeline)]
+    
+    def get_gearscores_page(self, guild_id=None, limit=10, after=None):
+        """
+        Página do ranking por GS (maior primeiro), com paginação por keyset.
+        after: (gs, _id) do último registro da página anterior (None = primeira página).
+        """
+        pipeline = []
+        if after is not None:
+            after_gs, after_id = after
+            pipeline.append({"$match": {"$or": [
+                {"gs": {"$lt": after_gs}},
+                {"gs": after_gs, "_id": {"$lt": after_id}}
+            ]}})
+        pipeline.append({"$sort": {"gs": -1, "_id": -1}})
+        if guild_id is not None:
+            pipeline.extend(_guild_member_stages(guild_id))
+        pipeline.append({"$limit": limit})
+        return [GearscoreRecord.from_document(doc) for doc in self.collection.aggregate(pipeline)]
+    
+    def sync_guild_members(self, guild_id, user_ids):
+        """
+        Substitui os membros da guilda na coleção guild_members pelo conjunto informado
+        (só grava a diferença). Retorna (adicionados, removidos).
+        """
+        guild_id = str(guild_id)
+        user_ids = {str(user_id) for user_id in user_ids}
+        current = {doc["user_id"] for doc in self.guild_members_collection.find({"guild_id": guild_id}, {"user_id": 1})}
+        to_add = user_ids - current
+        to_remove = current - user_ids
+        
+        if to_add:
+            self.guild_members_collection.insert_many(
+                [{"guild_id": guild_id, "user_id": user_id} for user_id in to_add],
+                ordered=False
+            )
+        if to_remove:
+            self.guild_members_collection.delete_many({"guild_id": guild_id, "user_id": {"$in": list(to_remove)}})
+        return len(to_add), len(to_remove)
+    
+    def set_guild_member(self, guild_id, user_id, is_member):
+        """Inclui/exclui um usuário da coleção guild_members (ganhou/perdeu o cargo da guilda)"""
+        member = {"guild_id": str(guild_id), "user_id": str(user_id)}
+        if is_member:
+            self.guild_members_collection.update_one(member, {"$setOnInsert": member}, upsert=True)
+        else:
+            self.guild_members_collection.delete_one(member)
     
     def get_user_history(self, user_id, class_pvp=None):
         """Retorna histórico de progressão de um usuário"""
@@ -296,77 +467,185 @@ class Database:
         return results
     
     def get_user_progress(self, user_id, class_pvp):
-        """Calcula progressão de um personagem"""
-        pipeline = [
-            {"$match": {"user_id": user_id, "class_pvp": class_pvp}},
-            {
-                "$group": {
-                    "_id": None,
-                    "first_gs": {"$min": "$total_gs"},
-                    "current_gs": {"$max": "$total_gs"},
-                    "updates": {"$sum": 1},
-                    "first_update": {"$min": "$created_at"},
-                    "last_update": {"$max": "$created_at"}
-                }
-            },
+        """Progressão de um personagem, lida do resumo mantido a cada registro/atualização"""
+        summary = self.history_summary_collection.find_one(
+            {"user_id": user_id, "class_pvp": class_pvp},
+            {"_id": 0, "user_id": 0, "class_pvp": 0}
+        )
+        if not summary:
+            return None
+        summary["progress"] = summary["current_gs"] - summary["first_gs"]
+        return summary
+    
+    def get_progression_analytics(self, guild_id=None, now=None):
+        """
+        Progressão de todos os personagens (classe atual) em uma única agregação: variação de GS
+        em 7/30/90 dias, atualizações em 30/90 dias e a última vez que o GS mudou.
+        O histórico de cada personagem vem junto pelo $lookup (índice user_id + class_pvp + created_at).
+        Retorna [ProgressionStats].
+        """
+        now = now or utcnow()
+        pipeline = []
+        if guild_id is not None:
+            pipeline.extend(_guild_member_stages(guild_id))
+        pipeline.extend([
+            {"$sort": {"gs": -1, "_id": -1}},
             {
-                "$project": {
-                    "first_gs": 1,
-                    "current_gs": 1,
-                    "progress": {"$subtract": ["$current_gs", "$first_gs"]},
-                    "updates": 1,
-                    "first_update": 1,
-                    "last_update": 1,
-                    "_id": 0
+                "$lookup": {
+                    "from": "gearscore_history",
+                    "let": {"user_id": "$user_id", "class_pvp": "$class_pvp"},
+                    "pipeline": [
+                        {"$match": {"$expr": {"$and": [
+                            {"$eq": ["$user_id", "$$user_id"]},
+                            {"$eq": ["$class_pvp", "$$class_pvp"]}
+                        ]}}},
+                        {"$sort": {"created_at": 1, "_id": 1}},
+                        {"$project": {"_id": 0, "total_gs": 1, "created_at": 1}}
+                    ],
+                    "as": "history"
                 }
             }
+        ])
+        return [
+            _progression_from_history(doc, doc.get("history", []), now)
+            for doc in self.collection.aggregate(pipeline, allowDiskUse=True)
         ]
-        result = list(self.history_collection.aggregate(pipeline))
-        return result[0] if result else None
     
-    def get_user_history(self, user_id, character_name=None):
-        """Retorna histórico de progressão de um usuário"""
-        query = {"user_id": user_id}
-        if character_name:
-            query["character_name"] = character_name
-        
-        results = list(self.history_collection.find(query).sort("created_at", -1).limit(50))
-        return results
-    
-    def get_user_progress(self, user_id, character_name):
-        """Calcula progressão de um personagem"""
+    def compact_gearscore_history(self, weekly_before, monthly_before):
+        """
+        Reduz o histórico antigo à última entrada de cada período, por personagem:
+        entradas anteriores a monthly_before ficam uma por mês; entre monthly_before e
+        weekly_before, uma por semana. O resumo (primeiro/maior GS, atualizações) não muda.
+        Retorna a quantidade de entradas removidas.
+        """
         pipeline = [
-            {"$match": {"user_id": user_id, "character_name": character_name}},
+            {"$match": {"created_at": {"$lt": weekly_before}}},
+            {"$sort": {"created_at": -1, "_id": -1}},
             {
                 "$group": {
-                    "_id": None,
-                    "first_gs": {"$min": "$total_gs"},
-                    "current_gs": {"$max": "$total_gs"},
-                    "updates": {"$sum": 1},
-                    "first_update": {"$min": "$created_at"},
-                    "last_update": {"$max": "$created_at"}
+                    "_id": {
+                        "user_id": "$user_id",
+                        "class_pvp": "$class_pvp",
+                        "periodo": {
+                            "$cond": [
+                                {"$lt": ["$created_at", monthly_before]},
+                                {"$dateToString": {"format": "M%Y-%m", "date": "$created_at"}},
+                                {"$dateToString": {"format": "W%G-%V", "date": "$created_at"}}
+                            ]
+                        }
+                    },
+                    "ids": {"$push": "$_id"}
                 }
             },
-            {
-                "$project": {
-                    "first_gs": 1,
-                    "current_gs": 1,
-                    "progress": {"$subtract": ["$current_gs", "$first_gs"]},
-                    "updates": 1,
-                    "first_update": 1,
-                    "last_update": 1,
-                    "_id": 0
-                }
-            }
+            {"$match": {"ids.1": {"$exists": True}}},
+            {"$project": {"_id": 0, "remover": {"$slice": ["$ids", 1, {"$size": "$ids"}]}}}
         ]
-        result = list(self.history_collection.aggregate(pipeline))
-        return result[0] if result else None
+        
+        deleted_count = 0
+        batch = []
+        for group in self.history_collection.aggregate(pipeline, allowDiskUse=True):
+            batch.extend(group["remover"])
+            if len(batch) >= 1000:
+                deleted_count += self.history_collection.delete_many({"_id": {"$in": batch}}).deleted_count
+                batch = []
+        if batch:
+            deleted_count += self.history_collection.delete_many({"_id": {"$in": batch}}).deleted_count
+        return deleted_count
+    
+    def get_gearscore_by_family_name(self, family_name):
+        """Busca o gearscore de um usuário pelo nome de família (case-insensitive)"""
+        results = list(self.collection.find(
+            {"family_name": family_name.strip()}
+        ).collation(FAMILY_NAME_COLLATION).limit(1))
+        return GearscoreRecord.from_document(results[0]) if results else None
+    
+    def get_gearscores_by_family_names(self, family_names):
+        """
+        Busca o gearscore de múltiplos usuários pelos nomes de família.
+        Uma única consulta $in com a collation do índice case-insensitive.
+        Retorna: {nome.strip().lower(): registro}
+        """
+        names = list(dict.fromkeys(name.strip() for name in family_names if name and name.strip()))
+        if not names:
+            return {}
+        
+        rows_by_name = {}
+        cursor = self.collection.find(
+            {"family_name": {"$in": names}}
+        ).collation(FAMILY_NAME_COLLATION).sort("_id", 1)
+        for doc in cursor:
+            rows_by_name.setdefault(doc.get("family_name", "").lower(), GearscoreRecord.from_document(doc))
+        
+        results = {}
+        for name in names:
+            doc = rows_by_name.get(name.lower())
+            if doc:
+                results[name.lower()] = doc
+        return results
+    
+    def get_family_names_by_user_ids(self, user_ids):
+        """
+        Busca o nome de família de vários usuários de uma vez (ex: todos de um canal de voz).
+        Retorna: {user_id: family_name} (apenas usuários com registro)
+        """
+        user_ids = list(dict.fromkeys(str(uid) for uid in user_ids))
+        if not user_ids:
+            return {}
+        
+        family_names = {}
+        cursor = self.collection.find(
+            {"user_id": {"$in": user_ids}},
+            {"user_id": 1, "family_name": 1, "_id": 0}
+        )
+        for doc in cursor:
+            family_names.setdefault(doc["user_id"], doc.get("family_name"))
+        return family_names
+    
+    # ============================================
+    # MÉTODOS PARA EVENTOS E PARTICIPAÇÕES
+    # ============================================
+    
+    def registrar_evento(self, tipo, nome, canal_voz, criado_por, criado_por_nome, participantes):
+        """
+        Registra um evento e suas participações.
+        participantes: lista de dicts com {user_id, family_name, display_name}
+        Retorna: (evento_id, quantidade_participantes)
+        """
+        # Determinar mês de referência (formato: YYYY-MM)
+        mes_referencia = datetime.now().strftime("%Y-%m")
+        
+        result = self.eventos_collection.insert_one({
+            "tipo": tipo,
+            "nome": nome,
+            "canal_voz": canal_voz,
+            "criado_por": criado_por,
+            "criado_por_nome": criado_por_nome,
+            "mes_referencia": mes_referencia,
+            "created_at": utcnow()
+        })
+        evento_id = result.inserted_id
+        
+        # Inserir participações (todas de uma vez)
+        if participantes:
+            self.participacoes_collection.insert_many([
+                {
+                    "evento_id": evento_id,
+                    "user_id": p['user_id'],
+                    "family_name": p.get('family_name'),
+                    "display_name": p.get('display_name'),
+                    "created_at": utcnow()
+                }
+                for p in participantes
+            ], ordered=False)
+        
+        return str(evento_id), len(participantes)
     
     def clear_all_data(self):
         """Limpa todos os dados do banco (gearscore e histórico)"""
         try:
             # Limpar histórico
             self.history_collection.delete_many({})
+            self.history_summary_collection.delete_many({})
             # Limpar gearscore
             self.collection.delete_many({})
             return True, "Todos os dados foram limpos com sucesso!"
@@ -378,6 +657,7 @@ class Database:
         try:
             result = self.history_collection.delete_many({})
             deleted_count = result.deleted_count
+            self.history_summary_collection.delete_many({})
             return True, f"Histórico limpo! {deleted_count} registro(s) removido(s)."
         except Exception as e:
             return False, f"Erro ao limpar histórico: {str(e)}"
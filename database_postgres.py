@@ -3,642 +3,846 @@ Versão do banco de dados usando PostgreSQL (Supabase, Railway, Neon, etc.)
 Instale: pip install psycopg2-binary
 """
 import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import execute_values
 import os
-from config import DATABASE_URL
+import threading
+import time
+from datetime import datetime, timedelta
+from config import (
+    DATABASE_URL,
+    POSTGRES_POOL_MIN_SIZE,
+    POSTGRES_POOL_MAX_SIZE,
+    POSTGRES_POOL_TIMEOUT,
+    POSTGRES_POOL_MAX_IDLE,
+    POSTGRES_POOL_HEALTHCHECK_INTERVAL,
+    CENSO_CACHE_TTL,
+    EVENTOS_CLEANUP_BATCH_SIZE,
+)
+from censo_cache import CensoAtivoCache
+from migrations import run_sql_migrations
+from records import GearscoreRecord, ClassStatistics, ProgressionStats, ParticipationRow
+from timestamps import UTC, to_utc_naive, utcnow
 
-class Database:
-    def __init__(self):
-        self.db_url = DATABASE_URL
-        self.init_database()
+# Colunas de data são TIMESTAMPTZ (migração 9) e já voltam com timezone; datetimes passados como
+# parâmetro são gravados em UTC com o offset explícito (datetimes sem timezone são considerados UTC)
+psycopg2.extensions.register_adapter(
+    datetime, lambda value: psycopg2.extensions.QuotedString(to_utc_naive(value).replace(tzinfo=UTC).isoformat(' '))
+)
+
+# Entrada de histórico e upsert do resumo por personagem (parâmetros nomeados: user_id, class_pvp,
+# ap, aap, dp, total_gs). Usados tanto pelo _record_history quanto pelo CTE do update_gearscore.
+HISTORY_INSERT_SQL = '''
+    INSERT INTO gearscore_history 
+    (user_id, class_pvp, ap, aap, dp, total_gs, created_at)
+    VALUES (%(user_id)s, %(class_pvp)s, %(ap)s, %(aap)s, %(dp)s, %(total_gs)s, CURRENT_TIMESTAMP)
+'''
+
+HISTORY_SUMMARY_UPSERT_SQL = '''
+    INSERT INTO gearscore_history_summary 
+    (user_id, class_pvp, first_gs, current_gs, peak_gs, updates, first_update, last_update)
+    VALUES (%(user_id)s, %(class_pvp)s, %(total_gs)s, %(total_gs)s, %(total_gs)s, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT (user_id, class_pvp) DO UPDATE SET 
+        current_gs = EXCLUDED.current_gs,
+        peak_gs = GREATEST(gearscore_history_summary.peak_gs, EXCLUDED.peak_gs),
+        updates = gearscore_history_summary.updates + 1,
+        last_update = EXCLUDED.last_update
+'''
+
+# Função helper para gravar uma entrada de histórico e atualizar o resumo do personagem na mesma transação
+def _record_history(cursor, user_id, class_pvp, ap, aap, dp):
+    total_gs = max(ap, aap) + dp
+    cursor.execute(HISTORY_INSERT_SQL + ';' + HISTORY_SUMMARY_UPSERT_SQL, {
+        'user_id': user_id,
+        'class_pvp': class_pvp,
+        'ap': ap,
+        'aap': aap,
+        'dp': dp,
+        'total_gs': total_gs,
+    })
+    return total_gs
+
+# Chave do advisory lock que serializa migrações de instâncias iniciando ao mesmo tempo
+SCHEMA_MIGRATION_LOCK_ID = 7310421
+
+# Migrações de schema em ordem (ver migrations.py). Nunca altere uma migração já publicada;
+# adicione uma nova versão no final.
+MIGRATIONS = [
+    (1, 'Estrutura inicial (gearscore, histórico, eventos e censo)', [
+        '''
+            CREATE TABLE IF NOT EXISTS gearscore (
+                id SERIAL PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                family_name TEXT NOT NULL,
+                character_name TEXT,
+                class_pvp TEXT NOT NULL,
+                ap INTEGER NOT NULL,
+                aap INTEGER NOT NULL,
+                dp INTEGER NOT NULL,
+                linkgear TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(user_id, class_pvp)
+            )
+        ''',
+        # Bancos da estrutura antiga (UNIQUE por user_id + character_name, sem class_pvp)
+        'ALTER TABLE gearscore DROP CONSTRAINT IF EXISTS gearscore_user_id_character_name_key',
+        'ALTER TABLE gearscore ADD COLUMN IF NOT EXISTS class_pvp TEXT',
+        "UPDATE gearscore SET class_pvp = 'Unknown' WHERE class_pvp IS NULL",
+        'ALTER TABLE gearscore ALTER COLUMN class_pvp SET NOT NULL',
+        'ALTER TABLE gearscore ADD COLUMN IF NOT EXISTS character_name TEXT',
+        'ALTER TABLE gearscore ALTER COLUMN character_name DROP NOT NULL',
+        '''
+            CREATE UNIQUE INDEX IF NOT EXISTS gearscore_user_id_class_pvp_key 
+            ON gearscore(user_id, class_pvp)
+        ''',
+        # Tabela de histórico para rastrear progressão
+        '''
+            CREATE TABLE IF NOT EXISTS gearscore_history (
+                id SERIAL PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                class_pvp TEXT NOT NULL,
+                ap INTEGER NOT NULL,
+                aap INTEGER NOT NULL,
+                dp INTEGER NOT NULL,
+                total_gs INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        "ALTER TABLE gearscore_history ADD COLUMN IF NOT EXISTS class_pvp TEXT DEFAULT 'Unknown'",
+        'ALTER TABLE gearscore_history ALTER COLUMN class_pvp SET NOT NULL',
+        'ALTER TABLE gearscore_history ALTER COLUMN class_pvp DROP DEFAULT',
+        'ALTER TABLE gearscore_history DROP COLUMN IF EXISTS character_name',
+        'DROP INDEX IF EXISTS idx_history_user_char',
+        '''
+            CREATE INDEX IF NOT EXISTS idx_history_user_class 
+            ON gearscore_history(user_id, class_pvp, created_at)
+        ''',
+        # Tabela de eventos (GvG, Treino, etc)
+        '''
+            CREATE TABLE IF NOT EXISTS eventos (
+                id SERIAL PRIMARY KEY,
+                tipo TEXT NOT NULL,
+                nome TEXT NOT NULL,
+                canal_voz TEXT,
+                criado_por TEXT NOT NULL,
+                criado_por_nome TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                mes_referencia TEXT NOT NULL
+            )
+        ''',
+        # Tabela de participações em eventos
+        '''
+            CREATE TABLE IF NOT EXISTS participacoes (
+                id SERIAL PRIMARY KEY,
+                evento_id INTEGER NOT NULL REFERENCES eventos(id),
+                user_id TEXT NOT NULL,
+                family_name TEXT,
+                display_name TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS idx_eventos_mes 
+            ON eventos(mes_referencia, tipo)
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS idx_participacoes_evento 
+            ON participacoes(evento_id, user_id)
+        ''',
+        # Tabela de eventos de censo
+        '''
+            CREATE TABLE IF NOT EXISTS censo_events (
+                id SERIAL PRIMARY KEY,
+                nome TEXT NOT NULL,
+                data_limite TIMESTAMP NOT NULL,
+                criado_por TEXT NOT NULL,
+                criado_por_nome TEXT,
+                ativo BOOLEAN DEFAULT TRUE,
+                campos_json JSONB,
+                exemplos_json JSONB,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        'ALTER TABLE censo_events ADD COLUMN IF NOT EXISTS campos_json JSONB',
+        'ALTER TABLE censo_events ADD COLUMN IF NOT EXISTS exemplos_json JSONB',
+        # Tabela de respostas do censo
+        '''
+            CREATE TABLE IF NOT EXISTS censo_responses (
+                id SERIAL PRIMARY KEY,
+                censo_id INTEGER NOT NULL REFERENCES censo_events(id) ON DELETE CASCADE,
+                user_id TEXT NOT NULL,
+                family_name TEXT,
+                dados_json JSONB NOT NULL,
+                preenchido_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(censo_id, user_id)
+            )
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS idx_censo_events_ativo 
+            ON censo_events(ativo, data_limite)
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS idx_censo_responses_censo 
+            ON censo_responses(censo_id, user_id)
+        ''',
+    ]),
+    (2, 'Índice case-insensitive por nome de família', [
+        '''
+            CREATE INDEX IF NOT EXISTS idx_gearscore_family_lower 
+            ON gearscore(LOWER(family_name))
+        ''',
+    ]),
+    (3, 'Tabela de membros com cargo da guilda (sincronizada do índice de membros)', [
+        '''
+            CREATE TABLE IF NOT EXISTS guild_members (
+                guild_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                PRIMARY KEY (guild_id, user_id)
+            )
+        ''',
+    ]),
+    (4, 'Coluna gerada gs (GREATEST(ap, aap) + dp) com índices', [
+        '''
+            ALTER TABLE gearscore 
+            ADD COLUMN IF NOT EXISTS gs INTEGER GENERATED ALWAYS AS (GREATEST(ap, aap) + dp) STORED
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS idx_gearscore_class_gs 
+            ON gearscore(class_pvp, gs DESC)
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS idx_gearscore_gs 
+            ON gearscore(gs)
+        ''',
+    ]),
+    (5, 'Índice para paginação do ranking por (gs, id)', [
+        '''
+            CREATE INDEX IF NOT EXISTS idx_gearscore_gs_id 
+            ON gearscore(gs DESC, id DESC)
+        ''',
+    ]),
+    (6, 'Resumo do histórico por personagem (primeiro/atual/maior GS, atualizações)', [
+        '''
+            CREATE TABLE IF NOT EXISTS gearscore_history_summary (
+                user_id TEXT NOT NULL,
+                class_pvp TEXT NOT NULL,
+                first_gs INTEGER NOT NULL,
+                current_gs INTEGER NOT NULL,
+                peak_gs INTEGER NOT NULL,
+                updates INTEGER NOT NULL,
+                first_update TIMESTAMP,
+                last_update TIMESTAMP,
+                PRIMARY KEY (user_id, class_pvp)
+            )
+        ''',
+        # Preencher a partir do histórico existente
+        '''
+            INSERT INTO gearscore_history_summary 
+            (user_id, class_pvp, first_gs, current_gs, peak_gs, updates, first_update, last_update)
+            SELECT user_id, class_pvp,
+                (ARRAY_AGG(total_gs ORDER BY created_at, id))[1],
+                (ARRAY_AGG(total_gs ORDER BY created_at DESC, id DESC))[1],
+                MAX(total_gs), COUNT(*), MIN(created_at), MAX(created_at)
+            FROM gearscore_history
+            GROUP BY user_id, class_pvp
+            ON CONFLICT (user_id, class_pvp) DO NOTHING
+        ''',
+    ]),
+    (7, 'Resumo mensal de eventos e participações (consolidado antes da limpeza mensal)', [
+        '''
+            CREATE TABLE IF NOT EXISTS eventos_mensal (
+                mes_referencia TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                PRIMARY KEY (mes_referencia, tipo)
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS participacoes_mensal (
+                mes_referencia TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                display_name TEXT,
+                family_name TEXT,
+                PRIMARY KEY (mes_referencia, user_id, tipo)
+            )
+        ''',
+    ]),
+    (8, 'Índices cobrindo eventos e participacoes para o relatório de participação', [
+        '''
+            CREATE INDEX IF NOT EXISTS idx_eventos_mes_cobertura 
+            ON eventos(mes_referencia, tipo) INCLUDE (id)
+        ''',
+        'DROP INDEX IF EXISTS idx_eventos_mes',
+        '''
+            CREATE INDEX IF NOT EXISTS idx_participacoes_evento_cobertura 
+            ON participacoes(evento_id, user_id) INCLUDE (family_name, display_name)
+        ''',
+        'DROP INDEX IF EXISTS idx_participacoes_evento',
+    ]),
+    # Os valores antigos de TIMESTAMP foram gravados no horário da sessão (CURRENT_TIMESTAMP usa o TimeZone
+    # do banco), não necessariamente em UTC; a conversão interpreta cada um no fuso em que foi gravado.
+    # data_limite vinha do datetime de São Paulo do /censo, gravado sem o offset.
+    (9, 'Colunas de data como TIMESTAMPTZ, convertendo os valores gravados no fuso da sessão', [
+        f'''
+            ALTER TABLE {table} ALTER COLUMN {column} TYPE TIMESTAMPTZ
+            USING {column} AT TIME ZONE current_setting('TimeZone')
+        '''
+        for table, column in (
+            ('gearscore', 'updated_at'),
+            ('gearscore_history', 'created_at'),
+            ('gearscore_history_summary', 'first_update'),
+            ('gearscore_history_summary', 'last_update'),
+            ('eventos', 'created_at'),
+            ('participacoes', 'created_at'),
+            ('censo_events', 'created_at'),
+            ('censo_responses', 'preenchido_em'),
+            ('schema_version', 'applied_at'),
+        )
+    ] + [
+        '''
+            ALTER TABLE censo_events ALTER COLUMN data_limite TYPE TIMESTAMPTZ
+            USING data_limite AT TIME ZONE 'America/Sao_Paulo'
+        ''',
+    ]),
+]
+
+
+class PoolTimeoutError(Exception):
+    """Nenhuma conexão do pool ficou livre dentro do tempo limite"""
+    pass
+
+
+class PooledConnection:
+    """
+    Conexão emprestada do pool.
+    Repassa tudo para a conexão psycopg2 real; close() devolve ao pool em vez de fechar.
+    Use como context manager (with db.get_connection() as conn:) para devolver em qualquer caminho.
+    """
     
-    def get_connection(self):
-        """Retorna uma conexão com o banco de dados PostgreSQL"""
-        return psycopg2.connect(self.db_url)
+    def __init__(self, pool, raw_conn):
+        self._pool = pool
+        self._raw_conn = raw_conn
+        self._returned = False
     
-    def init_database(self):
-        """Inicializa o banco de dados criando a tabela se não existir"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # Verificar se a tabela gearscore existe
-            cursor.execute('''
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = 'gearscore'
-                )
-            ''')
-            result = cursor.fetchone()
-            table_exists = result[0] if result else False
-            
-            # Verificar e migrar tabela gearscore se necessário
-            has_character_name = None
-            if table_exists:
-                try:
-                    cursor.execute('''
-                        SELECT column_name 
-                        FROM information_schema.columns 
-                        WHERE table_name = 'gearscore' AND column_name = 'character_name'
-                    ''')
-                    has_character_name = cursor.fetchone()
-                except Exception:
-                    # Erro ao verificar coluna, fazer rollback
-                    has_character_name = None
-                    conn.rollback()
-            
-            if has_character_name:
-                # Migrar tabela gearscore: remover character_name, adicionar constraint nova
-                try:
-                    # Dropar constraint antiga se existir
-                    cursor.execute('''
-                        ALTER TABLE gearscore 
-                        DROP CONSTRAINT IF EXISTS gearscore_user_id_character_name_key
-                    ''')
-                    
-                    # Adicionar coluna class_pvp se não existir (pode ter sido criada parcialmente)
-                    cursor.execute('''
-                        SELECT column_name 
-                        FROM information_schema.columns 
-                        WHERE table_name = 'gearscore' AND column_name = 'class_pvp'
-                    ''')
-                    if not cursor.fetchone():
-                        cursor.execute('''
-                            ALTER TABLE gearscore 
-                            ADD COLUMN class_pvp TEXT
-                        ''')
-                        # Atualizar class_pvp com valor padrão se necessário
-                        cursor.execute('''
-                            UPDATE gearscore 
-                            SET class_pvp = 'Unknown' 
-                            WHERE class_pvp IS NULL
-                        ''')
-                        cursor.execute('''
-                            ALTER TABLE gearscore 
-                            ALTER COLUMN class_pvp SET NOT NULL
-                        ''')
-                    
-                    # Remover coluna character_name
-                    cursor.execute('''
-                        ALTER TABLE gearscore 
-                        DROP COLUMN IF EXISTS character_name
-                    ''')
-                    
-                    # Adicionar constraint nova (se não existir)
-                    try:
-                        # Verificar se a constraint já existe
-                        cursor.execute('''
-                            SELECT constraint_name 
-                            FROM information_schema.table_constraints 
-                            WHERE table_name = 'gearscore' 
-                            AND constraint_name = 'gearscore_user_id_class_pvp_key'
-                        ''')
-                        constraint_exists = cursor.fetchone()
-                        
-                        if not constraint_exists:
-                            cursor.execute('''
-                                ALTER TABLE gearscore 
-                                ADD CONSTRAINT gearscore_user_id_class_pvp_key 
-                                UNIQUE (user_id, class_pvp)
-                            ''')
-                    except Exception as e:
-                        # Constraint já existe ou erro, fazer rollback e continuar
-                        print(f"Aviso ao adicionar constraint: {e}")
-                        conn.rollback()
-                except Exception as e:
-                    print(f"Aviso na migração de gearscore: {e}")
-                    conn.rollback()
-            
-            # Adicionar coluna character_name se não existir
+    def __getattr__(self, name):
+        return getattr(self._raw_conn, name)
+    
+    def close(self):
+        """Devolve a conexão ao pool (idempotente)"""
+        if self._returned:
+            return
+        self._returned = True
+        self._pool.putconn(self._raw_conn)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and not self._returned:
+            # Erro no meio do bloco: desfazer antes de devolver ao pool
             try:
-                cursor.execute('''
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'gearscore' AND column_name = 'character_name'
-                ''')
-                has_character_name = cursor.fetchone()
+                self._raw_conn.rollback()
             except Exception:
-                # Tabela pode não existir ainda
-                has_character_name = None
-                conn.rollback()
-            
-            if not has_character_name:
-                try:
-                    cursor.execute('''
-                        ALTER TABLE gearscore 
-                        ADD COLUMN character_name TEXT
-                    ''')
-                except Exception as e:
-                    print(f"Aviso ao adicionar character_name: {e}")
-                    conn.rollback()
-        except Exception as e:
-            print(f"Erro na inicialização: {e}")
-            conn.rollback()
-        
-        # Criar tabela gearscore com estrutura nova
-        try:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS gearscore (
-                    id SERIAL PRIMARY KEY,
-                    user_id TEXT NOT NULL,
-                    family_name TEXT NOT NULL,
-                    character_name TEXT,
-                    class_pvp TEXT NOT NULL,
-                    ap INTEGER NOT NULL,
-                    aap INTEGER NOT NULL,
-                    dp INTEGER NOT NULL,
-                    linkgear TEXT NOT NULL,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(user_id, class_pvp)
-                )
-            ''')
-        except Exception as e:
-            print(f"Aviso ao criar tabela gearscore: {e}")
-            conn.rollback()
-        
-        # Verificar se tabela gearscore_history existe
+                pass
+        self.close()
+        return False
+    
+    def __del__(self):
+        # Conexões esquecidas sem close() não podem ocupar uma vaga do pool para sempre
+        if getattr(self, '_returned', True):
+            return
         try:
-            cursor.execute('''
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = 'gearscore_history'
-                )
-            ''')
-            history_table_exists = cursor.fetchone()[0]
+            self.close()
         except Exception:
-            history_table_exists = False
-            conn.rollback()
-        
-        if history_table_exists:
-            # Verificar estrutura da tabela existente
-            cursor.execute('''
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_name = 'gearscore_history' AND column_name = 'character_name'
-            ''')
-            has_history_character_name = cursor.fetchone()
-            
-            cursor.execute('''
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_name = 'gearscore_history' AND column_name = 'class_pvp'
-            ''')
-            has_history_class_pvp = cursor.fetchone()
-            
-            if has_history_character_name and not has_history_class_pvp:
-                # Migrar tabela gearscore_history: estrutura antiga
-                try:
-                    # Adicionar coluna class_pvp
-                    cursor.execute('''
-                        ALTER TABLE gearscore_history 
-                        ADD COLUMN class_pvp TEXT DEFAULT 'Unknown'
-                    ''')
-                    cursor.execute('''
-                        ALTER TABLE gearscore_history 
-                        ALTER COLUMN class_pvp SET NOT NULL
-                    ''')
-                    cursor.execute('''
-                        ALTER TABLE gearscore_history 
-                        ALTER COLUMN class_pvp DROP DEFAULT
-                    ''')
-                    
-                    # Remover coluna character_name
-                    cursor.execute('''
-                        ALTER TABLE gearscore_history 
-                        DROP COLUMN IF EXISTS character_name
-                    ''')
-                    
-                    # Dropar índice antigo se existir
-                    try:
-                        cursor.execute('''
-                            DROP INDEX IF EXISTS idx_history_user_char
-                        ''')
-                    except:
-                        pass
-                except Exception as e:
-                    print(f"Aviso na migração de gearscore_history: {e}")
-        else:
-            # Criar tabela gearscore_history com estrutura nova
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS gearscore_history (
-                    id SERIAL PRIMARY KEY,
-                    user_id TEXT NOT NULL,
-                    class_pvp TEXT NOT NULL,
-                    ap INTEGER NOT NULL,
-                    aap INTEGER NOT NULL,
-                    dp INTEGER NOT NULL,
-                    total_gs INTEGER NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-        
-        # Criar índice (só se a coluna class_pvp existir)
-        try:
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_history_user_class 
-                ON gearscore_history(user_id, class_pvp, created_at)
-            ''')
-        except Exception as e:
-            print(f"Aviso ao criar índice: {e}")
-            conn.rollback()
-        
-        # Tabela de eventos (GvG, Treino, etc)
-        try:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS eventos (
-                    id SERIAL PRIMARY KEY,
-                    tipo TEXT NOT NULL,
-                    nome TEXT NOT NULL,
-                    canal_voz TEXT,
-                    criado_por TEXT NOT NULL,
-                    criado_por_nome TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    mes_referencia TEXT NOT NULL
-                )
-            ''')
-        except Exception as e:
-            print(f"Aviso ao criar tabela eventos: {e}")
-            conn.rollback()
+            pass
+
+
+class ConnectionPool:
+    """
+    Pool de conexões PostgreSQL com tamanho limitado.
+    - Mantém pelo menos min_size conexões abertas e nunca passa de max_size
+    - Quem pede conexão com o pool cheio espera até timeout segundos
+    - Conexões ociosas há mais de healthcheck_interval são testadas antes do uso
+    - Conexões extras (acima de min_size) ociosas há mais de max_idle são fechadas
+    - Conexões quebradas (fechadas ou em estado desconhecido) são descartadas
+    """
+    
+    def __init__(self, dsn, min_size=1, max_size=10, timeout=30.0, max_idle=300.0, healthcheck_interval=60.0):
+        self.dsn = dsn
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.healthcheck_interval = healthcheck_interval
+        
+        self._lock = threading.Condition()
+        self._idle = []  # [(conexão, timestamp em que ficou ociosa)]
+        self._in_use = 0
+        self._closed = False
+        
+        # Estatísticas
+        self._stats = {
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'connections_recycled': 0,
+            'requests': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0,
+            'max_in_use': 0,
+        }
         
-        # Tabela de participações em eventos
+        for _ in range(self.min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+    
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        with self._lock:
+            self._stats['connections_created'] += 1
+        return conn
+    
+    def _discard(self, conn):
+        with self._lock:
+            self._stats['connections_discarded'] += 1
         try:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS participacoes (
-                    id SERIAL PRIMARY KEY,
-                    evento_id INTEGER NOT NULL REFERENCES eventos(id),
-                    user_id TEXT NOT NULL,
-                    family_name TEXT,
-                    display_name TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-        except Exception as e:
-            print(f"Aviso ao criar tabela participacoes: {e}")
-            conn.rollback()
-        
-        # Índices para performance
+            conn.close()
+        except Exception:
+            pass
+    
+    def _is_healthy(self, conn):
+        """Executa um SELECT 1 para confirmar que a conexão ainda responde"""
         try:
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_eventos_mes 
-                ON eventos(mes_referencia, tipo)
-            ''')
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_participacoes_evento 
-                ON participacoes(evento_id, user_id)
-            ''')
-        except Exception as e:
-            print(f"Aviso ao criar índices de eventos: {e}")
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            cursor.close()
             conn.rollback()
-        
-        # Tabela de eventos de censo
-        try:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS censo_events (
-                    id SERIAL PRIMARY KEY,
-                    nome TEXT NOT NULL,
-                    data_limite TIMESTAMP NOT NULL,
-                    criado_por TEXT NOT NULL,
-                    criado_por_nome TEXT,
-                    ativo BOOLEAN DEFAULT TRUE,
-                    campos_json JSONB,
-                    exemplos_json JSONB,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Adicionar coluna campos_json se não existir (migração)
+            return True
+        except Exception:
+            return False
+    
+    def _recycle_idle(self, now):
+        """Fecha conexões extras ociosas há mais de max_idle (chamado com o lock)"""
+        if self.max_idle is None:
+            return
+        while len(self._idle) + self._in_use > self.min_size and self._idle:
+            conn, idle_since = self._idle[0]
+            if now - idle_since < self.max_idle:
+                break
+            self._idle.pop(0)
+            self._stats['connections_recycled'] += 1
             try:
-                cursor.execute('''
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'censo_events' AND column_name = 'campos_json'
-                ''')
-                if not cursor.fetchone():
-                    cursor.execute('''
-                        ALTER TABLE censo_events 
-                        ADD COLUMN campos_json JSONB
-                    ''')
-            except Exception as e:
-                print(f"Aviso ao adicionar campos_json: {e}")
-                conn.rollback()
+                conn.close()
+            except Exception:
+                pass
+    
+    def getconn(self):
+        """Retorna uma conexão do pool, esperando se todas estiverem em uso"""
+        started = time.monotonic()
+        deadline = started + self.timeout if self.timeout is not None else None
+        waited = False
+        
+        with self._lock:
+            if self._closed:
+                raise PoolTimeoutError("O pool de conexões foi fechado")
+            self._stats['requests'] += 1
             
-            # Adicionar coluna exemplos_json se não existir (migração)
-            try:
-                cursor.execute('''
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'censo_events' AND column_name = 'exemplos_json'
-                ''')
-                if not cursor.fetchone():
-                    cursor.execute('''
-                        ALTER TABLE censo_events 
-                        ADD COLUMN exemplos_json JSONB
-                    ''')
-            except Exception as e:
-                print(f"Aviso ao adicionar exemplos_json: {e}")
-                conn.rollback()
-        except Exception as e:
-            print(f"Aviso ao criar tabela censo_events: {e}")
-            conn.rollback()
+            while True:
+                now = time.monotonic()
+                self._recycle_idle(now)
+                
+                # Reutilizar a conexão ociosa mais recente (LIFO mantém as antigas expirando)
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    self._in_use += 1
+                    break
+                
+                # Abrir uma nova se ainda houver espaço
+                if self._in_use < self.max_size:
+                    self._in_use += 1
+                    conn, idle_since = None, None
+                    break
+                
+                # Pool saturado: esperar alguém devolver
+                if not waited:
+                    waited = True
+                    self._stats['waits'] += 1
+                remaining = deadline - now if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"Nenhuma conexão livre no pool após {self.timeout:.1f}s "
+                        f"({self._in_use}/{self.max_size} em uso)"
+                    )
+                self._lock.wait(remaining)
+            
+            wait_time = time.monotonic() - started
+            self._stats['total_wait_time'] += wait_time
+            self._stats['max_wait_time'] = max(self._stats['max_wait_time'], wait_time)
+            self._stats['max_in_use'] = max(self._stats['max_in_use'], self._in_use)
         
-        # Tabela de respostas do censo
+        # Conexão/health check fora do lock para não bloquear os outros
         try:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS censo_responses (
-                    id SERIAL PRIMARY KEY,
-                    censo_id INTEGER NOT NULL REFERENCES censo_events(id) ON DELETE CASCADE,
-                    user_id TEXT NOT NULL,
-                    family_name TEXT,
-                    dados_json JSONB NOT NULL,
-                    preenchido_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(censo_id, user_id)
-                )
-            ''')
-        except Exception as e:
-            print(f"Aviso ao criar tabela censo_responses: {e}")
-            conn.rollback()
+            if conn is not None:
+                broken = conn.closed != 0
+                if not broken and self.healthcheck_interval is not None and time.monotonic() - idle_since >= self.healthcheck_interval:
+                    broken = not self._is_healthy(conn)
+                if broken:
+                    self._discard(conn)
+                    conn = self._connect()
+            else:
+                conn = self._connect()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
         
-        # Índices para censo
-        try:
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_censo_events_ativo 
-                ON censo_events(ativo, data_limite)
-            ''')
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_censo_responses_censo 
-                ON censo_responses(censo_id, user_id)
-            ''')
-        except Exception as e:
-            print(f"Aviso ao criar índices de censo: {e}")
-            conn.rollback()
+        return PooledConnection(self, conn)
+    
+    def putconn(self, conn):
+        """Devolve uma conexão ao pool, descartando-a se estiver quebrada"""
+        keep = False
+        if not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    keep = False
+                else:
+                    if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                        # Transação pendente (leitura sem commit ou erro): descartar o que ficou aberto
+                        conn.rollback()
+                    keep = True
+            except Exception:
+                keep = False
         
-        try:
-            conn.commit()
-        except Exception as e:
-            print(f"Erro ao fazer commit: {e}")
-            conn.rollback()
-        finally:
-            cursor.close()
-            conn.close()
+        with self._lock:
+            self._in_use -= 1
+            if keep and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+            self._lock.notify()
+    
+    def closeall(self):
+        """Fecha todas as conexões ociosas e impede novos empréstimos"""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._lock.notify_all()
+    
+    def get_stats(self):
+        """Retorna um snapshot das estatísticas do pool"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_use'] = self._in_use
+            stats['idle'] = len(self._idle)
+            stats['min_size'] = self.min_size
+            stats['max_size'] = self.max_size
+            stats['saturation'] = self._in_use / self.max_size
+            stats['avg_wait_time'] = stats['total_wait_time'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+
+class Database:
+    def __init__(self):
+        self.db_url = DATABASE_URL
+        self.pool = ConnectionPool(
+            self.db_url,
+            min_size=POSTGRES_POOL_MIN_SIZE,
+            max_size=POSTGRES_POOL_MAX_SIZE,
+            timeout=POSTGRES_POOL_TIMEOUT,
+            max_idle=POSTGRES_POOL_MAX_IDLE,
+            healthcheck_interval=POSTGRES_POOL_HEALTHCHECK_INTERVAL,
+        )
+        self.censo_cache = CensoAtivoCache(ttl=CENSO_CACHE_TTL)
+        self.init_database()
+    
+    def get_connection(self):
+        """
+        Retorna uma conexão do pool.
+        Use with self.get_connection() as conn: — a conexão volta ao pool mesmo se a consulta falhar
+        (com rollback do que ficou pendente).
+        """
+        return self.pool.getconn()
+    
+    def get_pool_stats(self):
+        """Retorna estatísticas do pool de conexões (espera, saturação, conexões criadas/descartadas)"""
+        return self.pool.get_stats()
+    
+    def close(self):
+        """Fecha todas as conexões do pool"""
+        self.pool.closeall()
+    
+    def init_database(self):
+        """Inicializa o banco de dados aplicando as migrações de schema pendentes"""
+        with self.get_connection() as conn:
+            run_sql_migrations(
+                conn,
+                MIGRATIONS,
+                placeholder='%s',
+                lock_sql=f'SELECT pg_advisory_xact_lock({SCHEMA_MIGRATION_LOCK_ID})'
+            )
     
     def register_gearscore(self, user_id, family_name, class_pvp, ap, aap, dp, linkgear, character_name=None):
         """Registra um novo gearscore (primeira vez)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Verificar se já existe registro para esta classe
-        cursor.execute('''
-            SELECT class_pvp FROM gearscore 
-            WHERE user_id = %s AND class_pvp = %s
-        ''', (user_id, class_pvp))
-        existing = cursor.fetchone()
-        
-        if existing:
-            conn.close()
-            raise ValueError(f"Você já possui um registro para a classe {class_pvp}. Use /atualizar para modificar.")
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            # Verificar se já existe registro para esta classe
+            cursor.execute('''
+                SELECT class_pvp FROM gearscore 
+                WHERE user_id = %s AND class_pvp = %s
+            ''', (user_id, class_pvp))
+            existing = cursor.fetchone()
         
-        # Inserir novo registro
-        cursor.execute('''
-            INSERT INTO gearscore 
-            (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-        ''', (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear))
+            if existing:
+                raise ValueError(f"Você já possui um registro para a classe {class_pvp}. Use /atualizar para modificar.")
         
-        # Salvar histórico
-        total_gs = max(ap, aap) + dp
-        try:
+            # Inserir novo registro
             cursor.execute('''
-                INSERT INTO gearscore_history 
-                (user_id, class_pvp, ap, aap, dp, total_gs, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-            ''', (user_id, class_pvp, ap, aap, dp, total_gs))
-        except Exception as e:
-            print(f"⚠️ Erro ao salvar histórico no register: {e}")
-            # Não falhar o registro se o histórico falhar
+                INSERT INTO gearscore 
+                (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ''', (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear))
         
-        conn.commit()
-        cursor.close()
-        conn.close()
+            # Salvar histórico
+            _record_history(cursor, user_id, class_pvp, ap, aap, dp)
+        
+            conn.commit()
     
     def get_user_current_data(self, user_id):
         """Retorna os dados atuais do usuário (family_name, character_name, class_pvp)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT family_name, character_name, class_pvp FROM gearscore 
-            WHERE user_id = %s
-            LIMIT 1
-        ''', (user_id,))
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return result
-    
-    def update_gearscore(self, user_id, family_name=None, class_pvp=None, ap=None, aap=None, dp=None, linkgear=None, character_name=None):
-        """Atualiza o gearscore de um personagem (pode mudar de classe)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Buscar dados atuais
-        current_data = self.get_user_current_data(user_id)
-        if not current_data:
-            conn.close()
-            raise ValueError("Você ainda não possui um registro! Use /registro primeiro.")
-        
-        current_family_name, current_character_name, current_class_pvp = current_data
-        
-        # Se não forneceu classe_pvp, usar a atual
-        if class_pvp is None:
-            class_pvp = current_class_pvp
-        
-        # Usar valores atuais se não fornecidos
-        if family_name is None:
-            family_name = current_family_name
-        
-        # character_name pode ser None se mudou de classe (personagem diferente)
-        # Se não foi fornecido e não mudou de classe, manter o atual
-        # Se mudou de classe e não forneceu, manter None (será limpo)
-        if character_name is None:
-            if class_pvp == current_class_pvp:
-                # Não mudou de classe, manter o nome atual
-                character_name = current_character_name
-            # Se mudou de classe, character_name permanece None (será limpo)
-        if ap is None or aap is None or dp is None or linkgear is None:
-            # Buscar valores atuais de AP, AAP, DP e linkgear
+        with self.get_connection() as conn, conn.cursor() as cursor:
             cursor.execute('''
-                SELECT ap, aap, dp, linkgear FROM gearscore 
+                SELECT family_name, character_name, class_pvp FROM gearscore 
                 WHERE user_id = %s
+                LIMIT 1
             ''', (user_id,))
-            current_values = cursor.fetchone()
-            if current_values:
-                if ap is None:
-                    ap = current_values[0]
-                if aap is None:
-                    aap = current_values[1]
-                if dp is None:
-                    dp = current_values[2]
-                if linkgear is None:
-                    linkgear = current_values[3]
-        
-        # Verificar se mudou de classe
-        if class_pvp != current_class_pvp:
-            # Remover registro da classe antiga
-            cursor.execute('''
-                DELETE FROM gearscore 
-                WHERE user_id = %s AND class_pvp = %s
-            ''', (user_id, current_class_pvp))
-        
-        # Atualizar ou inserir gearscore
-        cursor.execute('''
-            INSERT INTO gearscore 
-            (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-            ON CONFLICT (user_id, class_pvp) 
-            DO UPDATE SET 
-                family_name = EXCLUDED.family_name,
-                character_name = EXCLUDED.character_name,
-                ap = EXCLUDED.ap,
-                aap = EXCLUDED.aap,
-                dp = EXCLUDED.dp,
-                linkgear = EXCLUDED.linkgear,
-                updated_at = CURRENT_TIMESTAMP
-        ''', (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear))
-        
-        # Salvar histórico
-        total_gs = max(ap, aap) + dp
-        try:
-            cursor.execute('''
-                INSERT INTO gearscore_history 
-                (user_id, class_pvp, ap, aap, dp, total_gs, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-            ''', (user_id, class_pvp, ap, aap, dp, total_gs))
-        except Exception as e:
-            print(f"⚠️ Erro ao salvar histórico no update: {e}")
-            # Não falhar a atualização se o histórico falhar
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+            result = cursor.fetchone()
+            return result
+    
+    def update_gearscore(self, user_id, family_name=None, class_pvp=None, ap=None, aap=None, dp=None, linkgear=None, character_name=None):
+        """
+        Atualiza o gearscore de um personagem (pode mudar de classe).
+        Tudo em uma conexão e uma transação: o registro atual é lido e travado com FOR UPDATE
+        (dois /atualizar simultâneos do mesmo usuário são serializados) e a troca de classe,
+        o upsert, o histórico e o resumo do histórico vão em um único comando.
+        """
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            select_current = '''
+                SELECT family_name, character_name, class_pvp, ap, aap, dp, linkgear FROM gearscore 
+                WHERE user_id = %s
+                LIMIT 1
+                FOR UPDATE
+            '''
+            cursor.execute(select_current, (user_id,))
+            current = cursor.fetchone()
+            if not current:
+                # Uma atualização concorrente pode ter trocado a classe (linha removida e outra inserida)
+                cursor.execute(select_current, (user_id,))
+                current = cursor.fetchone()
+            if not current:
+                raise ValueError("Você ainda não possui um registro! Use /registro primeiro.")
+            
+            current_family_name, current_character_name, current_class_pvp, current_ap, current_aap, current_dp, current_linkgear = current
+            
+            # Se não forneceu classe_pvp, usar a atual
+            if class_pvp is None:
+                class_pvp = current_class_pvp
+            
+            # Usar valores atuais se não fornecidos
+            if family_name is None:
+                family_name = current_family_name
+            
+            # character_name pode ser None se mudou de classe (personagem diferente)
+            # Se não foi fornecido e não mudou de classe, manter o atual
+            # Se mudou de classe e não forneceu, manter None (será limpo)
+            if character_name is None and class_pvp == current_class_pvp:
+                character_name = current_character_name
+            
+            if ap is None:
+                ap = current_ap
+            if aap is None:
+                aap = current_aap
+            if dp is None:
+                dp = current_dp
+            if linkgear is None:
+                linkgear = current_linkgear
+            
+            # Remover a classe antiga (se mudou), atualizar/inserir o gearscore e salvar o histórico
+            cursor.execute(f'''
+                WITH removido AS (
+                    DELETE FROM gearscore 
+                    WHERE user_id = %(user_id)s AND class_pvp = %(current_class_pvp)s AND class_pvp <> %(class_pvp)s
+                ), atualizado AS (
+                    INSERT INTO gearscore 
+                    (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at)
+                    VALUES (%(user_id)s, %(family_name)s, %(character_name)s, %(class_pvp)s, %(ap)s, %(aap)s, %(dp)s, %(linkgear)s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (user_id, class_pvp) 
+                    DO UPDATE SET 
+                        family_name = EXCLUDED.family_name,
+                        character_name = EXCLUDED.character_name,
+                        ap = EXCLUDED.ap,
+                        aap = EXCLUDED.aap,
+                        dp = EXCLUDED.dp,
+                        linkgear = EXCLUDED.linkgear,
+                        updated_at = CURRENT_TIMESTAMP
+                ), resumo AS (
+                    {HISTORY_SUMMARY_UPSERT_SQL}
+                )
+                {HISTORY_INSERT_SQL}
+            ''', {
+                'user_id': user_id,
+                'current_class_pvp': current_class_pvp,
+                'family_name': family_name,
+                'character_name': character_name,
+                'class_pvp': class_pvp,
+                'ap': ap,
+                'aap': aap,
+                'dp': dp,
+                'linkgear': linkgear,
+                'total_gs': max(ap, aap) + dp,
+            })
+            
+            conn.commit()
     
     def get_gearscore(self, user_id, class_pvp=None):
         """Busca o gearscore de um usuário"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Usar colunas explícitas para garantir ordem consistente
-        if class_pvp:
-            cursor.execute('''
-                SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
-                FROM gearscore 
-                WHERE user_id = %s AND class_pvp = %s
-            ''', (user_id, class_pvp))
-        else:
-            cursor.execute('''
-                SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
-                FROM gearscore 
-                WHERE user_id = %s
-                ORDER BY updated_at DESC
-            ''', (user_id,))
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            # Usar colunas explícitas para garantir ordem consistente
+            if class_pvp:
+                cursor.execute('''
+                    SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
+                    FROM gearscore 
+                    WHERE user_id = %s AND class_pvp = %s
+                ''', (user_id, class_pvp))
+            else:
+                cursor.execute('''
+                    SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
+                    FROM gearscore 
+                    WHERE user_id = %s
+                    ORDER BY updated_at DESC
+                ''', (user_id,))
         
-        result = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return result
+            result = [GearscoreRecord.from_row(row) for row in cursor.fetchall()]
+            return result
     
     def get_user_current_class(self, user_id):
         """Retorna a classe atual do usuário"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT class_pvp FROM gearscore 
-            WHERE user_id = %s
-            LIMIT 1
-        ''', (user_id,))
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute('''
+                SELECT class_pvp FROM gearscore 
+                WHERE user_id = %s
+                LIMIT 1
+            ''', (user_id,))
         
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return result[0] if result else None
+            result = cursor.fetchone()
+            return result[0] if result else None
     
-    def get_all_gearscores(self, valid_user_ids=None):
+    def get_all_gearscores(self, valid_user_ids=None, guild_id=None):
         """
         Busca todos os gearscores
         
         Args:
             valid_user_ids: Set ou lista de user_ids válidos (que têm o cargo da guilda).
                            Se None, retorna todos os registros.
+            guild_id: Se informado, filtra pelos membros da guilda na tabela guild_members
+                     (JOIN indexado, sem um parâmetro por membro na consulta)
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        if valid_user_ids:
-            placeholders = ','.join(['%s'] * len(valid_user_ids))
-            query = f'''
-                SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
-                FROM gearscore 
-                WHERE user_id IN ({placeholders})
-                ORDER BY updated_at DESC
-            '''
-            cursor.execute(query, list(valid_user_ids))
-        else:
-            cursor.execute('''
-                SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
-                FROM gearscore 
-                ORDER BY updated_at DESC
-            ''')
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            if guild_id is not None:
+                cursor.execute('''
+                    SELECT g.id, g.user_id, g.family_name, g.character_name, g.class_pvp, g.ap, g.aap, g.dp, g.linkgear, g.updated_at
+                    FROM gearscore g
+                    JOIN guild_members m ON m.user_id = g.user_id
+                    WHERE m.guild_id = %s
+                    ORDER BY g.updated_at DESC
+                ''', (str(guild_id),))
+            elif valid_user_ids:
+                placeholders = ','.join(['%s'] * len(valid_user_ids))
+                query = f'''
+                    SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
+                    FROM gearscore 
+                    WHERE user_id IN ({placeholders})
+                    ORDER BY updated_at DESC
+                '''
+                cursor.execute(query, list(valid_user_ids))
+            else:
+                cursor.execute('''
+                    SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
+                    FROM gearscore 
+                    ORDER BY updated_at DESC
+                ''')
         
-        result = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return result
+            result = [GearscoreRecord.from_row(row) for row in cursor.fetchall()]
+            return result
     
-    def get_class_statistics(self, valid_user_ids=None):
+    def get_class_statistics(self, valid_user_ids=None, guild_id=None):
         """
         Retorna estatísticas por classe
         
         Args:
             valid_user_ids: Set ou lista de user_ids válidos (que têm o cargo da guilda).
                            Se None, retorna todos os registros.
+            guild_id: Se informado, filtra pelos membros da guilda na tabela guild_members
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        if valid_user_ids:
-            placeholders = ','.join(['%s'] * len(valid_user_ids))
-            query = f'''
-                SELECT 
-                    class_pvp,
-                    COUNT(*) as total,
-                    AVG(GREATEST(ap, aap) + dp) as avg_gs,
-                    AVG(ap) as avg_ap,
-                    AVG(aap) as avg_aap,
-                    AVG(dp) as avg_dp
-                FROM gearscore
-                WHERE user_id IN ({placeholders})
-                GROUP BY class_pvp
-                ORDER BY total DESC, avg_gs DESC
-            '''
-            cursor.execute(query, list(valid_user_ids))
-        else:
-            cursor.execute('''
-                SELECT 
-                    class_pvp,
-                    COUNT(*) as total,
-                    AVG(GREATEST(ap, aap) + dp) as avg_gs,
-                    AVG(ap) as avg_ap,
-                    AVG(aap) as avg_aap,
-                    AVG(dp) as avg_dp
-                FROM gearscore
-                GROUP BY class_pvp
-                ORDER BY total DESC, avg_gs DESC
-            ''')
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            if guild_id is not None:
+                cursor.execute('''
+                    SELECT 
+                        g.class_pvp,
+                        COUNT(*) as total,
+                        AVG(g.gs) as avg_gs,
+                        AVG(g.ap) as avg_ap,
+                        AVG(g.aap) as avg_aap,
+                        AVG(g.dp) as avg_dp
+                    FROM gearscore g
+                    JOIN guild_members m ON m.user_id = g.user_id
+                    WHERE m.guild_id = %s
+                    GROUP BY g.class_pvp
+                    ORDER BY total DESC, avg_gs DESC
+                ''', (str(guild_id),))
+            elif valid_user_ids:
+                placeholders = ','.join(['%s'] * len(valid_user_ids))
+                query = f'''
+                    SELECT 
+                        class_pvp,
+                        COUNT(*) as total,
+                        AVG(gs) as avg_gs,
+                        AVG(ap) as avg_ap,
+                        AVG(aap) as avg_aap,
+                        AVG(dp) as avg_dp
+                    FROM gearscore
+                    WHERE user_id IN ({placeholders})
+                    GROUP BY class_pvp
+                    ORDER BY total DESC, avg_gs DESC
+                '''
+                cursor.execute(query, list(valid_user_ids))
+            else:
+                cursor.execute('''
+                    SELECT 
+                        class_pvp,
+                        COUNT(*) as total,
+                        AVG(gs) as avg_gs,
+                        AVG(ap) as avg_ap,
+                        AVG(aap) as avg_aap,
+                        AVG(dp) as avg_dp
+                    FROM gearscore
+                    GROUP BY class_pvp
+                    ORDER BY total DESC, avg_gs DESC
+                ''')
         
-        result = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return result
+            result = [ClassStatistics.from_row(row) for row in cursor.fetchall()]
+            return result
     
-    def get_class_members(self, class_pvp, valid_user_ids=None):
+    def get_class_members(self, class_pvp, valid_user_ids=None, guild_id=None):
         """
         Retorna todos os membros de uma classe específica
         
@@ -646,279 +850,464 @@ class Database:
             class_pvp: Nome da classe
             valid_user_ids: Set ou lista de user_ids válidos (que têm o cargo da guilda).
                            Se None, retorna todos os registros.
+            guild_id: Se informado, filtra pelos membros da guilda na tabela guild_members
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            # Usar colunas explícitas para garantir ordem consistente
+            if guild_id is not None:
+                cursor.execute('''
+                    SELECT g.id, g.user_id, g.family_name, g.character_name, g.class_pvp, g.ap, g.aap, g.dp, g.linkgear, g.updated_at
+                    FROM gearscore g
+                    JOIN guild_members m ON m.user_id = g.user_id
+                    WHERE m.guild_id = %s AND g.class_pvp = %s
+                    ORDER BY g.gs DESC
+                ''', (str(guild_id), class_pvp))
+            elif valid_user_ids:
+                placeholders = ','.join(['%s'] * len(valid_user_ids))
+                query = f'''
+                    SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
+                    FROM gearscore 
+                    WHERE class_pvp = %s AND user_id IN ({placeholders})
+                    ORDER BY gs DESC
+                '''
+                cursor.execute(query, [class_pvp] + list(valid_user_ids))
+            else:
+                cursor.execute('''
+                    SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
+                    FROM gearscore 
+                    WHERE class_pvp = %s
+                    ORDER BY gs DESC
+                ''', (class_pvp,))
+        
+            result = [GearscoreRecord.from_row(row) for row in cursor.fetchall()]
+            return result
+    
+    def get_gs_summary(self, guild_id=None):
+        """
+        Retorna (quantidade de registros, soma do GS), opcionalmente só dos membros da guilda
+        (tabela guild_members). Usado para calcular o GS médio sem trazer os registros.
+        """
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            if guild_id is not None:
+                cursor.execute('''
+                    SELECT COUNT(*), COALESCE(SUM(g.gs), 0)
+                    FROM gearscore g
+                    JOIN guild_members m ON m.user_id = g.user_id
+                    WHERE m.guild_id = %s
+                ''', (str(guild_id),))
+            else:
+                cursor.execute('SELECT COUNT(*), COALESCE(SUM(gs), 0) FROM gearscore')
         
-        # Usar colunas explícitas para garantir ordem consistente
-        if valid_user_ids:
-            placeholders = ','.join(['%s'] * len(valid_user_ids))
-            query = f'''
-                SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
-                FROM gearscore 
-                WHERE class_pvp = %s AND user_id IN ({placeholders})
-                ORDER BY (GREATEST(ap, aap) + dp) DESC
-            '''
-            cursor.execute(query, [class_pvp] + list(valid_user_ids))
-        else:
+            total, soma = cursor.fetchone()
+            return int(total), int(soma)
+    
+    def get_gearscores_below(self, max_gs, guild_id=None):
+        """Retorna os registros com GS menor que max_gs, do menor para o maior (varredura no índice de gs)"""
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            if guild_id is not None:
+                cursor.execute('''
+                    SELECT g.id, g.user_id, g.family_name, g.character_name, g.class_pvp, g.ap, g.aap, g.dp, g.linkgear, g.updated_at
+                    FROM gearscore g
+                    JOIN guild_members m ON m.user_id = g.user_id
+                    WHERE m.guild_id = %s AND g.gs < %s
+                    ORDER BY g.gs ASC
+                ''', (str(guild_id), max_gs))
+            else:
+                cursor.execute('''
+                    SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
+                    FROM gearscore
+                    WHERE gs < %s
+                    ORDER BY gs ASC
+                ''', (max_gs,))
+        
+            result = [GearscoreRecord.from_row(row) for row in cursor.fetchall()]
+            return result
+    
+    def get_gearscores_page(self, guild_id=None, limit=10, after=None):
+        """
+        Página do ranking por GS (maior primeiro), com paginação por keyset.
+        after: (gs, id) do último registro da página anterior (None = primeira página).
+        O custo é o mesmo em qualquer página: a consulta continua do ponto onde a anterior parou.
+        """
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            conditions = []
+            params = []
+            join = ''
+            if guild_id is not None:
+                join = 'JOIN guild_members m ON m.user_id = g.user_id'
+                conditions.append('m.guild_id = %s')
+                params.append(str(guild_id))
+            if after is not None:
+                conditions.append('(g.gs, g.id) < (%s, %s)')
+                params.extend(after)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+            cursor.execute(f'''
+                SELECT g.id, g.user_id, g.family_name, g.character_name, g.class_pvp, g.ap, g.aap, g.dp, g.linkgear, g.updated_at
+                FROM gearscore g
+                {join}
+                {where}
+                ORDER BY g.gs DESC, g.id DESC
+                LIMIT %s
+            ''', params + [limit])
+        
+            result = [GearscoreRecord.from_row(row) for row in cursor.fetchall()]
+            return result
+    
+    def sync_guild_members(self, guild_id, user_ids):
+        """
+        Substitui os membros da guilda na tabela guild_members pelo conjunto informado.
+        A lista vai como um único parâmetro array (mesmo comando para qualquer tamanho de guilda).
+        Retorna (adicionados, removidos).
+        """
+        guild_id = str(guild_id)
+        user_ids = sorted({str(user_id) for user_id in user_ids})
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute('''
+                DELETE FROM guild_members
+                WHERE guild_id = %s AND NOT (user_id = ANY(%s::text[]))
+            ''', (guild_id, user_ids))
+            removed = cursor.rowcount
             cursor.execute('''
-                SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
-                FROM gearscore 
-                WHERE class_pvp = %s
-                ORDER BY (GREATEST(ap, aap) + dp) DESC
-            ''', (class_pvp,))
-        
-        result = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return result
+                INSERT INTO guild_members (guild_id, user_id)
+                SELECT %s, unnest(%s::text[])
+                ON CONFLICT DO NOTHING
+            ''', (guild_id, user_ids))
+            added = cursor.rowcount
+            conn.commit()
+            return added, removed
     
-    def get_user_history(self, user_id, class_pvp=None):
-        """Retorna histórico de progressão de um usuário"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            if class_pvp:
+    def set_guild_member(self, guild_id, user_id, is_member):
+        """Inclui/exclui um usuário da tabela guild_members (ganhou/perdeu o cargo da guilda)"""
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            if is_member:
                 cursor.execute('''
-                    SELECT ap, aap, dp, total_gs, created_at
-                    FROM gearscore_history
-                    WHERE user_id = %s AND class_pvp = %s
-                    ORDER BY created_at DESC
-                    LIMIT 50
-                ''', (user_id, class_pvp))
+                    INSERT INTO guild_members (guild_id, user_id) VALUES (%s, %s)
+                    ON CONFLICT DO NOTHING
+                ''', (str(guild_id), str(user_id)))
             else:
-                cursor.execute('''
-                    SELECT class_pvp, ap, aap, dp, total_gs, created_at
-                    FROM gearscore_history
-                    WHERE user_id = %s
-                    ORDER BY created_at DESC
-                    LIMIT 50
-                ''', (user_id,))
-            
-            result = cursor.fetchall()
-        except Exception as e:
-            print(f"⚠️ Erro ao buscar histórico: {e}")
-            # Tentar verificar se a tabela existe e tem a estrutura correta
+                cursor.execute(
+                    'DELETE FROM guild_members WHERE guild_id = %s AND user_id = %s',
+                    (str(guild_id), str(user_id))
+                )
+            conn.commit()
+    
+    def get_user_history(self, user_id, class_pvp=None):
+        """Retorna histórico de progressão de um usuário"""
+        with self.get_connection() as conn, conn.cursor() as cursor:
             try:
-                cursor.execute('''
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'gearscore_history'
-                ''')
-                columns = [row[0] for row in cursor.fetchall()]
-                print(f"Colunas na tabela gearscore_history: {columns}")
-            except:
-                pass
-            result = []
-        finally:
-            cursor.close()
-            conn.close()
+                if class_pvp:
+                    cursor.execute('''
+                        SELECT ap, aap, dp, total_gs, created_at
+                        FROM gearscore_history
+                        WHERE user_id = %s AND class_pvp = %s
+                        ORDER BY created_at DESC
+                        LIMIT 50
+                    ''', (user_id, class_pvp))
+                else:
+                    cursor.execute('''
+                        SELECT class_pvp, ap, aap, dp, total_gs, created_at
+                        FROM gearscore_history
+                        WHERE user_id = %s
+                        ORDER BY created_at DESC
+                        LIMIT 50
+                    ''', (user_id,))
+            
+                result = cursor.fetchall()
+            except Exception as e:
+                print(f"⚠️ Erro ao buscar histórico: {e}")
+                result = []
         
-        return result
+            return result
     
     def get_user_progress(self, user_id, class_pvp):
-        """Calcula progressão de um personagem"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT 
-                MIN(total_gs) as first_gs,
-                MAX(total_gs) as current_gs,
-                MAX(total_gs) - MIN(total_gs) as progress,
-                COUNT(*) as updates,
-                MIN(created_at) as first_update,
-                MAX(created_at) as last_update
-            FROM gearscore_history
-            WHERE user_id = %s AND class_pvp = %s
-        ''', (user_id, class_pvp))
+        """
+        Progressão de um personagem, lida do resumo mantido a cada registro/atualização.
+        Retorna (first_gs, current_gs, progress, updates, first_update, last_update, peak_gs) ou None.
+        """
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute('''
+                SELECT 
+                    first_gs,
+                    current_gs,
+                    current_gs - first_gs as progress,
+                    updates,
+                    first_update,
+                    last_update,
+                    peak_gs
+                FROM gearscore_history_summary
+                WHERE user_id = %s AND class_pvp = %s
+            ''', (user_id, class_pvp))
         
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return result
+            result = cursor.fetchone()
+            return result
+    
+    def get_progression_analytics(self, guild_id=None, now=None):
+        """
+        Progressão de todos os personagens (classe atual) em uma única consulta: variação de GS
+        em 7/30/90 dias, atualizações em 30/90 dias e a última vez que o GS mudou.
+        O GS de referência de cada janela é a entrada do histórico em vigor no início dela
+        (LEAD/LAG sobre o histórico do personagem); sem histórico, as variações são 0.
+        Retorna [ProgressionStats].
+        """
+        now = now or utcnow()
+        params = {
+            'c7': now - timedelta(days=7),
+            'c30': now - timedelta(days=30),
+            'c90': now - timedelta(days=90),
+            'guild_id': str(guild_id) if guild_id is not None else None,
+        }
+        member_join = 'JOIN guild_members m ON m.user_id = g.user_id AND m.guild_id = %(guild_id)s' if guild_id is not None else ''
+        
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute(f'''
+                WITH hist AS (
+                    SELECT h.user_id, h.class_pvp, h.total_gs, h.created_at,
+                        LAG(h.total_gs) OVER (PARTITION BY h.user_id, h.class_pvp ORDER BY h.created_at, h.id) AS prev_gs,
+                        LAG(h.created_at) OVER (PARTITION BY h.user_id, h.class_pvp ORDER BY h.created_at, h.id) AS prev_at,
+                        LEAD(h.created_at) OVER (PARTITION BY h.user_id, h.class_pvp ORDER BY h.created_at, h.id) AS next_at
+                    FROM gearscore g
+                    {member_join}
+                    JOIN gearscore_history h ON h.user_id = g.user_id AND h.class_pvp = g.class_pvp
+                ), resumo AS (
+                    SELECT user_id, class_pvp,
+                        COALESCE(
+                            MAX(CASE WHEN created_at <= %(c7)s AND (next_at IS NULL OR next_at > %(c7)s) THEN total_gs END),
+                            MAX(CASE WHEN prev_at IS NULL THEN total_gs END)
+                        ) AS gs_7d,
+                        COALESCE(
+                            MAX(CASE WHEN created_at <= %(c30)s AND (next_at IS NULL OR next_at > %(c30)s) THEN total_gs END),
+                            MAX(CASE WHEN prev_at IS NULL THEN total_gs END)
+                        ) AS gs_30d,
+                        COALESCE(
+                            MAX(CASE WHEN created_at <= %(c90)s AND (next_at IS NULL OR next_at > %(c90)s) THEN total_gs END),
+                            MAX(CASE WHEN prev_at IS NULL THEN total_gs END)
+                        ) AS gs_90d,
+                        SUM(CASE WHEN created_at > %(c30)s THEN 1 ELSE 0 END) AS updates_30d,
+                        SUM(CASE WHEN created_at > %(c90)s THEN 1 ELSE 0 END) AS updates_90d,
+                        MAX(CASE WHEN prev_gs IS NULL OR total_gs <> prev_gs THEN created_at END) AS last_change
+                    FROM hist
+                    GROUP BY user_id, class_pvp
+                )
+                SELECT g.user_id, g.family_name, g.class_pvp, g.gs,
+                    g.gs - COALESCE(r.gs_7d, g.gs),
+                    g.gs - COALESCE(r.gs_30d, g.gs),
+                    g.gs - COALESCE(r.gs_90d, g.gs),
+                    r.updates_30d, r.updates_90d,
+                    COALESCE(r.last_change, g.updated_at), g.updated_at
+                FROM gearscore g
+                {member_join}
+                LEFT JOIN resumo r ON r.user_id = g.user_id AND r.class_pvp = g.class_pvp
+                ORDER BY g.gs DESC, g.id DESC
+            ''', params)
+        
+            result = [ProgressionStats.from_row(row) for row in cursor.fetchall()]
+            return result
+    
+    def compact_gearscore_history(self, weekly_before, monthly_before):
+        """
+        Reduz o histórico antigo à última entrada de cada período, por personagem:
+        entradas anteriores a monthly_before ficam uma por mês; entre monthly_before e
+        weekly_before, uma por semana. O resumo (primeiro/maior GS, atualizações) não muda.
+        Retorna a quantidade de entradas removidas.
+        """
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute('''
+                DELETE FROM gearscore_history 
+                WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY user_id, class_pvp, created_at < %(monthly_before)s,
+                                date_trunc(CASE WHEN created_at < %(monthly_before)s THEN 'month' ELSE 'week' END, created_at AT TIME ZONE 'UTC')
+                            ORDER BY created_at DESC, id DESC
+                        ) AS posicao
+                        FROM gearscore_history
+                        WHERE created_at < %(weekly_before)s
+                    ) periodos
+                    WHERE posicao > 1
+                )
+            ''', {'weekly_before': weekly_before, 'monthly_before': monthly_before})
+            deleted_count = cursor.rowcount
+            conn.commit()
+            return deleted_count
     
     def clear_all_data(self):
         """Limpa todos os dados do banco (gearscore e histórico)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # Limpar histórico primeiro (devido a foreign keys se houver)
-            cursor.execute('DELETE FROM gearscore_history')
-            # Limpar gearscore
-            cursor.execute('DELETE FROM gearscore')
-            
-            conn.commit()
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            try:
+                # Limpar histórico primeiro (devido a foreign keys se houver)
+                cursor.execute('DELETE FROM gearscore_history')
+                cursor.execute('DELETE FROM gearscore_history_summary')
+                # Limpar gearscore
+                cursor.execute('DELETE FROM gearscore')
             
-            cursor.close()
-            conn.close()
+                conn.commit()
             
-            return True, "Todos os dados foram limpos com sucesso!"
-        except Exception as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return False, f"Erro ao limpar banco de dados: {str(e)}"
+                return True, "Todos os dados foram limpos com sucesso!"
+            except Exception as e:
+                conn.rollback()
+                return False, f"Erro ao limpar banco de dados: {str(e)}"
     
     def clear_history_only(self):
         """Limpa apenas o histórico, mantendo os gearscores atuais"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('DELETE FROM gearscore_history')
-            deleted_count = cursor.rowcount if hasattr(cursor, 'rowcount') else 0
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            try:
+                cursor.execute('DELETE FROM gearscore_history')
+                deleted_count = cursor.rowcount if hasattr(cursor, 'rowcount') else 0
+                cursor.execute('DELETE FROM gearscore_history_summary')
             
-            conn.commit()
-            cursor.close()
-            conn.close()
+                conn.commit()
             
-            return True, f"Histórico limpo! {deleted_count} registro(s) removido(s)."
-        except Exception as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return False, f"Erro ao limpar histórico: {str(e)}"
+                return True, f"Histórico limpo! {deleted_count} registro(s) removido(s)."
+            except Exception as e:
+                conn.rollback()
+                return False, f"Erro ao limpar histórico: {str(e)}"
     
     def delete_user_gearscore(self, user_id):
         """Deleta o registro de gearscore de um usuário específico"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # Verificar se o usuário tem registro
-            cursor.execute('SELECT family_name, class_pvp FROM gearscore WHERE user_id = %s', (user_id,))
-            result = cursor.fetchone()
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            try:
+                # Verificar se o usuário tem registro
+                cursor.execute('SELECT family_name, class_pvp FROM gearscore WHERE user_id = %s', (user_id,))
+                result = cursor.fetchone()
             
-            if not result:
-                cursor.close()
-                conn.close()
-                return False, "Usuário não possui registro de gearscore."
+                if not result:
+                    return False, "Usuário não possui registro de gearscore."
             
-            family_name, class_pvp = result
+                family_name, class_pvp = result
             
-            # Deletar registro do gearscore
-            cursor.execute('DELETE FROM gearscore WHERE user_id = %s', (user_id,))
+                # Deletar registro do gearscore
+                cursor.execute('DELETE FROM gearscore WHERE user_id = %s', (user_id,))
             
-            # Deletar histórico do usuário
-            cursor.execute('DELETE FROM gearscore_history WHERE user_id = %s', (user_id,))
+                # Deletar histórico do usuário
+                cursor.execute('DELETE FROM gearscore_history WHERE user_id = %s', (user_id,))
+                cursor.execute('DELETE FROM gearscore_history_summary WHERE user_id = %s', (user_id,))
             
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return True, f"Registro de {family_name} ({class_pvp}) excluído com sucesso!"
-        except Exception as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return False, f"Erro ao excluir registro: {str(e)}"
+                conn.commit()
+                return True, f"Registro de {family_name} ({class_pvp}) excluído com sucesso!"
+            except Exception as e:
+                conn.rollback()
+                return False, f"Erro ao excluir registro: {str(e)}"
     
     def admin_update_gearscore(self, user_id, family_name=None, character_name=None, class_pvp=None, ap=None, aap=None, dp=None, linkgear=None):
         """Atualiza o gearscore de um usuário (admin - força atualização mesmo se não existir)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # Buscar dados atuais
-            cursor.execute('''
-                SELECT family_name, character_name, class_pvp, ap, aap, dp, linkgear 
-                FROM gearscore WHERE user_id = %s
-            ''', (user_id,))
-            current = cursor.fetchone()
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            try:
+                # Buscar dados atuais
+                cursor.execute('''
+                    SELECT family_name, character_name, class_pvp, ap, aap, dp, linkgear 
+                    FROM gearscore WHERE user_id = %s
+                ''', (user_id,))
+                current = cursor.fetchone()
             
-            if not current:
-                cursor.close()
-                conn.close()
-                return False, "Usuário não possui registro de gearscore. Use /registro_manual primeiro."
+                if not current:
+                    return False, "Usuário não possui registro de gearscore. Use /registro_manual primeiro."
             
-            # Usar valores atuais se não fornecidos
-            current_family_name, current_character_name, current_class_pvp, current_ap, current_aap, current_dp, current_linkgear = current
+                # Usar valores atuais se não fornecidos
+                current_family_name, current_character_name, current_class_pvp, current_ap, current_aap, current_dp, current_linkgear = current
             
-            family_name = family_name if family_name is not None else current_family_name
-            character_name = character_name if character_name is not None else current_character_name
-            class_pvp = class_pvp if class_pvp is not None else current_class_pvp
-            ap = ap if ap is not None else current_ap
-            aap = aap if aap is not None else current_aap
-            dp = dp if dp is not None else current_dp
-            linkgear = linkgear if linkgear is not None else current_linkgear
+                family_name = family_name if family_name is not None else current_family_name
+                character_name = character_name if character_name is not None else current_character_name
+                class_pvp = class_pvp if class_pvp is not None else current_class_pvp
+                ap = ap if ap is not None else current_ap
+                aap = aap if aap is not None else current_aap
+                dp = dp if dp is not None else current_dp
+                linkgear = linkgear if linkgear is not None else current_linkgear
             
-            # Se mudou de classe, precisamos atualizar o registro corretamente
-            if class_pvp != current_class_pvp:
-                # Remover registro da classe antiga
-                cursor.execute('DELETE FROM gearscore WHERE user_id = %s', (user_id,))
+                # Se mudou de classe, precisamos atualizar o registro corretamente
+                if class_pvp != current_class_pvp:
+                    # Remover registro da classe antiga
+                    cursor.execute('DELETE FROM gearscore WHERE user_id = %s', (user_id,))
             
-            # Atualizar ou inserir gearscore
-            cursor.execute('''
-                INSERT INTO gearscore 
-                (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                ON CONFLICT (user_id, class_pvp) 
-                DO UPDATE SET 
-                    family_name = EXCLUDED.family_name,
-                    character_name = EXCLUDED.character_name,
-                    ap = EXCLUDED.ap,
-                    aap = EXCLUDED.aap,
-                    dp = EXCLUDED.dp,
-                    linkgear = EXCLUDED.linkgear,
-                    updated_at = CURRENT_TIMESTAMP
-            ''', (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear))
+                # Atualizar ou inserir gearscore
+                cursor.execute('''
+                    INSERT INTO gearscore 
+                    (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (user_id, class_pvp) 
+                    DO UPDATE SET 
+                        family_name = EXCLUDED.family_name,
+                        character_name = EXCLUDED.character_name,
+                        ap = EXCLUDED.ap,
+                        aap = EXCLUDED.aap,
+                        dp = EXCLUDED.dp,
+                        linkgear = EXCLUDED.linkgear,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', (user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear))
             
-            # Salvar histórico
-            total_gs = max(ap, aap) + dp
-            cursor.execute('''
-                INSERT INTO gearscore_history 
-                (user_id, class_pvp, ap, aap, dp, total_gs, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-            ''', (user_id, class_pvp, ap, aap, dp, total_gs))
+                # Salvar histórico
+                total_gs = _record_history(cursor, user_id, class_pvp, ap, aap, dp)
             
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return True, f"Registro de {family_name} atualizado com sucesso! GS: {total_gs}"
-        except Exception as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return False, f"Erro ao atualizar registro: {str(e)}"
+                conn.commit()
+                return True, f"Registro de {family_name} atualizado com sucesso! GS: {total_gs}"
+            except Exception as e:
+                conn.rollback()
+                return False, f"Erro ao atualizar registro: {str(e)}"
     
     def get_gearscore_by_family_name(self, family_name):
         """Busca o gearscore de um usuário pelo nome de família (case-insensitive)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
-            FROM gearscore 
-            WHERE LOWER(family_name) = LOWER(%s)
-        ''', (family_name,))
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute('''
+                SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
+                FROM gearscore 
+                WHERE LOWER(family_name) = LOWER(%s)
+            ''', (family_name,))
         
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return result
+            row = cursor.fetchone()
+            result = GearscoreRecord.from_row(row) if row else None
+            return result
     
     def get_gearscores_by_family_names(self, family_names):
-        """Busca o gearscore de múltiplos usuários pelos nomes de família"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """
+        Busca o gearscore de múltiplos usuários pelos nomes de família.
+        Uma única consulta com = ANY(array) (usa o índice em LOWER(family_name)).
+        Retorna: {nome.strip().lower(): registro}
+        """
+        names = list(dict.fromkeys(name.strip() for name in family_names if name and name.strip()))
+        if not names:
+            return {}
         
-        results = {}
-        for name in family_names:
+        with self.get_connection() as conn, conn.cursor() as cursor:
             cursor.execute('''
                 SELECT id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at
                 FROM gearscore 
-                WHERE LOWER(family_name) = LOWER(%s)
-            ''', (name.strip(),))
-            
-            result = cursor.fetchone()
-            if result:
-                results[name.strip().lower()] = result
+                WHERE LOWER(family_name) = ANY(%s)
+                ORDER BY id
+            ''', ([name.lower() for name in names],))
+        
+            rows_by_name = {}
+            for row in cursor.fetchall():
+                # Manter o primeiro registro encontrado para cada nome
+                rows_by_name.setdefault(row[2].lower(), GearscoreRecord.from_row(row))
+        
+            results = {}
+            for name in names:
+                row = rows_by_name.get(name.lower())
+                if row:
+                    results[name.lower()] = row
+            return results
+    
+    def get_family_names_by_user_ids(self, user_ids):
+        """
+        Busca o nome de família de vários usuários de uma vez (ex: todos de um canal de voz).
+        Retorna: {user_id: family_name} (apenas usuários com registro)
+        """
+        user_ids = list(dict.fromkeys(str(uid) for uid in user_ids))
+        if not user_ids:
+            return {}
         
-        cursor.close()
-        conn.close()
-        return results
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute('''
+                SELECT user_id, family_name FROM gearscore 
+                WHERE user_id = ANY(%s)
+                ORDER BY id
+            ''', (user_ids,))
+        
+            family_names = {}
+            for user_id, family_name in cursor.fetchall():
+                family_names.setdefault(user_id, family_name)
+        
+            return family_names
     
     # ============================================
     # MÉTODOS PARA EVENTOS E PARTICIPAÇÕES
@@ -930,10 +1319,7 @@ class Database:
         participantes: lista de dicts com {user_id, family_name, display_name}
         Retorna: (evento_id, quantidade_participantes)
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
+        with self.get_connection() as conn, conn.cursor() as cursor:
             # Determinar mês de referência (formato: YYYY-MM)
             from datetime import datetime
             mes_referencia = datetime.now().strftime("%Y-%m")
@@ -947,131 +1333,168 @@ class Database:
             
             evento_id = cursor.fetchone()[0]
             
-            # Inserir participações
-            for p in participantes:
-                cursor.execute('''
+            # Inserir participações (todas em um único INSERT multi-valores)
+            if participantes:
+                execute_values(cursor, '''
                     INSERT INTO participacoes (evento_id, user_id, family_name, display_name)
-                    VALUES (%s, %s, %s, %s)
-                ''', (evento_id, p['user_id'], p.get('family_name'), p.get('display_name')))
+                    VALUES %s
+                ''', [(evento_id, p['user_id'], p.get('family_name'), p.get('display_name')) for p in participantes],
+                    page_size=500)
             
             conn.commit()
-            cursor.close()
-            conn.close()
             return evento_id, len(participantes)
-        except Exception as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            raise e
     
-    def get_relatorio_participacoes(self, mes_referencia=None):
+    def get_relatorio_participacoes(self, mes_referencia=None, tipos=()):
         """
-        Retorna relatório de participações do mês.
-        Se mes_referencia for None, usa o mês atual.
+        Retorna o relatório de participações do mês em uma única consulta, já pivotado:
+        uma linha por player com uma coluna por tipo (na ordem de `tipos`), total e taxa de presença.
+        Se mes_referencia for None, usa o mês atual. Meses já consolidados pela limpeza mensal
+        são lidos do resumo (eventos_mensal/participacoes_mensal); os demais dos eventos brutos,
+        pelos índices cobrindo eventos(mes_referencia, tipo) e participacoes(evento_id, user_id).
+        Eventos de tipos fora de `tipos` entram apenas nos totais.
         Retorna: {
+            'tipos': [tipo],
             'eventos_por_tipo': {tipo: quantidade},
-            'participacoes_por_player': {user_id: {tipo: quantidade, 'display_name': nome}},
+            'players': [ParticipationRow] (maior total primeiro),
             'total_eventos': int,
             'mes': str
         }
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         from datetime import datetime
         if mes_referencia is None:
             mes_referencia = datetime.now().strftime("%Y-%m")
-        
-        # Contar eventos por tipo
-        cursor.execute('''
-            SELECT tipo, COUNT(*) as total
-            FROM eventos
-            WHERE mes_referencia = %s
-            GROUP BY tipo
-        ''', (mes_referencia,))
-        
-        eventos_por_tipo = {}
-        for row in cursor.fetchall():
-            eventos_por_tipo[row[0]] = row[1]
-        
-        total_eventos = sum(eventos_por_tipo.values())
-        
-        # Contar participações por player e tipo
-        cursor.execute('''
-            SELECT p.user_id, p.display_name, p.family_name, e.tipo, COUNT(*) as total
-            FROM participacoes p
-            JOIN eventos e ON p.evento_id = e.id
-            WHERE e.mes_referencia = %s
-            GROUP BY p.user_id, p.display_name, p.family_name, e.tipo
-        ''', (mes_referencia,))
-        
-        participacoes_por_player = {}
-        for row in cursor.fetchall():
-            user_id = row[0]
-            display_name = row[1]
-            family_name = row[2]
-            tipo = row[3]
-            quantidade = row[4]
+        tipos = list(tipos)
+        
+        params = {'mes': mes_referencia}
+        somas_tipo = ''
+        colunas_tipo = ''
+        for i, tipo in enumerate(tipos):
+            params[f'tipo{i}'] = tipo
+            somas_tipo += f'SUM(CASE WHEN tipo = %(tipo{i})s THEN total ELSE 0 END) AS qtd_{i}, '
+            colunas_tipo += f'qtd_{i}, '
+        
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            # A primeira linha (user_id NULL) traz a quantidade de eventos por tipo; as demais, um player cada
+            cursor.execute(f'''
+                WITH consolidado AS (
+                    SELECT EXISTS (SELECT 1 FROM eventos_mensal WHERE mes_referencia = %(mes)s) AS sim
+                ), eventos_tipo AS (
+                    SELECT tipo, COUNT(*) AS total
+                    FROM eventos
+                    WHERE mes_referencia = %(mes)s AND NOT (SELECT sim FROM consolidado)
+                    GROUP BY tipo
+                    UNION ALL
+                    SELECT tipo, total
+                    FROM eventos_mensal
+                    WHERE mes_referencia = %(mes)s
+                ), participacao AS (
+                    SELECT p.user_id, p.display_name, p.family_name, e.tipo, 1 AS total
+                    FROM eventos e
+                    JOIN participacoes p ON p.evento_id = e.id
+                    WHERE e.mes_referencia = %(mes)s AND NOT (SELECT sim FROM consolidado)
+                    UNION ALL
+                    SELECT user_id, display_name, family_name, tipo, total
+                    FROM participacoes_mensal
+                    WHERE mes_referencia = %(mes)s
+                )
+                SELECT user_id, display_name, family_name, {colunas_tipo}total, taxa FROM (
+                    SELECT NULL AS user_id, NULL AS display_name, NULL AS family_name, {somas_tipo}
+                        SUM(total) AS total, NULL AS taxa
+                    FROM eventos_tipo
+                    UNION ALL
+                    SELECT user_id, MAX(display_name), MAX(family_name), {somas_tipo}
+                        SUM(total), SUM(total) * 1.0 / (SELECT SUM(total) FROM eventos_tipo)
+                    FROM participacao
+                    GROUP BY user_id
+                ) relatorio
+                ORDER BY user_id IS NOT NULL, total DESC, user_id
+            ''', params)
+            rows = cursor.fetchall()
+        
+            eventos = rows[0]
+            return {
+                'tipos': tipos,
+                'eventos_por_tipo': {tipo: int(eventos[3 + i] or 0) for i, tipo in enumerate(tipos) if eventos[3 + i]},
+                'players': [ParticipationRow.from_row(row, len(tipos)) for row in rows[1:]],
+                'total_eventos': int(eventos[3 + len(tipos)] or 0),
+                'mes': mes_referencia
+            }
+    
+    def consolidar_eventos_mes(self, mes_referencia):
+        """
+        Grava o resumo mensal (eventos por tipo e participações por player/tipo) de um mês.
+        Um mês já consolidado não é recalculado: a limpeza pode ter apagado parte dos eventos brutos.
+        Retorna True se o mês foi consolidado agora.
+        """
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM eventos_mensal WHERE mes_referencia = %s LIMIT 1', (mes_referencia,))
+            if cursor.fetchone():
+                return False
             
-            if user_id not in participacoes_por_player:
-                participacoes_por_player[user_id] = {
-                    'display_name': display_name or family_name or user_id,
-                    'family_name': family_name
-                }
-            participacoes_por_player[user_id][tipo] = quantidade
-        
-        cursor.close()
-        conn.close()
-        
-        return {
-            'eventos_por_tipo': eventos_por_tipo,
-            'participacoes_por_player': participacoes_por_player,
-            'total_eventos': total_eventos,
-            'mes': mes_referencia
-        }
+            cursor.execute('''
+                INSERT INTO eventos_mensal (mes_referencia, tipo, total)
+                SELECT mes_referencia, tipo, COUNT(*)
+                FROM eventos
+                WHERE mes_referencia = %s
+                GROUP BY mes_referencia, tipo
+                ON CONFLICT (mes_referencia, tipo) DO NOTHING
+            ''', (mes_referencia,))
+            cursor.execute('''
+                INSERT INTO participacoes_mensal (mes_referencia, user_id, tipo, total, display_name, family_name)
+                SELECT e.mes_referencia, p.user_id, e.tipo, COUNT(*), MAX(p.display_name), MAX(p.family_name)
+                FROM participacoes p
+                JOIN eventos e ON p.evento_id = e.id
+                WHERE e.mes_referencia = %s
+                GROUP BY e.mes_referencia, p.user_id, e.tipo
+                ON CONFLICT (mes_referencia, user_id, tipo) DO NOTHING
+            ''', (mes_referencia,))
+            
+            conn.commit()
+            return True
     
     def limpar_eventos_mes_anterior(self):
-        """Limpa eventos de meses anteriores ao atual (chamado no dia 1)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+        """
+        Limpa eventos de meses anteriores ao atual (chamado no dia 1).
+        Cada mês é consolidado no resumo mensal antes; os eventos brutos são apagados em lotes
+        de EVENTOS_CLEANUP_BATCH_SIZE, cada lote em sua transação (sem um DELETE longo travando o banco).
+        """
         from datetime import datetime
         mes_atual = datetime.now().strftime("%Y-%m")
         
-        try:
-            # Deletar participações de eventos antigos
-            cursor.execute('''
-                DELETE FROM participacoes 
-                WHERE evento_id IN (
-                    SELECT id FROM eventos WHERE mes_referencia < %s
-                )
-            ''', (mes_atual,))
-            
-            # Deletar eventos antigos
-            cursor.execute('''
-                DELETE FROM eventos WHERE mes_referencia < %s
-            ''', (mes_atual,))
-            
-            deleted = cursor.rowcount
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return deleted
-        except Exception as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            raise e
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute('SELECT DISTINCT mes_referencia FROM eventos WHERE mes_referencia < %s', (mes_atual,))
+            meses = [row[0] for row in cursor.fetchall()]
+        
+        for mes in meses:
+            self.consolidar_eventos_mes(mes)
+        
+        deleted = 0
+        while True:
+            with self.get_connection() as conn, conn.cursor() as cursor:
+                cursor.execute('''
+                    SELECT id FROM eventos WHERE mes_referencia < %s ORDER BY id LIMIT %s
+                ''', (mes_atual, EVENTOS_CLEANUP_BATCH_SIZE))
+                evento_ids = [row[0] for row in cursor.fetchall()]
+                if not evento_ids:
+                    break
+                
+                placeholders = ','.join(['%s'] * len(evento_ids))
+                # Deletar participações dos eventos do lote
+                cursor.execute(f'DELETE FROM participacoes WHERE evento_id IN ({placeholders})', evento_ids)
+                # Deletar eventos do lote
+                cursor.execute(f'DELETE FROM eventos WHERE id IN ({placeholders})', evento_ids)
+                
+                deleted += cursor.rowcount
+                conn.commit()
+        
+        return deleted
     
     # ==================== MÉTODOS DE CENSO ====================
     
     def criar_censo(self, nome: str, data_limite, criado_por: str, criado_por_nome: str, campos_json=None, exemplos_json=None):
         """Cria um novo evento de censo"""
         import json
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
+        with self.get_connection() as conn, conn.cursor() as cursor:
             # Desativar censos anteriores
             cursor.execute('''
                 UPDATE censo_events SET ativo = FALSE WHERE ativo = TRUE
@@ -1095,91 +1518,35 @@ class Database:
             else:
                 exemplos_json_str = None
             
-            # Verificar se a coluna exemplos_json existe, se não, adicionar
-            try:
-                cursor.execute('''
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'censo_events' AND column_name = 'exemplos_json'
-                ''')
-                if not cursor.fetchone():
-                    cursor.execute('''
-                        ALTER TABLE censo_events 
-                        ADD COLUMN exemplos_json JSONB
-                    ''')
-                    conn.commit()
-            except Exception as e:
-                print(f"Aviso ao verificar/adicionar exemplos_json: {e}")
-                conn.rollback()
-            
-            # Criar novo censo (com ou sem exemplos_json dependendo se a coluna existe)
-            try:
-                cursor.execute('''
-                    INSERT INTO censo_events (nome, data_limite, criado_por, criado_por_nome, ativo, campos_json, exemplos_json)
-                    VALUES (%s, %s, %s, %s, TRUE, %s::jsonb, %s::jsonb)
-                    RETURNING id
-                ''', (nome, data_limite, criado_por, criado_por_nome, campos_json_str, exemplos_json_str))
-            except:
-                # Se falhar (coluna não existe), inserir sem exemplos_json
-                conn.rollback()
-                cursor.execute('''
-                    INSERT INTO censo_events (nome, data_limite, criado_por, criado_por_nome, ativo, campos_json)
-                    VALUES (%s, %s, %s, %s, TRUE, %s::jsonb)
-                    RETURNING id
-                ''', (nome, data_limite, criado_por, criado_por_nome, campos_json_str))
+            # Criar novo censo
+            cursor.execute('''
+                INSERT INTO censo_events (nome, data_limite, criado_por, criado_por_nome, ativo, campos_json, exemplos_json)
+                VALUES (%s, %s, %s, %s, TRUE, %s::jsonb, %s::jsonb)
+                RETURNING id
+            ''', (nome, data_limite, criado_por, criado_por_nome, campos_json_str, exemplos_json_str))
             
             censo_id = cursor.fetchone()[0]
             conn.commit()
-            cursor.close()
-            conn.close()
+            self.censo_cache.invalidate()
             return censo_id
-        except Exception as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            raise e
     
     def get_censo_ativo(self):
-        """Retorna o censo ativo atual, ou None se não houver"""
+        """Retorna o censo ativo atual, ou None se não houver (em cache até criar/finalizar censo ou expirar o TTL)"""
+        return self.censo_cache.get(self._buscar_censo_ativo)
+    
+    def _buscar_censo_ativo(self):
+        """Busca o censo ativo no banco"""
         import json
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # Verificar se a coluna exemplos_json existe
-            try:
-                cursor.execute('''
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'censo_events' AND column_name = 'exemplos_json'
-                ''')
-                has_exemplos_col = cursor.fetchone() is not None
-            except Exception as e:
-                # Se der erro, assumir que não existe
-                conn.rollback()
-                has_exemplos_col = False
-            
-            # Buscar censo com ou sem exemplos_json
-            if has_exemplos_col:
-                cursor.execute('''
-                    SELECT id, nome, data_limite, criado_por, criado_por_nome, created_at, campos_json, exemplos_json
-                    FROM censo_events
-                    WHERE ativo = TRUE
-                    ORDER BY created_at DESC
-                    LIMIT 1
-                ''')
-            else:
-                cursor.execute('''
-                    SELECT id, nome, data_limite, criado_por, criado_por_nome, created_at, campos_json
-                    FROM censo_events
-                    WHERE ativo = TRUE
-                    ORDER BY created_at DESC
-                    LIMIT 1
-                ''')
+        with self.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute('''
+                SELECT id, nome, data_limite, criado_por, criado_por_nome, created_at, campos_json, exemplos_json
+                FROM censo_events
+                WHERE ativo = TRUE
+                ORDER BY created_at DESC
+                LIMIT 1
+            ''')
             
             result = cursor.fetchone()
-            cursor.close()
-            conn.close()
             
             if result:
                 campos = None
@@ -1190,7 +1557,7 @@ class Database:
                         campos = result[6]
                 
                 exemplos = None
-                if has_exemplos_col and len(result) > 7 and result[7]:
+                if result[7]:
                     if isinstance(result[7], str):
                         exemplos = json.loads(result[7])
                     else:
@@ -1207,19 +1574,11 @@ class Database:
                     'exemplos': exemplos
                 }
             return None
-        except Exception as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            raise e
     
     def salvar_resposta_censo(self, censo_id: int, user_id: str, family_name: str, dados: dict):
         """Salva ou atualiza a resposta de um player ao censo"""
         import json
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
+        with self.get_connection() as conn, conn.cursor() as cursor:
             dados_json = json.dumps(dados, ensure_ascii=False)
             cursor.execute('''
                 INSERT INTO censo_responses (censo_id, user_id, family_name, dados_json)
@@ -1232,22 +1591,12 @@ class Database:
             ''', (censo_id, user_id, family_name, dados_json))
             
             conn.commit()
-            cursor.close()
-            conn.close()
             return True
-        except Exception as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            raise e
     
     def get_resposta_censo(self, censo_id: int, user_id: str):
         """Retorna a resposta de um player ao censo, ou None se não preencheu"""
         import json
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
+        with self.get_connection() as conn, conn.cursor() as cursor:
             cursor.execute('''
                 SELECT dados_json, preenchido_em, family_name
                 FROM censo_responses
@@ -1255,8 +1604,6 @@ class Database:
             ''', (censo_id, user_id))
             
             result = cursor.fetchone()
-            cursor.close()
-            conn.close()
             
             if result:
                 return {
@@ -1265,17 +1612,10 @@ class Database:
                     'family_name': result[2]
                 }
             return None
-        except Exception as e:
-            cursor.close()
-            conn.close()
-            raise e
     
     def get_players_com_censo(self, censo_id: int):
         """Retorna lista de user_ids que preencheram o censo"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
+        with self.get_connection() as conn, conn.cursor() as cursor:
             cursor.execute('''
                 SELECT user_id, family_name, preenchido_em
                 FROM censo_responses
@@ -1283,22 +1623,13 @@ class Database:
             ''', (censo_id,))
             
             results = cursor.fetchall()
-            cursor.close()
-            conn.close()
             
             return [{'user_id': row[0], 'family_name': row[1], 'preenchido_em': row[2]} for row in results]
-        except Exception as e:
-            cursor.close()
-            conn.close()
-            raise e
     
     def get_todas_respostas_censo(self, censo_id: int):
         """Retorna todas as respostas do censo com dados completos"""
         import json
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
+        with self.get_connection() as conn, conn.cursor() as cursor:
             cursor.execute('''
                 SELECT user_id, family_name, dados_json, preenchido_em
                 FROM censo_responses
@@ -1307,8 +1638,6 @@ class Database:
             ''', (censo_id,))
             
             results = cursor.fetchall()
-            cursor.close()
-            conn.close()
             
             respostas = []
             for row in results:
@@ -1325,28 +1654,15 @@ class Database:
                 })
             
             return respostas
-        except Exception as e:
-            cursor.close()
-            conn.close()
-            raise e
     
     def finalizar_censo(self, censo_id: int):
         """Finaliza um censo (desativa)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
+        with self.get_connection() as conn, conn.cursor() as cursor:
             cursor.execute('''
                 UPDATE censo_events SET ativo = FALSE WHERE id = %s
             ''', (censo_id,))
             
             conn.commit()
-            cursor.close()
-            conn.close()
+            self.censo_cache.invalidate()
             return True
-        except Exception as e:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            raise e
 
@@ -0,0 +1,129 @@
+"""
+Envio de DMs em massa com concorrência limitada.
+Usado por /dm_cargo, notificações por classe e lembretes automáticos de GS.
+
+O discord.py já respeita os buckets de rate limit (X-RateLimit-*) por rota;
+aqui limitamos quantas DMs ficam em voo ao mesmo tempo e tratamos o 429 que
+eventualmente escapa (ex: limite global) esperando o Retry-After antes de tentar de novo.
+"""
+import asyncio
+import logging
+import time
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Código de erro do Discord: "Cannot send messages to this user" (DM fechada/bot bloqueado)
+CANNOT_MESSAGE_USER = 50007
+
+
+class DMDispatchResult:
+    """Resultado de um envio em massa"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.sent = []      # [member]
+        self.blocked = []   # [member] - DMs desabilitadas ou bot bloqueado
+        self.failed = []    # [(member, motivo)] - erros inesperados após as tentativas
+        self.started_at = time.monotonic()
+        self.elapsed = 0.0
+
+    @property
+    def done(self) -> int:
+        return len(self.sent) + len(self.blocked) + len(self.failed)
+
+    @property
+    def not_delivered(self) -> list:
+        """Todos que não receberam (bloqueados + falhas), na ordem em que terminaram"""
+        return self.blocked + [member for member, _ in self.failed]
+
+    def summary(self) -> str:
+        return (
+            f"✅ Enviadas: **{len(self.sent)}** │ "
+            f"🚫 Bloqueadas: **{len(self.blocked)}** │ "
+            f"❌ Falhas: **{len(self.failed)}**"
+        )
+
+
+def retry_after(error: discord.HTTPException, default: float) -> float:
+    """Extrai o Retry-After de um 429 (header ou corpo da resposta); também usado pelo voice_mover"""
+    seconds = getattr(error, 'retry_after', None)
+    if seconds:
+        return float(seconds)
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    for header in ('Retry-After', 'X-RateLimit-Reset-After'):
+        value = headers.get(header)
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    return default
+
+
+async def dispatch_dms(members, build_message, concurrency: int = 5, max_retries: int = 3,
+                       progress_callback=None, progress_interval: float = 3.0) -> DMDispatchResult:
+    """
+    Envia uma DM para cada membro com no máximo `concurrency` envios simultâneos.
+
+    build_message(member) -> dict de kwargs para member.send (embed, content, file...).
+        É chamado a cada tentativa, então pode criar um discord.File novo por envio.
+    progress_callback(result) -> corrotina chamada no máximo a cada progress_interval
+        segundos e uma última vez ao final (útil para editar a mensagem de status).
+    """
+    members = list(members)
+    result = DMDispatchResult(len(members))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    last_progress = time.monotonic()
+    progress_lock = asyncio.Lock()
+
+    async def report_progress(force: bool = False):
+        nonlocal last_progress
+        if progress_callback is None:
+            return
+        async with progress_lock:
+            now = time.monotonic()
+            if not force and now - last_progress < progress_interval:
+                return
+            last_progress = now
+            try:
+                await progress_callback(result)
+            except Exception as e:
+                logger.warning(f"Erro ao atualizar progresso do envio de DMs: {e}")
+
+    async def send_one(member):
+        async with semaphore:
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    await member.send(**build_message(member))
+                    result.sent.append(member)
+                    break
+                except discord.Forbidden:
+                    result.blocked.append(member)
+                    break
+                except discord.HTTPException as e:
+                    if e.code == CANNOT_MESSAGE_USER:
+                        result.blocked.append(member)
+                        break
+                    if attempt <= max_retries and (e.status == 429 or e.status >= 500):
+                        wait = retry_after(e, 2 ** attempt) if e.status == 429 else 2 ** attempt
+                        logger.warning(f"DM para {member.display_name} (ID: {member.id}) recebeu HTTP {e.status}, tentando novamente em {wait:.1f}s")
+                        await asyncio.sleep(wait)
+                        continue
+                    result.failed.append((member, f"HTTP {e.status}: {e.text or e}"))
+                    logger.warning(f"Erro ao enviar DM para {member.display_name} (ID: {member.id}): {e}")
+                    break
+                except Exception as e:
+                    result.failed.append((member, str(e)))
+                    logger.warning(f"Erro ao enviar DM para {member.display_name} (ID: {member.id}): {e}")
+                    break
+        await report_progress()
+
+    await asyncio.gather(*(send_one(member) for member in members))
+    result.elapsed = time.monotonic() - result.started_at
+    await report_progress(force=True)
+    return result
@@ -1,18 +1,28 @@
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import os
+import importlib.util
 import io
+import asyncio
+import time
 import logging
 from datetime import datetime
 from pytz import timezone
-from config import DISCORD_TOKEN, BDO_CLASSES, DATABASE_NAME, DATABASE_URL, ALLOWED_DM_ROLES, NOTIFICATION_CHANNEL_ID, GUILD_MEMBER_ROLE_ID, DM_REPORT_CHANNEL_ID, LIST_CHANNEL_ID, MOVE_LOG_CHANNEL_ID, REGISTERED_ROLE_ID, UNREGISTERED_ROLE_ID, GS_UPDATE_REMINDER_DAYS, GS_REMINDER_CHECK_HOUR, ADMIN_USER_IDS, ADMIN_ROLE_IDS, CENSO_COMPLETO_ROLE_ID, SEM_CENSO_ROLE_ID, GOOGLE_SHEETS_ENABLED, GOOGLE_SHEETS_SPREADSHEET_ID, GOOGLE_SHEETS_WORKSHEET_NAME, GOOGLE_SHEETS_CREDENTIALS_PATH
+from config import DISCORD_TOKEN, BDO_CLASSES, DATABASE_NAME, DATABASE_URL, ALLOWED_DM_ROLES, NOTIFICATION_CHANNEL_ID, GUILD_MEMBER_ROLE_ID, DM_REPORT_CHANNEL_ID, LIST_CHANNEL_ID, MOVE_LOG_CHANNEL_ID, REGISTERED_ROLE_ID, UNREGISTERED_ROLE_ID, GS_UPDATE_REMINDER_DAYS, GS_REMINDER_CHECK_HOUR, ADMIN_USER_IDS, ADMIN_ROLE_IDS, CENSO_COMPLETO_ROLE_ID, SEM_CENSO_ROLE_ID, GOOGLE_SHEETS_ENABLED, GOOGLE_SHEETS_SPREADSHEET_ID, GOOGLE_SHEETS_WORKSHEET_NAME, GOOGLE_SHEETS_CREDENTIALS_PATH, DM_DISPATCH_CONCURRENCY, VOICE_MOVE_CONCURRENCY, ROLE_SYNC_CONCURRENCY, STATS_PAGE_SIZE, GOOGLE_SHEETS_FLUSH_INTERVAL, GOOGLE_SHEETS_BATCH_SIZE, HISTORY_COMPACTION_ENABLED, HISTORY_WEEKLY_AFTER_DAYS, HISTORY_MONTHLY_AFTER_DAYS, PROGRESSION_STAGNANT_DAYS, POSTGRES_POOL_STATS_INTERVAL
 from datetime import timedelta
 # Importar o banco de dados apropriado
 if DATABASE_URL:
     from database_postgres import Database
 else:
     from database import Database
+from async_database import AsyncDatabase
+from roster_index import RosterIndex
+from ranking import GearscoreRanking
+from class_stats import ClassStatisticsIndex
+from dm_dispatcher import dispatch_dms
+from voice_mover import move_members
+from sheets_writer import SheetsClient, SheetsWriteQueue, build_censo_headers, build_censo_row
+from timestamps import parse_timestamp, utcnow
 
 # Configuração do bot
 intents = discord.Intents.default()
@@ -101,195 +111,62 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Inicializar banco de dados
-db = Database()
+# Inicializar banco de dados (fachada assíncrona: consultas rodam fora do event loop)
+db = AsyncDatabase(Database())
 logger.info("Banco de dados inicializado")
 
 # Verificar se Google Sheets está disponível
 GOOGLE_SHEETS_AVAILABLE = False
 if GOOGLE_SHEETS_ENABLED:
-    try:
-        import gspread
-        from google.oauth2.service_account import Credentials
+    # Só verificar se a biblioteca está instalada; o import de verdade fica no sheets_writer
+    if importlib.util.find_spec("gspread") is not None:
         GOOGLE_SHEETS_AVAILABLE = True
         logger.info("Integração com Google Sheets habilitada")
-    except ImportError:
+    else:
         logger.warning("Biblioteca gspread não instalada. Integração com Google Sheets desabilitada.")
-        GOOGLE_SHEETS_AVAILABLE = False
+
+# Cliente do Google Sheets (autenticado uma vez) e fila de escrita em lote
+sheets_client = None
+sheets_queue = None
+if GOOGLE_SHEETS_AVAILABLE and GOOGLE_SHEETS_SPREADSHEET_ID:
+    sheets_client = SheetsClient(
+        GOOGLE_SHEETS_CREDENTIALS_PATH,
+        GOOGLE_SHEETS_SPREADSHEET_ID,
+        GOOGLE_SHEETS_WORKSHEET_NAME
+    )
+    sheets_queue = SheetsWriteQueue(
+        sheets_client,
+        flush_interval=GOOGLE_SHEETS_FLUSH_INTERVAL,
+        batch_size=GOOGLE_SHEETS_BATCH_SIZE
+    )
 
 # Função helper para enviar dados para Google Sheets
-async def enviar_para_google_sheets(censo_data: dict, user_display_name: str, timestamp, campos: list = None):
-    """Envia dados do censo para Google Sheets usando campos personalizados"""
+async def enviar_para_google_sheets(censo_data: dict, user_display_name: str, timestamp, campos: list = None, wait: bool = False):
+    """
+    Enfileira os dados do censo para o Google Sheets usando campos personalizados.
+    As linhas são gravadas em lote pela fila de escrita; com wait=True aguarda a
+    gravação e retorna se deu certo, senão retorna True assim que a linha entra na fila.
+    """
     if not GOOGLE_SHEETS_ENABLED or not GOOGLE_SHEETS_AVAILABLE:
         return False
     
     try:
-        if not GOOGLE_SHEETS_SPREADSHEET_ID:
+        if not GOOGLE_SHEETS_SPREADSHEET_ID or sheets_queue is None:
             logger.warning("GOOGLE_SHEETS_SPREADSHEET_ID não configurado")
             return False
         
-        import gspread
-        from google.oauth2.service_account import Credentials
-        
-        # Autenticar
-        scope = ['https://spreadsheets.google.com/feeds',
-                 'https://www.googleapis.com/auth/drive']
-        
-        if not os.path.exists(GOOGLE_SHEETS_CREDENTIALS_PATH):
-            logger.error(f"Arquivo de credenciais não encontrado: {GOOGLE_SHEETS_CREDENTIALS_PATH}")
-            return False
-        
-        creds = Credentials.from_service_account_file(
-            GOOGLE_SHEETS_CREDENTIALS_PATH, 
-            scopes=scope
-        )
-        client = gspread.authorize(creds)
-        
-        # Abrir planilha
-        spreadsheet = client.open_by_key(GOOGLE_SHEETS_SPREADSHEET_ID)
-        
-        # Selecionar ou criar worksheet
-        try:
-            worksheet = spreadsheet.worksheet(GOOGLE_SHEETS_WORKSHEET_NAME)
-        except gspread.exceptions.WorksheetNotFound:
-            worksheet = spreadsheet.add_worksheet(
-                title=GOOGLE_SHEETS_WORKSHEET_NAME, 
-                rows=1000, 
-                cols=20
-            )
-            logger.info(f"Worksheet '{GOOGLE_SHEETS_WORKSHEET_NAME}' criada")
-        
         # Usar campos personalizados ou campos padrão
         if not campos:
             campos = list(censo_data.keys())
         
-        # Criar cabeçalhos: Data/Hora, Nome Discord, Nome de Família, e depois os campos personalizados
-        # Remover "Nome Discord" dos campos se estiver duplicado
-        campos_sem_duplicado = [c for c in campos if c != 'Nome Discord']
-        headers = ['Data/Hora', 'Nome Discord', 'Nome de Família'] + campos_sem_duplicado
-        
-        # Verificar se já tem cabeçalhos
-        try:
-            all_values = worksheet.get_all_values()
-            logger.info(f"Valores atuais na planilha: {len(all_values)} linhas")
-            
-            if not all_values or len(all_values) == 0:
-                # Planilha vazia, adicionar cabeçalhos
-                worksheet.insert_row(headers, 1)
-                logger.info(f"Cabeçalhos adicionados (planilha vazia): {headers}")
-            else:
-                first_row = all_values[0]
-                logger.info(f"Primeira linha encontrada: {first_row}")
-                
-                if not first_row or first_row[0] != 'Data/Hora':
-                    # Adicionar cabeçalhos se não existirem
-                    worksheet.insert_row(headers, 1)
-                    logger.info(f"Cabeçalhos adicionados: {headers}")
-                else:
-                    # Verificar se os cabeçalhos precisam ser atualizados
-                    if len(first_row) != len(headers) or first_row != headers:
-                        logger.info(f"Cabeçalhos diferentes detectados. Atualizando...")
-                        logger.info(f"  - Cabeçalhos atuais: {first_row}")
-                        logger.info(f"  - Cabeçalhos esperados: {headers}")
-                        # Atualizar cabeçalhos se diferentes
-                        worksheet.delete_rows(1)
-                        worksheet.insert_row(headers, 1)
-                        logger.info(f"Cabeçalhos atualizados: {headers}")
-                    else:
-                        logger.info(f"Cabeçalhos já estão corretos: {headers}")
-        except Exception as e:
-            logger.warning(f"Erro ao verificar/atualizar cabeçalhos: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-            # Tentar adicionar cabeçalhos mesmo assim
-            try:
-                worksheet.insert_row(headers, 1)
-                logger.info(f"Cabeçalhos adicionados após erro: {headers}")
-            except Exception as e2:
-                logger.error(f"Erro ao adicionar cabeçalhos após erro inicial: {e2}")
-        
-        # Preparar dados para inserir
-        sao_paulo_tz = timezone('America/Sao_Paulo')
-        if isinstance(timestamp, str):
-            timestamp = datetime.fromisoformat(timestamp)
-        if timestamp.tzinfo is None:
-            timestamp = sao_paulo_tz.localize(timestamp)
-        
-        # Buscar nome de família dos dados ou do censo_data
-        family_name = censo_data.get('family_name') or censo_data.get('nome_familia') or ''
-        
-        # Criar row_data: Data/Hora, Nome Discord, Nome de Família, e depois valores dos campos
-        row_data = [
-            timestamp.strftime('%d/%m/%Y %H:%M:%S'),
-            user_display_name,
-            family_name
-        ]
-        
-        # Mapear campos da estrutura fixa para os dados
-        campo_mapping = {
-            'Nome Discord': 'nome_discord',
-            'Classe': 'classe',
-            'Awk/Succ': 'awk_succ',
-            'AP MAIN': 'ap_main',
-            'AP AWK': 'ap_awk',
-            'Defesa': 'defesa',
-            'Edania': 'edania',
-            'Funções': 'funcoes',
-            'Gear Image': 'gear_image_url',
-            'Passiva Node Image': 'passiva_node_image_url'
-        }
+        headers = build_censo_headers(campos)
+        row_data = build_censo_row(censo_data, user_display_name, timestamp, campos)
         
-        # Adicionar valores dos campos na ordem definida
-        for campo in campos:
-            # Verificar se é campo da estrutura fixa
-            if campo in campo_mapping:
-                chave_dados = campo_mapping[campo]
-                valor = censo_data.get(chave_dados, '')
-                
-                # Processar valores especiais
-                if chave_dados == 'funcoes' and isinstance(valor, list):
-                    valor = ', '.join([f.replace("nao", "Não").title() for f in valor])
-                elif valor is None:
-                    valor = ''
-                    
-                row_data.append(str(valor) if valor else '')
-            else:
-                # Campo personalizado (buscar direto)
-                valor = censo_data.get(campo, '')
-                row_data.append(str(valor) if valor else '')
-        
-        # Log detalhado antes de adicionar
-        logger.info(f"Preparando para adicionar linha no Google Sheets:")
-        logger.info(f"  - Planilha ID: {GOOGLE_SHEETS_SPREADSHEET_ID}")
-        logger.info(f"  - Worksheet: {GOOGLE_SHEETS_WORKSHEET_NAME}")
-        logger.info(f"  - Dados: {row_data}")
-        logger.info(f"  - Total de colunas: {len(row_data)}")
-        logger.info(f"  - Censo data keys: {list(censo_data.keys())}")
-        
-        # Adicionar linha
-        try:
-            # Verificar número de linhas antes
-            num_rows_before = len(worksheet.get_all_values())
-            logger.info(f"Linhas na planilha antes: {num_rows_before}")
-            
-            worksheet.append_row(row_data)
-            
-            # Verificar número de linhas depois
-            num_rows_after = len(worksheet.get_all_values())
-            logger.info(f"Linhas na planilha depois: {num_rows_after}")
-            
-            if num_rows_after > num_rows_before:
-                logger.info(f"✅ Linha adicionada com sucesso no Google Sheets! (Linha {num_rows_after})")
-            else:
-                logger.warning(f"⚠️ Linha pode não ter sido adicionada (antes: {num_rows_before}, depois: {num_rows_after})")
-                
-        except Exception as append_error:
-            logger.error(f"❌ Erro ao adicionar linha: {append_error}")
-            import traceback
-            logger.error(traceback.format_exc())
-            raise
+        future = sheets_queue.enqueue(headers, row_data)
+        logger.info(f"Dados do censo enfileirados para Google Sheets: {user_display_name} ({len(campos)} campos)")
         
-        logger.info(f"Dados do censo enviados para Google Sheets: {user_display_name} ({len(campos)} campos)")
+        if wait:
+            return await future
         return True
         
     except Exception as e:
@@ -303,94 +180,31 @@ def calculate_gs(ap, aap, dp):
     """Calcula o Gearscore: maior entre AP ou AAP + DP"""
     return max(ap, aap) + dp
 
-# Função helper para calcular posição no ranking (otimizada)
-async def get_player_ranking_position(guild: discord.Guild, user_id: str, current_gs: int):
+# Função helper para recarregar o GS de um usuário no ranking a partir do banco
+async def refresh_ranking_entry(user_id: str):
+    """Relê o registro do usuário e atualiza (ou remove) sua entrada no ranking e nas estatísticas por classe"""
+    results = await db.get_gearscore(str(user_id))
+    class_stats.set_user(user_id, results or [])
+    if not results:
+        ranking.remove(user_id)
+        return
+    # Mesmo critério do GearscoreRanking.load: vale o maior GS entre os registros do usuário
+    ranking.upsert(user_id, max(r.gs for r in results))
+
+# Função helper para calcular posição no ranking
+async def get_player_ranking_position(guild: discord.Guild, user_id: str, current_gs: int = None):
     """
-    Calcula a posição do player no ranking de GS da guilda.
-    Retorna: (posicao, total_players, players_acima, players_abaixo, percentil)
+    Calcula a posição do player no ranking de GS da guilda usando o ranking em memória.
+    Se current_gs for diferente do GS atual do player, retorna a posição que ele teria com esse GS.
+    Retorna: dict com posicao, total_players, players_acima, players_abaixo, percentil (ou None)
     """
     try:
-        # Buscar apenas membros que têm o cargo da guilda
-        valid_user_ids = await get_guild_member_ids(guild)
-        logger.debug(f"get_player_ranking_position: valid_user_ids count = {len(valid_user_ids)}")
-        
-        if not valid_user_ids:
-            logger.debug("get_player_ranking_position: Nenhum membro válido encontrado")
-            return None
-        
-        # Se o user_id não está na lista de válidos, não tem ranking
-        # Garantir que user_id é string para comparação
-        user_id_str = str(user_id)
-        if user_id_str not in valid_user_ids:
-            logger.debug(f"get_player_ranking_position: user_id {user_id_str} não está na lista de válidos (total: {len(valid_user_ids)})")
+        if not guild:
             return None
         
-        # Buscar todos os gearscores (já filtrados por valid_user_ids)
-        all_gearscores = db.get_all_gearscores(valid_user_ids=valid_user_ids)
-        logger.debug(f"get_player_ranking_position: all_gearscores count = {len(all_gearscores) if all_gearscores else 0}")
-        
-        if not all_gearscores:
-            logger.debug("get_player_ranking_position: Nenhum gearscore encontrado")
-            return None
-        
-        # Processar e calcular GS de cada player (otimizado - sem verificar cargo novamente)
-        players_gs = []
-        for record in all_gearscores:
-            # Extrair dados do registro
-            if isinstance(record, dict):
-                record_user_id = record.get('user_id', '')
-                ap = record.get('ap', 0)
-                aap = record.get('aap', 0)
-                dp = record.get('dp', 0)
-            else:
-                record_user_id = record[1] if len(record) > 1 else ''
-                ap = record[5] if len(record) > 5 else 0
-                aap = record[6] if len(record) > 6 else 0
-                dp = record[7] if len(record) > 7 else 0
-            
-            # Não precisa verificar cargo novamente - já foi filtrado por valid_user_ids
-            # Apenas garantir que o user_id está no set válido (comparar como strings)
-            if str(record_user_id) not in valid_user_ids:
-                continue
-            
-            gs = max(ap, aap) + dp
-            players_gs.append({
-                'user_id': record_user_id,
-                'gs': gs
-            })
+        await ensure_ranking_loaded(guild)
         
-        if not players_gs:
-            return None
-        
-        # Ordenar por GS (maior para menor)
-        players_gs.sort(key=lambda x: x['gs'], reverse=True)
-        
-        # Encontrar posição do player atual
-        posicao = None
-        for idx, player in enumerate(players_gs, 1):
-            # Comparar como strings para garantir compatibilidade
-            if str(player['user_id']) == user_id_str:
-                posicao = idx
-                break
-        
-        if posicao is None:
-            logger.debug(f"get_player_ranking_position: Posição não encontrada para user_id {user_id}")
-            return None
-        
-        total_players = len(players_gs)
-        players_acima = posicao - 1
-        players_abaixo = total_players - posicao
-        
-        # Calcular percentil (0-100, onde 100 é o melhor)
-        percentil = int(round((total_players - posicao + 1) / total_players * 100))
-        
-        result = {
-            'posicao': posicao,
-            'total_players': total_players,
-            'players_acima': players_acima,
-            'players_abaixo': players_abaixo,
-            'percentil': percentil
-        }
+        result = ranking.position(guild.id, str(user_id), current_gs)
         logger.debug(f"get_player_ranking_position: Resultado = {result}")
         return result
     except Exception as e:
@@ -404,22 +218,83 @@ def has_guild_role(member: discord.Member) -> bool:
         return False
     return any(role.id == GUILD_MEMBER_ROLE_ID for role in member.roles)
 
+# Índice dos membros com cargo da guilda (construído no on_ready, mantido pelos eventos de membro)
+roster = RosterIndex(GUILD_MEMBER_ROLE_ID)
+
 # Função helper para obter todos os user_ids que têm o cargo da guilda
-async def get_guild_member_ids(guild: discord.Guild) -> set:
-    """Retorna um set com todos os IDs de usuários que têm o cargo da guilda"""
-    member_ids = set()
-    if not guild:
-        return member_ids
-    
-    role = guild.get_role(GUILD_MEMBER_ROLE_ID)
-    if not role:
-        return member_ids
-    
-    for member in guild.members:
-        if has_guild_role(member):
-            member_ids.add(str(member.id))
-    
-    return member_ids
+async def get_guild_member_ids(guild: discord.Guild) -> frozenset:
+    """Retorna um conjunto (somente leitura) com todos os IDs de usuários que têm o cargo da guilda"""
+    return roster.get_member_ids(guild)
+
+# Servidores cuja tabela guild_members (banco) já foi sincronizada com o índice de membros
+synced_membership_guilds = set()
+
+# Função helper para sincronizar a tabela de membros do banco com o índice de membros
+async def sync_guild_membership(guild: discord.Guild) -> str:
+    """
+    Garante que a tabela guild_members reflete o índice de membros (sincroniza na primeira chamada;
+    depois os eventos de membro mantêm a tabela) e retorna o guild_id para filtrar as consultas.
+    """
+    guild_id = str(guild.id)
+    if guild.id not in synced_membership_guilds:
+        added, removed = await db.sync_guild_members(guild_id, roster.get_member_ids(guild))
+        synced_membership_guilds.add(guild.id)
+        logger.info(f'Tabela de membros sincronizada para {guild.name} (ID: {guild.id}): +{added}/-{removed}')
+    return guild_id
+
+# Função helper para refletir no banco a entrada/saída de um membro do cargo da guilda
+async def update_guild_membership(guild: discord.Guild, user_id, is_member: bool):
+    """Atualiza uma linha da tabela guild_members (se falhar, a próxima consulta ressincroniza tudo)"""
+    if guild.id not in synced_membership_guilds:
+        return  # Ainda não sincronizada: a sincronização completa já vai refletir o membro
+    try:
+        await db.set_guild_member(str(guild.id), str(user_id), is_member)
+    except Exception as e:
+        synced_membership_guilds.discard(guild.id)
+        logger.error(f'Erro ao atualizar tabela de membros para {user_id} em {guild.name}: {e}')
+
+# Ranking de GS em memória (carregado do banco uma vez, atualizado a cada registro/atualização/exclusão)
+ranking = GearscoreRanking()
+
+# Estatísticas por classe em memória (mesmo ciclo de vida do ranking)
+class_stats = ClassStatisticsIndex()
+
+# Função helper para garantir que o ranking do servidor está carregado
+async def ensure_ranking_loaded(guild: discord.Guild):
+    """Carrega o ranking e as estatísticas por classe do banco (uma única vez) e os membros elegíveis do servidor"""
+    if not ranking.loaded or not class_stats.loaded:
+        all_gearscores = await db.get_all_gearscores()
+        ranking.load(all_gearscores)
+        class_stats.load(all_gearscores)
+        logger.info(f"Ranking de GS carregado em memória ({len(all_gearscores)} registro(s))")
+    if guild and not ranking.has_guild(guild.id):
+        ranking.set_members(guild.id, roster.get_member_ids(guild))
+    if guild and not class_stats.has_guild(guild.id):
+        class_stats.set_members(guild.id, roster.get_member_ids(guild))
+
+# Função helper para obter as estatísticas por classe dos membros da guilda
+async def get_class_statistics(guild: discord.Guild):
+    """Retorna [ClassStatistics] dos membros com cargo da guilda a partir dos agregados em memória"""
+    await ensure_ranking_loaded(guild)
+    return class_stats.statistics(guild.id)
+
+# Progressão dos membros da guilda (uma consulta em lote por servidor), em cache por dia
+progression_cache = {}  # {guild_id: (data UTC do cálculo, [ProgressionStats])}
+
+# Função helper para obter a progressão de todos os membros da guilda
+async def get_guild_progression(guild: discord.Guild):
+    """Retorna [ProgressionStats] dos membros com cargo da guilda (recalculado uma vez por dia)"""
+    today = utcnow().date()
+    cached = progression_cache.get(guild.id)
+    if cached and cached[0] == today:
+        return cached[1]
+    
+    guild_id = await sync_guild_membership(guild)
+    start = time.perf_counter()
+    stats = await db.get_progression_analytics(guild_id=guild_id)
+    progression_cache[guild.id] = (today, stats)
+    logger.info(f'Progressão da guilda calculada para {guild.name}: {len(stats)} players em {time.perf_counter() - start:.2f}s')
+    return stats
 
 # Função helper para atualizar o nickname do membro para o nome de família
 async def update_member_nickname(member: discord.Member, family_name: str) -> tuple:
@@ -453,6 +328,49 @@ async def update_member_nickname(member: discord.Member, family_name: str) -> tu
     except discord.HTTPException as e:
         return False, f"Erro ao alterar nickname: {str(e)}"
 
+# Função helper para calcular a diferença entre os cargos de registro atuais e os desejados
+def diff_registration_roles(member: discord.Member, has_registration: bool, registered_role, unregistered_role) -> tuple:
+    """
+    Retorna (cargos_a_adicionar, cargos_a_remover) para o membro.
+    - Com registro: "Registrado" sim, "Não Registrado" não
+    - Sem registro: "Registrado" não, "Não Registrado" apenas se tiver o cargo da guilda
+    """
+    to_add = []
+    to_remove = []
+    current_roles = member.roles
+    
+    if has_registration:
+        if registered_role and registered_role not in current_roles:
+            to_add.append(registered_role)
+        if unregistered_role and unregistered_role in current_roles:
+            to_remove.append(unregistered_role)
+    else:
+        if registered_role and registered_role in current_roles:
+            to_remove.append(registered_role)
+        if unregistered_role and has_guild_role(member) and unregistered_role not in current_roles:
+            to_add.append(unregistered_role)
+    
+    return to_add, to_remove
+
+# Função helper para aplicar uma diferença de cargos com uma única edição do membro
+async def apply_role_diff(member: discord.Member, to_add: list, to_remove: list, reason: str) -> bool:
+    """Aplica adições e remoções de cargos em um único member.edit. Retorna True se aplicou"""
+    if not to_add and not to_remove:
+        return True
+    
+    remove_ids = {role.id for role in to_remove}
+    new_roles = [role for role in member.roles if role.id not in remove_ids]
+    new_roles.extend(role for role in to_add if role not in new_roles)
+    
+    try:
+        await member.edit(roles=new_roles, reason=reason)
+        return True
+    except discord.Forbidden:
+        logger.warning(f"Sem permissão para gerenciar cargos de {member.display_name} (ID: {member.id})")
+    except discord.HTTPException as e:
+        logger.error(f"Erro ao gerenciar cargos de {member.display_name} (ID: {member.id}): {e}")
+    return False
+
 # Função helper para gerenciar cargos de registro
 async def update_registration_roles(member: discord.Member, has_registration: bool):
     """Atualiza os cargos de registro do membro baseado no status de registro"""
@@ -462,51 +380,76 @@ async def update_registration_roles(member: discord.Member, has_registration: bo
     registered_role = member.guild.get_role(REGISTERED_ROLE_ID)
     unregistered_role = member.guild.get_role(UNREGISTERED_ROLE_ID)
     
-    try:
-        if has_registration:
-            # Tem registro: dar cargo "Registrado" e remover "Não Registrado"
-            if registered_role and registered_role not in member.roles:
-                await member.add_roles(registered_role, reason="Registro de gearscore")
-            if unregistered_role and unregistered_role in member.roles:
-                await member.remove_roles(unregistered_role, reason="Registro de gearscore realizado")
-        else:
-            # Não tem registro: remover "Registrado" e dar "Não Registrado" (se tiver cargo membro)
-            if registered_role and registered_role in member.roles:
-                await member.remove_roles(registered_role, reason="Sem registro de gearscore")
-            if unregistered_role and has_guild_role(member) and unregistered_role not in member.roles:
-                await member.add_roles(unregistered_role, reason="Membro da guilda sem registro")
-    except discord.Forbidden:
-        logger.warning(f"Sem permissão para gerenciar cargos de {member.display_name} (ID: {member.id})")
-    except discord.HTTPException as e:
-        logger.error(f"Erro ao gerenciar cargos de {member.display_name} (ID: {member.id}): {e}")
+    to_add, to_remove = diff_registration_roles(member, has_registration, registered_role, unregistered_role)
+    reason = "Registro de gearscore" if has_registration else "Sem registro de gearscore"
+    await apply_role_diff(member, to_add, to_remove, reason)
 
 # Função helper para verificar e atualizar cargos de todos os membros da guilda
-async def sync_registration_roles(guild: discord.Guild):
-    """Sincroniza os cargos de registro de todos os membros da guilda"""
+async def sync_registration_roles(guild: discord.Guild) -> dict:
+    """
+    Sincroniza os cargos de registro de todos os membros da guilda.
+    Calcula a diferença de cargos de todos os membros de uma vez e só edita quem
+    realmente precisa mudar (em paralelo, com concorrência limitada).
+    Retorna: dict com checked, changed, failed, roles_added, roles_removed, elapsed
+    """
+    stats = {'checked': 0, 'changed': 0, 'failed': 0, 'roles_added': 0, 'roles_removed': 0, 'elapsed': 0.0}
     if not guild:
-        return
+        return stats
+    
+    started = time.monotonic()
     
     # Buscar todos os membros com cargo da guilda
     guild_member_ids = await get_guild_member_ids(guild)
     
     # Buscar todos os registros do banco
-    all_registered = db.get_all_gearscores(valid_user_ids=guild_member_ids)
+    all_registered = await db.get_all_gearscores(guild_id=await sync_guild_membership(guild))
     registered_user_ids = set()
     
     for record in all_registered:
-        if isinstance(record, dict):
-            user_id = record.get('user_id', '')
-        else:
-            user_id = record[1] if len(record) > 1 else ''
-        if user_id:
-            registered_user_ids.add(str(user_id))
+        if record.user_id:
+            registered_user_ids.add(record.user_id)
+    
+    registered_role = guild.get_role(REGISTERED_ROLE_ID)
+    unregistered_role = guild.get_role(UNREGISTERED_ROLE_ID)
     
-    # Atualizar cargos de cada membro
+    # Calcular a diferença de cargos de todos os membros em uma única passada
+    pending = []
     for user_id in guild_member_ids:
         member = guild.get_member(int(user_id))
-        if member:
-            has_registration = user_id in registered_user_ids
-            await update_registration_roles(member, has_registration)
+        if not member:
+            continue
+        stats['checked'] += 1
+        has_registration = user_id in registered_user_ids
+        to_add, to_remove = diff_registration_roles(member, has_registration, registered_role, unregistered_role)
+        if to_add or to_remove:
+            pending.append((member, to_add, to_remove, has_registration))
+            stats['roles_added'] += len(to_add)
+            stats['roles_removed'] += len(to_remove)
+    
+    # Aplicar apenas as diferenças, em paralelo
+    semaphore = asyncio.Semaphore(max(1, ROLE_SYNC_CONCURRENCY))
+    
+    async def apply(member, to_add, to_remove, has_registration):
+        async with semaphore:
+            reason = "Sincronização de cargos de registro" + (" (com registro)" if has_registration else " (sem registro)")
+            return await apply_role_diff(member, to_add, to_remove, reason)
+    
+    results = await asyncio.gather(*(apply(*item) for item in pending))
+    stats['changed'] = sum(1 for ok in results if ok)
+    stats['failed'] = len(results) - stats['changed']
+    stats['elapsed'] = time.monotonic() - started
+    return stats
+
+# Função helper para criar o callback de progresso do envio de DMs em massa
+def make_dm_progress_callback(status_message, titulo: str):
+    """Retorna uma corrotina que edita a mensagem de status com o progresso do envio"""
+    async def callback(result):
+        await status_message.edit(
+            content=f"{titulo}\n"
+                    f"📊 Progresso: **{result.done}/{result.total}**\n"
+                    f"{result.summary()}"
+        )
+    return callback
 
 # Função helper para verificar e enviar lembretes de atualização de GS
 async def check_gs_update_reminders(guild: discord.Guild):
@@ -521,61 +464,33 @@ async def check_gs_update_reminders(guild: discord.Guild):
         return
     
     # Buscar todos os registros do banco
-    all_registered = db.get_all_gearscores(valid_user_ids=guild_member_ids)
+    all_registered = await db.get_all_gearscores(guild_id=await sync_guild_membership(guild))
     
-    # Data limite para considerar desatualizado
-    now = datetime.now()
+    # Data limite para considerar desatualizado (updated_at vem do banco em UTC com timezone)
+    now = utcnow()
     limit_date = now - timedelta(days=GS_UPDATE_REMINDER_DAYS)
     
-    reminders_sent = 0
     errors = 0
+    reminder_embeds = {}  # {member.id: embed}
+    reminder_members = []
+    reminder_days = {}
     
     for record in all_registered:
         try:
-            # Extrair dados do registro
-            if isinstance(record, dict):
-                user_id = record.get('user_id', '')
-                family_name = record.get('family_name', 'N/A')
-                class_pvp = record.get('class_pvp', 'N/A')
-                ap = record.get('ap', 0)
-                aap = record.get('aap', 0)
-                dp = record.get('dp', 0)
-                updated_at = record.get('updated_at')
-            else:
-                # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                user_id = str(record[1]) if len(record) > 1 else ''
-                family_name = record[2] if len(record) > 2 else 'N/A'
-                class_pvp = record[4] if len(record) > 4 else 'N/A'
-                ap = record[5] if len(record) > 5 else 0
-                aap = record[6] if len(record) > 6 else 0
-                dp = record[7] if len(record) > 7 else 0
-                updated_at = record[9] if len(record) > 9 else None
-            
-            if not user_id or not updated_at:
-                continue
+            user_id = record.user_id
+            family_name = record.family_name
+            class_pvp = record.class_pvp
+            ap, aap, dp = record.ap, record.aap, record.dp
             
-            # Converter updated_at para datetime
-            if isinstance(updated_at, str):
-                # Tentar diferentes formatos
-                for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f']:
-                    try:
-                        updated_datetime = datetime.strptime(updated_at.split('+')[0].split('Z')[0], fmt)
-                        break
-                    except:
-                        continue
-                else:
-                    continue
-            elif hasattr(updated_at, 'replace'):  # datetime object
-                updated_datetime = updated_at.replace(tzinfo=None) if updated_at.tzinfo else updated_at
-            else:
+            if not user_id or not record.updated_at:
                 continue
             
             # Verificar se está desatualizado
-            if updated_datetime >= limit_date:
+            if record.updated_at >= limit_date:
                 continue  # Atualizado recentemente, pular
             
             # Calcular dias desde última atualização
-            days_since_update = (now - updated_datetime).days
+            days_since_update = (now - record.updated_at).days
             
             # Buscar membro no servidor
             member = guild.get_member(int(user_id))
@@ -586,8 +501,7 @@ async def check_gs_update_reminders(guild: discord.Guild):
             if not has_guild_role(member):
                 continue
             
-            # Calcular GS atual
-            gs_total = calculate_gs(ap, aap, dp)
+            gs_total = record.gs
             
             # Criar embed de lembrete
             embed = discord.Embed(
@@ -616,24 +530,36 @@ async def check_gs_update_reminders(guild: discord.Guild):
                 inline=False
             )
             
-            embed.set_footer(text=f"Última atualização: {updated_datetime.strftime('%d/%m/%Y às %H:%M')}")
+            updated_local = record.updated_at.astimezone(timezone('America/Sao_Paulo'))
+            embed.set_footer(text=f"Última atualização: {updated_local.strftime('%d/%m/%Y às %H:%M')}")
             
-            # Enviar DM
-            try:
-                await member.send(embed=embed)
-                reminders_sent += 1
-                logger.info(f"Lembrete de GS enviado para {member.display_name} (ID: {user_id}) - {days_since_update} dias sem atualizar")
-            except discord.Forbidden:
-                logger.warning(f"Não foi possível enviar lembrete para {member.display_name} (ID: {user_id}) - DM bloqueada")
-            except Exception as e:
-                logger.error(f"Erro ao enviar lembrete para {member.display_name} (ID: {user_id}): {e}")
-                errors += 1
+            if member.id not in reminder_embeds:
+                reminder_members.append(member)
+            reminder_embeds[member.id] = embed
+            reminder_days[member.id] = days_since_update
                 
         except Exception as e:
             logger.error(f"Erro ao processar registro para lembrete: {e}")
             errors += 1
     
-    return reminders_sent, errors
+    # Enviar DMs em paralelo (concorrência limitada)
+    result = await dispatch_dms(
+        reminder_members,
+        lambda member: {'embed': reminder_embeds[member.id]},
+        concurrency=DM_DISPATCH_CONCURRENCY
+    )
+    
+    for member in result.sent:
+        logger.info(f"Lembrete de GS enviado para {member.display_name} (ID: {member.id}) - {reminder_days[member.id]} dias sem atualizar")
+    for member in result.blocked:
+        logger.warning(f"Não foi possível enviar lembrete para {member.display_name} (ID: {member.id}) - DM bloqueada")
+    for member, reason in result.failed:
+        logger.error(f"Erro ao enviar lembrete para {member.display_name} (ID: {member.id}): {reason}")
+    
+    errors += len(result.failed)
+    logger.info(f"Lembretes de GS: {len(result.sent)} enviados, {len(result.blocked)} bloqueados, {len(result.failed)} falhas em {result.elapsed:.1f}s")
+    
+    return len(result.sent), errors
 
 # Task que roda diariamente para enviar lembretes
 @tasks.loop(hours=24)
@@ -678,8 +604,9 @@ async def eventos_reset_task():
     if now.day == 1:
         logger.info("Dia 1 do mês - Iniciando reset de eventos do mês anterior...")
         try:
-            deleted = db.limpar_eventos_mes_anterior()
-            logger.info(f"Reset de eventos concluído: {deleted} eventos removidos")
+            deleted = await db.limpar_eventos_mes_anterior()
+            relatorio_cache.clear()
+            logger.info(f"Reset de eventos concluído: meses anteriores consolidados no resumo mensal, {deleted} eventos removidos")
         except Exception as e:
             logger.error(f"Erro ao fazer reset de eventos: {e}")
 
@@ -689,6 +616,50 @@ async def before_eventos_reset():
     await bot.wait_until_ready()
     logger.info("Task de reset mensal de eventos iniciada")
 
+# Task para compactar o histórico de GS antigo (opcional, HISTORY_COMPACTION_ENABLED)
+@tasks.loop(hours=24)
+async def history_compaction_task():
+    """Task que reduz o histórico antigo a uma entrada por semana/mês por personagem"""
+    now = utcnow()
+    weekly_before = now - timedelta(days=HISTORY_WEEKLY_AFTER_DAYS)
+    monthly_before = now - timedelta(days=HISTORY_MONTHLY_AFTER_DAYS)
+    try:
+        start = time.perf_counter()
+        deleted = await db.compact_gearscore_history(weekly_before, monthly_before)
+        logger.info(f"Compactação do histórico de GS concluída: {deleted} entradas removidas em {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        logger.error(f"Erro ao compactar histórico de GS: {e}")
+
+@history_compaction_task.before_loop
+async def before_history_compaction():
+    """Aguarda o bot estar pronto antes de iniciar a task"""
+    await bot.wait_until_ready()
+    logger.info("Task de compactação do histórico de GS iniciada")
+
+# Task para registrar o uso do pool de conexões do PostgreSQL (só existe nesse backend)
+@tasks.loop(minutes=max(POSTGRES_POOL_STATS_INTERVAL, 1))
+async def pool_stats_task():
+    """Task que loga espera e saturação do pool para acompanhar os horários de pico"""
+    # Leitura direta (sem passar pelo executor): com o pool saturado o executor pode estar todo ocupado
+    stats = db.sync.get_pool_stats()
+    message = (
+        f"Pool PostgreSQL: {stats['in_use']}/{stats['max_size']} em uso ({stats['saturation']:.0%}), "
+        f"{stats['idle']} ociosas, pico {stats['max_in_use']} | "
+        f"{stats['requests']} pedidos, {stats['waits']} esperas, {stats['timeouts']} timeouts | "
+        f"espera média {stats['avg_wait_time'] * 1000:.1f}ms, máxima {stats['max_wait_time'] * 1000:.1f}ms | "
+        f"conexões: {stats['connections_created']} criadas, {stats['connections_discarded']} descartadas, "
+        f"{stats['connections_recycled']} recicladas"
+    )
+    if stats['timeouts'] or stats['saturation'] >= 1:
+        logger.warning(message)
+    else:
+        logger.info(message)
+
+@pool_stats_task.before_loop
+async def before_pool_stats():
+    """Aguarda o bot estar pronto antes de iniciar a task"""
+    await bot.wait_until_ready()
+
 # Função helper para enviar notificação ao canal
 async def send_notification_to_channel(bot, interaction, action_type, nome_familia, classe_pvp, ap, aap, dp, linkgear):
     """Envia notificação de registro/atualização para o canal especificado"""
@@ -730,8 +701,11 @@ async def send_notification_to_channel(bot, interaction, action_type, nome_famil
         logger.error(f"Erro ao enviar notificação ao canal (ID: {NOTIFICATION_CHANNEL_ID}): {str(e)}")
 
 # Função helper para enviar log de movimentação de membros
-async def send_move_log_to_channel(bot, interaction, origin_channel, destination_channel, moved_count, failed_count, failed_members):
-    """Envia log de movimentação de membros para o canal de logs"""
+async def send_move_log_to_channel(bot, interaction, origin_channel, destination_channel, moved_count, failed_count, failed_members, move_result=None):
+    """
+    Envia log de movimentação de membros para o canal de logs.
+    move_result (opcional): VoiceMoveResult com a latência de cada membro e a duração total.
+    """
     try:
         channel = bot.get_channel(MOVE_LOG_CHANNEL_ID)
         if not channel:
@@ -792,6 +766,21 @@ async def send_move_log_to_channel(bot, interaction, origin_channel, destination
                         inline=False
                     )
             
+            # Tempos da movimentação (duração total e latência por membro)
+            if move_result and move_result.moved:
+                slowest = sorted(move_result.moved, key=lambda item: item[1], reverse=True)[:5]
+                slowest_list = "\n".join(
+                    f"• {member.display_name} - {latency * 1000:.0f} ms" for member, latency in slowest
+                )
+                embed.add_field(
+                    name="⏱️ Desempenho",
+                    value=f"**Duração total:** {move_result.elapsed:.2f}s\n"
+                          f"**Latência média:** {move_result.avg_latency * 1000:.0f} ms\n"
+                          f"**Latência máxima:** {move_result.max_latency * 1000:.0f} ms\n"
+                          f"**Mais lentos:**\n{slowest_list}",
+                    inline=False
+                )
+            
             embed.set_footer(text=f"Log gerado automaticamente")
             
             await channel.send(embed=embed)
@@ -825,11 +814,36 @@ async def on_ready():
     if not ADMIN_USER_IDS and not ADMIN_ROLE_IDS:
         logger.info(f'[ADMIN] Apenas administradores do servidor terão acesso aos comandos de ADMIN.')
     
+    # Construir índice de membros da guilda
+    for guild in bot.guilds:
+        total = roster.build(guild)
+        logger.info(f'Índice de membros construído para {guild.name} (ID: {guild.id}): {total} membro(s) com cargo da guilda')
+        try:
+            synced_membership_guilds.discard(guild.id)
+            await sync_guild_membership(guild)
+        except Exception as e:
+            logger.error(f'Erro ao sincronizar tabela de membros em {guild.name} (ID: {guild.id}): {e}')
+    
+    # Carregar ranking de GS em memória
+    for guild in bot.guilds:
+        try:
+            member_ids = roster.get_member_ids(guild)
+            ranking.set_members(guild.id, member_ids)
+            class_stats.set_members(guild.id, member_ids)
+            await ensure_ranking_loaded(guild)
+        except Exception as e:
+            logger.error(f'Erro ao carregar ranking de GS em {guild.name} (ID: {guild.id}): {e}')
+    
     # Sincronizar cargos de registro de todos os membros da guilda
     for guild in bot.guilds:
         try:
-            await sync_registration_roles(guild)
-            logger.info(f'Cargos de registro sincronizados para {guild.name} (ID: {guild.id})')
+            sync_stats = await sync_registration_roles(guild)
+            logger.info(
+                f'Cargos de registro sincronizados para {guild.name} (ID: {guild.id}): '
+                f'{sync_stats["checked"]} verificados, {sync_stats["changed"]} alterados '
+                f'(+{sync_stats["roles_added"]}/-{sync_stats["roles_removed"]} cargos), '
+                f'{sync_stats["failed"]} falhas em {sync_stats["elapsed"]:.1f}s'
+            )
         except Exception as e:
             logger.error(f'Erro ao sincronizar cargos em {guild.name} (ID: {guild.id}): {e}')
     
@@ -842,10 +856,31 @@ async def on_ready():
     if not eventos_reset_task.is_running():
         eventos_reset_task.start()
         logger.info('Task de reset mensal de eventos iniciada (executa no dia 1 de cada mês)')
+    
+    # Iniciar task de compactação do histórico de GS (opcional)
+    if HISTORY_COMPACTION_ENABLED and not history_compaction_task.is_running():
+        history_compaction_task.start()
+        logger.info(
+            f'Task de compactação do histórico iniciada (semanal após {HISTORY_WEEKLY_AFTER_DAYS} dias, '
+            f'mensal após {HISTORY_MONTHLY_AFTER_DAYS} dias)'
+        )
+    
+    # Iniciar task de estatísticas do pool de conexões (apenas PostgreSQL)
+    if POSTGRES_POOL_STATS_INTERVAL > 0 and hasattr(db.sync, 'get_pool_stats') and not pool_stats_task.is_running():
+        pool_stats_task.start()
+        logger.info(f'Task de estatísticas do pool iniciada (a cada {POSTGRES_POOL_STATS_INTERVAL:g} min)')
 
 @bot.event
 async def on_member_update(before: discord.Member, after: discord.Member):
     """Monitora mudanças de cargo dos membros para manter tracking de registro"""
+    was_member = roster.contains(after.guild, after.id)
+    roster.update_member(after)
+    is_member = roster.contains(after.guild, after.id)
+    ranking.set_member(after.guild.id, after.id, is_member)
+    class_stats.set_member(after.guild.id, after.id, is_member)
+    if is_member != was_member:
+        await update_guild_membership(after.guild, after.id, is_member)
+    
     # Verificar se o membro perdeu o cargo da guilda
     had_guild_role = has_guild_role(before)
     has_guild_role_now = has_guild_role(after)
@@ -873,7 +908,7 @@ async def on_member_update(before: discord.Member, after: discord.Member):
         try:
             # Verificar se tem registro
             user_id = str(after.id)
-            user_gear = db.get_gearscore(user_id)
+            user_gear = await db.get_gearscore(user_id)
             has_registration = bool(user_gear)
             
             # Atualizar cargos de registro
@@ -883,6 +918,48 @@ async def on_member_update(before: discord.Member, after: discord.Member):
         except Exception as e:
             logger.error(f'Erro ao atualizar cargos de registro de {after.display_name} (ID: {after.id}): {e}')
 
+@bot.event
+async def on_member_join(member: discord.Member):
+    """Mantém o índice de membros atualizado quando alguém entra no servidor"""
+    roster.update_member(member)
+    is_member = roster.contains(member.guild, member.id)
+    ranking.set_member(member.guild.id, member.id, is_member)
+    class_stats.set_member(member.guild.id, member.id, is_member)
+    if is_member:
+        await update_guild_membership(member.guild, member.id, True)
+
+@bot.event
+async def on_member_remove(member: discord.Member):
+    """Mantém o índice de membros atualizado quando alguém sai do servidor"""
+    was_member = roster.contains(member.guild, member.id)
+    roster.remove_member(member)
+    ranking.set_member(member.guild.id, member.id, False)
+    class_stats.set_member(member.guild.id, member.id, False)
+    if was_member:
+        await update_guild_membership(member.guild, member.id, False)
+
+@bot.event
+async def on_guild_join(guild: discord.Guild):
+    """Constrói o índice de membros ao entrar em um novo servidor"""
+    roster.build(guild)
+    try:
+        synced_membership_guilds.discard(guild.id)
+        await sync_guild_membership(guild)
+    except Exception as e:
+        logger.error(f'Erro ao sincronizar tabela de membros em {guild.name} (ID: {guild.id}): {e}')
+
+@bot.event
+async def on_guild_remove(guild: discord.Guild):
+    """Descarta o índice de membros ao sair de um servidor"""
+    roster.forget(guild)
+    ranking.forget_guild(guild.id)
+    class_stats.forget_guild(guild.id)
+    synced_membership_guilds.discard(guild.id)
+    try:
+        await db.sync_guild_members(str(guild.id), [])
+    except Exception as e:
+        logger.error(f'Erro ao limpar tabela de membros de {guild.name} (ID: {guild.id}): {e}')
+
 @bot.event
 async def on_message(message: discord.Message):
     # Ignorar mensagens do próprio bot
@@ -1026,7 +1103,7 @@ async def registro(
         
         # Registrar gearscore
         logger.info(f"Comando /registro executado por {interaction.user.display_name} (ID: {interaction.user.id}) - {nome_familia} ({classe_pvp}) - GS: {calculate_gs(ap, aap, dp)}")
-        db.register_gearscore(
+        await db.register_gearscore(
             user_id=user_id,
             family_name=nome_familia,
             character_name=nome_personagem,
@@ -1036,6 +1113,7 @@ async def registro(
             dp=dp,
             linkgear=linkgear
         )
+        await refresh_ranking_entry(user_id)
         
         # Adicionar cargo da guilda ao membro (se não tiver)
         member = interaction.guild.get_member(interaction.user.id)
@@ -1208,7 +1286,7 @@ async def registro_manual(
         
         # Registrar gearscore para o usuário selecionado
         logger.info(f"Comando /registro_manual executado por {interaction.user.display_name} (ID: {interaction.user.id}) para {usuario.display_name} (ID: {target_user_id}) - {nome_familia} ({classe_pvp}) - GS: {calculate_gs(ap, aap, dp)}")
-        db.register_gearscore(
+        await db.register_gearscore(
             user_id=target_user_id,
             family_name=nome_familia,
             character_name=nome_personagem,
@@ -1218,6 +1296,7 @@ async def registro_manual(
             dp=dp,
             linkgear=linkgear
         )
+        await refresh_ranking_entry(target_user_id)
         
         # Adicionar cargo da guilda ao membro selecionado (se não tiver)
         member = interaction.guild.get_member(usuario.id)
@@ -1417,7 +1496,7 @@ async def atualizar(
         user_id = str(interaction.user.id)
         
         # Verificar se já existe registro
-        current_data = db.get_user_current_data(user_id)
+        current_data = await db.get_user_current_data(user_id)
         if not current_data:
             await interaction.followup.send(
                 "❌ Você ainda não possui um registro! Use `/registro` primeiro.",
@@ -1480,23 +1559,14 @@ async def atualizar(
             nome_personagem = current_character_name
         
         # Buscar GS anterior antes de atualizar (apenas para mostrar diferença)
-        old_gs_data = db.get_gearscore(user_id)
+        old_gs_data = await db.get_gearscore(user_id)
         old_gs = None
         if old_gs_data:
-            result = old_gs_data[0]
-            if isinstance(result, dict):
-                old_ap = result.get('ap', 0)
-                old_aap = result.get('aap', 0)
-                old_dp = result.get('dp', 0)
-            else:
-                old_ap = result[5] if len(result) > 5 else 0
-                old_aap = result[6] if len(result) > 6 else 0
-                old_dp = result[7] if len(result) > 7 else 0
-            old_gs = calculate_gs(old_ap, old_aap, old_dp)
+            old_gs = old_gs_data[0].gs
         
         # Atualizar gearscore PRIMEIRO (mais rápido)
         logger.info(f"Comando /atualizar executado por {interaction.user.display_name} (ID: {user_id}) - {nome_familia} ({classe_pvp}) - GS: {calculate_gs(ap, aap, dp)}")
-        db.update_gearscore(
+        await db.update_gearscore(
             user_id=user_id,
             family_name=nome_familia,
             character_name=nome_personagem,
@@ -1506,6 +1576,7 @@ async def atualizar(
             dp=dp,
             linkgear=linkgear
         )
+        await refresh_ranking_entry(user_id)
         logger.info(f"Gearscore atualizado com sucesso para {interaction.user.display_name} (ID: {user_id})")
         
         # Atualizar nickname se o nome de família mudou
@@ -1631,7 +1702,7 @@ async def generate_profile_embed(interaction: discord.Interaction, target_user:
     if target_user_id is None:
         target_user_id = str(target_user.id)
     
-    results = db.get_gearscore(target_user_id)
+    results = await db.get_gearscore(target_user_id)
     
     if not results:
         return None
@@ -1639,98 +1710,36 @@ async def generate_profile_embed(interaction: discord.Interaction, target_user:
     # Agora só pode ter 1 resultado (1 classe por usuário)
     result = results[0]
     
-    # Formatar dados dependendo do banco
-    if isinstance(result, dict):
-        family_name = result.get('family_name', 'N/A')
-        character_name = result.get('character_name', family_name)
-        class_pvp = result.get('class_pvp', 'N/A')
-        ap = result.get('ap', 0)
-        aap = result.get('aap', 0)
-        dp = result.get('dp', 0)
-        linkgear = result.get('linkgear', 'N/A')
-        updated_at = result.get('updated_at', 'N/A')
-    else:
-        # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-        family_name = result[2] if len(result) > 2 else 'N/A'
-        character_name = result[3] if len(result) > 3 else family_name
-        class_pvp = result[4] if len(result) > 4 else 'N/A'
-        ap = result[5] if len(result) > 5 else 0
-        aap = result[6] if len(result) > 6 else 0
-        dp = result[7] if len(result) > 7 else 0
-        linkgear = result[8] if len(result) > 8 else 'N/A'
-        updated_at = result[9] if len(result) > 9 else 'N/A'
-    
-    gs_total = calculate_gs(ap, aap, dp)
-    
-    # Buscar histórico para verificar se foi criado ou atualizado
+    family_name = result.family_name
+    character_name = result.character_name or family_name
+    class_pvp = result.class_pvp
+    ap, aap, dp = result.ap, result.aap, result.dp
+    linkgear = result.linkgear
+    updated_at = result.updated_at
+    gs_total = result.gs
+    
+    # Resumo do histórico para verificar se foi criado ou atualizado
     try:
-        history = db.get_user_history(target_user_id, class_pvp)
-        is_created = len(history) == 1 if history else True
+        progress = await db.get_user_progress(target_user_id, class_pvp)
+        if not progress:
+            is_created = True
+        else:
+            updates = progress.get('updates', 0) if isinstance(progress, dict) else progress[3]
+            is_created = updates == 1
     except:
         is_created = False
     
-    # Formatar data
-    def format_date(date_str):
-        """Formata data para DD/MM/YYYY - HH:MM"""
-        try:
-            if isinstance(date_str, str) and date_str != 'N/A':
-                from datetime import datetime
-                formats = [
-                    '%Y-%m-%d %H:%M:%S',
-                    '%Y-%m-%d %H:%M:%S.%f',
-                    '%Y-%m-%dT%H:%M:%S',
-                    '%Y-%m-%dT%H:%M:%S.%f',
-                    '%Y-%m-%dT%H:%M:%S.%fZ'
-                ]
-                for fmt in formats:
-                    try:
-                        dt = datetime.strptime(date_str, fmt)
-                        return dt.strftime('%d/%m/%Y - %H:%M')
-                    except:
-                        continue
-                return date_str
-            elif hasattr(date_str, 'strftime'):
-                return date_str.strftime('%d/%m/%Y - %H:%M')
-            return str(date_str)
-        except:
-            return str(date_str) if date_str else 'N/A'
-    
     date_label = "Criado em" if is_created else "Atualizado em"
-    formatted_date = format_date(updated_at)
-    
-    # Buscar membros da guilda para calcular ranking e médias
-    valid_user_ids = await get_guild_member_ids(interaction.guild)
-    all_gearscores = db.get_all_gearscores(valid_user_ids=valid_user_ids)
-    
-    # Calcular ranking
-    def get_gs_from_result(result):
-        if isinstance(result, dict):
-            ap_val = result.get('ap', 0)
-            aap_val = result.get('aap', 0)
-            dp_val = result.get('dp', 0)
-        else:
-            # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-            ap_val = result[5] if len(result) > 5 else 0
-            aap_val = result[6] if len(result) > 6 else 0
-            dp_val = result[7] if len(result) > 7 else 0
-        return calculate_gs(ap_val, aap_val, dp_val)
-    
-    sorted_gearscores = sorted(all_gearscores, key=get_gs_from_result, reverse=True)
+    formatted_date = updated_at.strftime('%d/%m/%Y - %H:%M') if updated_at else 'N/A'
     
-    # Encontrar posição no ranking
+    # Posição no ranking (ranking em memória)
     ranking_position = None
-    for idx, gs_result in enumerate(sorted_gearscores, 1):
-        if isinstance(gs_result, dict):
-            gs_user_id = str(gs_result.get('user_id', ''))
-        else:
-            gs_user_id = str(gs_result[1] if len(gs_result) > 1 else '')
-        
-        if gs_user_id == target_user_id:
-            ranking_position = idx
-            break
+    ranking_info = await get_player_ranking_position(interaction.guild, target_user_id)
+    if ranking_info:
+        ranking_position = ranking_info['posicao']
     
     # Buscar estatísticas da guilda
-    stats = db.get_class_statistics(valid_user_ids=valid_user_ids)
+    stats = await get_class_statistics(interaction.guild)
     
     # Calcular média geral (Mouz)
     total_chars = 0
@@ -1738,14 +1747,7 @@ async def generate_profile_embed(interaction: discord.Interaction, target_user:
     class_avg_gs = 0
     
     for stat in stats:
-        if isinstance(stat, dict):
-            class_name = stat.get('class_pvp', 'Desconhecida')
-            total = stat.get('total', 0)
-            avg_gs = stat.get('avg_gs', 0)
-        else:
-            class_name = stat[0]
-            total = stat[1]
-            avg_gs = float(stat[2]) if len(stat) > 2 and stat[2] is not None else 0
+        class_name, total, avg_gs = stat.class_pvp, stat.total, stat.avg_gs
         
         total_chars += total
         total_weighted_gs += avg_gs * total
@@ -2008,9 +2010,6 @@ class MassDMModal(discord.ui.Modal, title="📢 Notificação em Massa"):
     async def on_submit(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
         
-        sent = 0
-        failed = 0
-        
         dm_embed = discord.Embed(
             title=f"📢 Aviso para {self.class_name}s",
             description=self.message.value,
@@ -2019,22 +2018,30 @@ class MassDMModal(discord.ui.Modal, title="📢 Notificação em Massa"):
         )
         dm_embed.set_footer(text="Staff Mouz")
         
+        members = []
         for family, display, gs, ap, aap, dp, uid, link in self.class_members:
             member = self.guild.get_member(int(uid)) if uid else None
             if member:
-                try:
-                    await member.send(embed=dm_embed)
-                    sent += 1
-                except:
-                    failed += 1
+                members.append(member)
+        
+        status_message = await interaction.followup.send(
+            f"📤 Enviando notificação para **{len(members)}** membro(s)...",
+            ephemeral=True,
+            wait=True
+        )
+        result = await dispatch_dms(
+            members,
+            lambda member: {'embed': dm_embed},
+            concurrency=DM_DISPATCH_CONCURRENCY,
+            progress_callback=make_dm_progress_callback(status_message, "📤 **Enviando notificação em massa...**")
+        )
         
         await interaction.followup.send(
             f"✅ **Notificação em massa enviada!**\n\n"
-            f"📤 Enviadas: **{sent}**\n"
-            f"❌ Falhas: **{failed}** (DMs bloqueadas)",
+            f"{result.summary()}",
             ephemeral=True
         )
-        logger.info(f"DM em massa enviada para classe {self.class_name}: {sent} enviadas, {failed} falhas")
+        logger.info(f"DM em massa enviada para classe {self.class_name}: {len(result.sent)} enviadas, {len(result.blocked)} bloqueadas, {len(result.failed)} falhas em {result.elapsed:.1f}s")
 
 
 # Helper para calcular indicador de GS
@@ -2240,9 +2247,6 @@ class RequestUpdateButton(discord.ui.Button):
     async def callback(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
         
-        sent = 0
-        failed = 0
-        
         dm_embed = discord.Embed(
             title="🔄 Solicitação de Atualização",
             description=f"Olá! A Staff da **Mouz** está solicitando que você atualize seu gearscore.\n\n"
@@ -2253,18 +2257,17 @@ class RequestUpdateButton(discord.ui.Button):
         )
         dm_embed.set_footer(text="Staff Mouz")
         
+        members = []
         for family, display, gs, ap, aap, dp, uid, link in self.parent_view.current_class_members:
             member = self.parent_view.guild.get_member(int(uid)) if uid else None
             if member:
-                try:
-                    await member.send(embed=dm_embed)
-                    sent += 1
-                except:
-                    failed += 1
+                members.append(member)
+        
+        result = await dispatch_dms(members, lambda member: {'embed': dm_embed}, concurrency=DM_DISPATCH_CONCURRENCY)
         
         await interaction.followup.send(
             f"✅ **Solicitação de atualização enviada!**\n"
-            f"📤 Enviadas: **{sent}** │ ❌ Falhas: **{failed}**",
+            f"{result.summary()}",
             ephemeral=True
         )
 
@@ -2289,9 +2292,6 @@ class RequestLinkButton(discord.ui.Button):
             await interaction.followup.send("✅ Todos os membros desta classe já têm link de gear!", ephemeral=True)
             return
         
-        sent = 0
-        failed = 0
-        
         dm_embed = discord.Embed(
             title="🔗 Solicitação de Link de Gear",
             description=f"Olá! Notamos que você ainda não adicionou o **link do seu gear** no registro.\n\n"
@@ -2302,18 +2302,17 @@ class RequestLinkButton(discord.ui.Button):
         )
         dm_embed.set_footer(text="Staff Mouz")
         
+        members = []
         for family, display, gs, ap, aap, dp, uid, link in no_link_members:
             member = self.parent_view.guild.get_member(int(uid)) if uid else None
             if member:
-                try:
-                    await member.send(embed=dm_embed)
-                    sent += 1
-                except:
-                    failed += 1
+                members.append(member)
+        
+        result = await dispatch_dms(members, lambda member: {'embed': dm_embed}, concurrency=DM_DISPATCH_CONCURRENCY)
         
         await interaction.followup.send(
             f"✅ **Solicitação de link enviada!**\n"
-            f"📤 Enviadas: **{sent}** │ ❌ Falhas: **{failed}**",
+            f"{result.summary()}",
             ephemeral=True
         )
 
@@ -2404,45 +2403,24 @@ class ClassStatsSelect(discord.ui.Select):
         logger.info(f"[DEBUG] valid_user_ids count: {len(self.valid_user_ids) if self.valid_user_ids else 0}")
         
         # Buscar membros da classe
-        all_gearscores = db.get_all_gearscores(valid_user_ids=self.valid_user_ids)
+        all_gearscores = await db.get_all_gearscores(guild_id=await sync_guild_membership(self.guild))
         
         # DEBUG: Log dos dados retornados
         logger.info(f"[DEBUG] Total de registros retornados: {len(all_gearscores) if all_gearscores else 0}")
-        if all_gearscores and len(all_gearscores) > 0:
-            sample = all_gearscores[0]
-            logger.info(f"[DEBUG] Tipo do registro: {type(sample)}")
-            logger.info(f"[DEBUG] Tamanho do registro: {len(sample) if hasattr(sample, '__len__') else 'N/A'}")
-            if not isinstance(sample, dict):
-                logger.info(f"[DEBUG] Registro completo: {sample}")
+        if all_gearscores:
+            logger.info(f"[DEBUG] Registro completo: {all_gearscores[0]}")
         
         class_members = []
         classes_found = set()  # DEBUG: Para coletar todas as classes encontradas
+        selected_class_key = str(selected_class).strip().lower()
         for record in all_gearscores:
-            if isinstance(record, dict):
-                class_pvp = record.get('class_pvp', '')
-                user_id = record.get('user_id', '')
-                family_name = record.get('family_name', 'N/A')
-                ap = record.get('ap', 0)
-                aap = record.get('aap', 0)
-                dp = record.get('dp', 0)
-                linkgear = record.get('linkgear', '')
-            else:
-                class_pvp = record[4] if len(record) > 4 else ''
-                user_id = record[1] if len(record) > 1 else ''
-                family_name = record[2] if len(record) > 2 else 'N/A'
-                ap = record[5] if len(record) > 5 else 0
-                aap = record[6] if len(record) > 6 else 0
-                dp = record[7] if len(record) > 7 else 0
-                linkgear = record[8] if len(record) > 8 else ''
-            
-            classes_found.add(str(class_pvp))  # DEBUG
+            classes_found.add(record.class_pvp)  # DEBUG
             
             # Comparação case-insensitive e com strip para evitar problemas
-            if str(class_pvp).strip().lower() == str(selected_class).strip().lower():
-                gs_total = max(int(ap or 0), int(aap or 0)) + int(dp or 0)
-                member = self.guild.get_member(int(user_id)) if user_id else None
+            if str(record.class_pvp).strip().lower() == selected_class_key:
+                member = self.guild.get_member(int(record.user_id)) if record.user_id else None
                 display_name = member.display_name if member else "Desconhecido"
-                class_members.append((family_name, display_name, gs_total, ap, aap, dp, user_id, linkgear))
+                class_members.append((record.family_name, display_name, record.gs, record.ap, record.aap, record.dp, record.user_id, record.linkgear))
         
         # DEBUG: Log das classes encontradas
         logger.info(f"[DEBUG] Classes encontradas nos dados: {classes_found}")
@@ -2568,7 +2546,7 @@ async def estatisticas_classes(interaction: discord.Interaction):
             )
             return
         
-        stats = db.get_class_statistics(valid_user_ids=valid_user_ids)
+        stats = await get_class_statistics(interaction.guild)
         
         if not stats:
             await interaction.followup.send(
@@ -2585,15 +2563,7 @@ async def estatisticas_classes(interaction: discord.Interaction):
         stats_list = []
         
         for stat in stats:
-            # Formatar dados dependendo do banco
-            if isinstance(stat, dict):
-                class_name = stat.get('class_pvp', 'Desconhecida')
-                total = stat.get('total', 0)
-                avg_gs = stat.get('avg_gs', 0)
-            else:
-                class_name = stat[0]
-                total = stat[1]
-                avg_gs = float(stat[2]) if len(stat) > 2 and stat[2] is not None else 0
+            class_name, total, avg_gs = stat.class_pvp, stat.total, stat.avg_gs
             
             total_chars += total
             total_weighted_gs += avg_gs * total
@@ -2712,6 +2682,78 @@ async def estatisticas_classes(interaction: discord.Interaction):
                 ephemeral=True
             )
 
+# View paginada do /stats (ranking completo da guilda)
+class StatsPaginationView(discord.ui.View):
+    """
+    Ranking de GS paginado. Cada página é buscada no banco por keyset (gs, id) a partir do
+    último registro da página anterior, então o custo por clique é constante mesmo com
+    milhares de membros; páginas já vistas ficam em cache (embed renderizado).
+    """
+    
+    def __init__(self, guild_id: str, total_players: int, page_size: int):
+        super().__init__(timeout=600)  # 10 minutos de timeout
+        self.guild_id = guild_id
+        self.total_players = total_players
+        self.page_size = page_size
+        self.total_pages = max(1, (total_players + page_size - 1) // page_size)
+        self.page = 0
+        self._pages = {}             # {página: embed renderizado}
+        self._has_next = {}          # {página: existe próxima página}
+        self._cursors = {0: None}    # {página: (gs, id) do último registro da página anterior}
+    
+    async def show_page(self, page: int) -> discord.Embed:
+        """Carrega (ou pega do cache) a página e atualiza o estado dos botões"""
+        if page not in self._pages:
+            records = await db.get_gearscores_page(
+                guild_id=self.guild_id,
+                limit=self.page_size + 1,  # Um a mais para saber se existe próxima página
+                after=self._cursors[page]
+            )
+            has_next = len(records) > self.page_size
+            records = records[:self.page_size]
+            if has_next:
+                self._cursors[page + 1] = (records[-1].gs, records[-1].id)
+            self._has_next[page] = has_next
+            self._pages[page] = self._render(page, records)
+        
+        self.page = page
+        self.previous_page.disabled = page == 0
+        self.next_page.disabled = not self._has_next[page]
+        return self._pages[page]
+    
+    def _render(self, page: int, records: list) -> discord.Embed:
+        embed = discord.Embed(
+            title="🏆 Ranking de Gearscore",
+            color=discord.Color.gold(),
+            timestamp=discord.utils.utcnow()
+        )
+        
+        for i, result in enumerate(records, page * self.page_size + 1):
+            info = f"**{result.family_name}**\n"
+            info += f"Classe: {result.class_pvp}\n"
+            info += f"AP: {result.ap} | AAP: {result.aap} | DP: {result.dp}\n"
+            info += f"**Total: {result.gs}**"
+            
+            medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"#{i}"
+            embed.add_field(name=f"{medal} {result.family_name}", value=info, inline=False)
+        
+        embed.set_footer(text=f"Página {page + 1} de {self.total_pages} | Total: {self.total_players} players")
+        return embed
+    
+    @discord.ui.button(label="⬅️ Anterior", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        embed = await self.show_page(max(0, self.page - 1))
+        await interaction.response.edit_message(embed=embed, view=self)
+    
+    @discord.ui.button(label="Próxima ➡️", style=discord.ButtonStyle.primary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if not self._has_next.get(self.page):
+            await interaction.response.defer()
+            return
+        embed = await self.show_page(self.page + 1)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+
 @bot.tree.command(name="stats", description="[ADMIN] Mostra estatísticas completas de todos os membros")
 async def stats(interaction: discord.Interaction):
     """Mostra lista completa de todos os membros com gearscore (apenas administradores)"""
@@ -2733,228 +2775,30 @@ async def stats(interaction: discord.Interaction):
         
         await interaction.response.defer(ephemeral=False)  # Não ephemeral para mostrar para todos
         
-        valid_user_ids = await get_guild_member_ids(interaction.guild)
-        results = db.get_all_gearscores(valid_user_ids=valid_user_ids)
+        # Total de players (consulta agregada) e primeira página; as demais são buscadas a cada clique
+        guild_id = await sync_guild_membership(interaction.guild)
+        total_players, _ = await db.get_gs_summary(guild_id=guild_id)
         
-        if not results:
+        if not total_players:
             await interaction.followup.send(
                 "❌ Nenhum gearscore cadastrado ainda!",
                 ephemeral=True
             )
             return
         
-        # Ordenar por gearscore total (MAX(AP, AAP) + DP) - do maior para o menor
-        def get_gs_from_result(result):
-            if isinstance(result, dict):
-                # MongoDB retorna como dict
-                ap = result.get('ap', 0)
-                aap = result.get('aap', 0)
-                dp = result.get('dp', 0)
-            else:
-                # SQLite/PostgreSQL: SELECT retorna tupla
-                # Ordem com character_name: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                # Ordem sem character_name: id(0), user_id(1), family_name(2), class_pvp(3), ap(4), aap(5), dp(6), linkgear(7), updated_at(8)
-                if len(result) >= 10:
-                    # Tem character_name
-                    ap = result[5] if len(result) > 5 else 0
-                    aap = result[6] if len(result) > 6 else 0
-                    dp = result[7] if len(result) > 7 else 0
-                else:
-                    # Não tem character_name (PostgreSQL antigo)
-                    ap = result[4] if len(result) > 4 else 0
-                    aap = result[5] if len(result) > 5 else 0
-                    dp = result[6] if len(result) > 6 else 0
-            
-            # Garantir que são inteiros
-            try:
-                ap = int(ap) if ap is not None else 0
-                aap = int(aap) if aap is not None else 0
-                dp = int(dp) if dp is not None else 0
-            except (ValueError, TypeError):
-                ap = 0
-                aap = 0
-                dp = 0
-            
-            return calculate_gs(ap, aap, dp)
-        
-        # Ordenar por GS (do maior para o menor)
-        sorted_results = sorted(results, key=get_gs_from_result, reverse=True)
-        
-        # Dividir em partes de 30 membros cada (similar às imagens)
-        members_per_page = 30
-        total_pages = (len(sorted_results) + members_per_page - 1) // members_per_page
-        
-        for page in range(total_pages):
-            start_idx = page * members_per_page
-            end_idx = min(start_idx + members_per_page, len(sorted_results))
-            page_results = sorted_results[start_idx:end_idx]
-            
-            embed = discord.Embed(
-                title=f"Membros (Geral) - Parte {page + 1}",
-                color=discord.Color.blue(),
-                timestamp=discord.utils.utcnow()
-            )
-            
-            # Criar lista de membros
-            members_list = []
-            for i, result in enumerate(page_results, start=start_idx + 1):
-                # Formatar dados dependendo do banco
-                if isinstance(result, dict):
-                    # MongoDB retorna como dict
-                    family_name = result.get('family_name', 'N/A')
-                    character_name = result.get('character_name', None)
-                    class_pvp = result.get('class_pvp', 'N/A')
-                    ap = result.get('ap', 0)
-                    aap = result.get('aap', 0)
-                    dp = result.get('dp', 0)
-                    linkgear = result.get('linkgear', 'N/A')
-                else:
-                    # SQLite/PostgreSQL: SELECT retorna tupla
-                    # Ordem: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                    # Mas PostgreSQL pode não ter character_name no SELECT, então verificar tamanho
-                    if len(result) >= 10:
-                        # Tem character_name
-                        family_name = result[2] if len(result) > 2 else 'N/A'
-                        character_name = result[3] if len(result) > 3 else None
-                        class_pvp = result[4] if len(result) > 4 else 'N/A'
-                        ap = result[5] if len(result) > 5 else 0
-                        aap = result[6] if len(result) > 6 else 0
-                        dp = result[7] if len(result) > 7 else 0
-                        linkgear_raw = result[8] if len(result) > 8 else 'N/A'
-                    else:
-                        # Não tem character_name (PostgreSQL antigo)
-                        family_name = result[2] if len(result) > 2 else 'N/A'
-                        character_name = None
-                        class_pvp = result[3] if len(result) > 3 else 'N/A'
-                        ap = result[4] if len(result) > 4 else 0
-                        aap = result[5] if len(result) > 5 else 0
-                        dp = result[6] if len(result) > 6 else 0
-                        linkgear_raw = result[7] if len(result) > 7 else 'N/A'
-                    
-                    # Se for datetime, significa que pegamos o campo errado, usar N/A
-                    if isinstance(linkgear_raw, datetime):
-                        linkgear = 'N/A'
-                    else:
-                        linkgear = linkgear_raw
-                
-                # Se character_name não foi definido, usar family_name
-                if character_name is None:
-                    character_name = family_name
-                
-                # Garantir que ap, aap, dp são inteiros
-                try:
-                    ap = int(ap) if ap is not None else 0
-                    aap = int(aap) if aap is not None else 0
-                    dp = int(dp) if dp is not None else 0
-                except (ValueError, TypeError):
-                    ap = 0
-                    aap = 0
-                    dp = 0
-                
-                gearscore_total = calculate_gs(ap, aap, dp)
-                
-                # Formatar link gear - garantir que é string e não datetime
-                if linkgear is None:
-                    linkgear_str = 'N/A'
-                elif isinstance(linkgear, datetime):
-                    # Se for datetime, significa que pegamos o campo errado, usar N/A
-                    linkgear_str = 'N/A'
-                else:
-                    linkgear_str = str(linkgear)
-                
-                if linkgear_str and linkgear_str != 'N/A' and linkgear_str != 'None' and linkgear_str.strip():
-                    # Verificar se é uma string válida antes de usar startswith
-                    linkgear_clean = linkgear_str.strip()
-                    if isinstance(linkgear_clean, str) and (linkgear_clean.startswith('http://') or linkgear_clean.startswith('https://')):
-                        # Link válido - criar markdown link do Discord
-                        link_text = f"([Link Gear]({linkgear_clean}))"
-                    elif isinstance(linkgear_clean, str) and linkgear_clean.strip():
-                        # Texto mas não é URL - tentar criar link mesmo assim (Discord pode não funcionar, mas mostra o texto)
-                        # Se não começa com http, adicionar https://
-                        if not linkgear_clean.startswith('http'):
-                            link_text = f"([Link Gear](https://{linkgear_clean}))"
-                        else:
-                            link_text = f"([Link Gear]({linkgear_clean}))"
-                    else:
-                        link_text = "(Link Gear)"
-                else:
-                    link_text = "(Link Gear)"
-                
-                # Formato: "1. Nome (Classe) - 861gs - (Link Gear)"
-                # Usar character_name se disponível, senão usar family_name
-                # Garantir que não está None ou vazio
-                if character_name and str(character_name).strip() and str(character_name) != 'N/A' and str(character_name) != 'None':
-                    display_name = str(character_name).strip()
-                elif family_name and str(family_name).strip() and str(family_name) != 'N/A':
-                    display_name = str(family_name).strip()
-                else:
-                    display_name = 'N/A'
-                
-                # Garantir que class_pvp não está vazio e é string
-                class_pvp_str = str(class_pvp).strip() if class_pvp and str(class_pvp) != 'N/A' else 'Desconhecida'
-                
-                # Debug: verificar se os valores estão corretos
-                # Se display_name parece ser um número, pode estar invertido
-                if display_name.isdigit() and class_pvp_str and not class_pvp_str.isdigit():
-                    # Parece estar invertido, trocar
-                    temp = display_name
-                    display_name = class_pvp_str
-                    class_pvp_str = temp
-                
-                member_line = f"{i}. {display_name} ({class_pvp_str}) - {gearscore_total}gs - {link_text}"
-                members_list.append(member_line)
-            
-            # Adicionar como campo de descrição (pode ter até 4096 caracteres)
-            description_text = "\n".join(members_list)
-            
-            # Se exceder o limite, dividir em chunks
-            max_length = 4096
-            if len(description_text) <= max_length:
-                embed.description = description_text
-            else:
-                # Dividir em múltiplos campos se necessário
-                current_chunk = []
-                current_length = 0
-                chunk_num = 1
-                
-                for member_line in members_list:
-                    line_length = len(member_line) + 1  # +1 para o \n
-                    if current_length + line_length > 1024:  # Limite por field
-                        embed.add_field(
-                            name=f"Lista {chunk_num}",
-                            value="\n".join(current_chunk),
-                            inline=False
-                        )
-                        current_chunk = [member_line]
-                        current_length = line_length
-                        chunk_num += 1
-                    else:
-                        current_chunk.append(member_line)
-                        current_length += line_length
-                
-                if current_chunk:
-                    embed.add_field(
-                        name=f"Lista {chunk_num}",
-                        value="\n".join(current_chunk),
-                        inline=False
-                    )
-            
-            embed.set_footer(text=f"Total: {len(sorted_results)} membros | Página {page + 1}/{total_pages}")
-            
-            if page == 0:
-                await interaction.followup.send(embed=embed)
-            else:
-                await interaction.channel.send(embed=embed)
+        view = StatsPaginationView(guild_id, total_players, STATS_PAGE_SIZE)
+        embed = await view.show_page(0)
+        await interaction.followup.send(embed=embed, view=view, ephemeral=True)
         
     except Exception as e:
         if interaction.response.is_done():
             await interaction.followup.send(
-                f"❌ Erro ao buscar estatísticas: {str(e)}",
+                f"❌ Erro ao buscar ranking: {str(e)}",
                 ephemeral=True
             )
         else:
             await interaction.response.send_message(
-                f"❌ Erro ao buscar estatísticas: {str(e)}",
+                f"❌ Erro ao buscar ranking: {str(e)}",
                 ephemeral=True
             )
 
@@ -2979,31 +2823,23 @@ async def ranking_gearscore(interaction: discord.Interaction):
         
         await interaction.response.defer(ephemeral=True)
         
-        valid_user_ids = await get_guild_member_ids(interaction.guild)
-        results = db.get_all_gearscores(valid_user_ids=valid_user_ids)
+        # Top 10 direto do ranking em memória; buscar no banco apenas os registros desses players
+        await ensure_ranking_loaded(interaction.guild)
+        top_players = ranking.top(interaction.guild.id, 10)
         
-        if not results:
+        if not top_players:
             await interaction.followup.send(
                 "❌ Nenhum gearscore cadastrado ainda!",
                 ephemeral=True
             )
             return
         
-        # Ordenar por gearscore total (MAX(AP, AAP) + DP)
-        # Formatar dados dependendo do banco
-        def get_gs_from_result(result):
-            if isinstance(result, dict):
-                ap = result.get('ap', 0)
-                aap = result.get('aap', 0)
-                dp = result.get('dp', 0)
-            else:
-                # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                ap = result[5] if len(result) > 5 else 0
-                aap = result[6] if len(result) > 6 else 0
-                dp = result[7] if len(result) > 7 else 0
-            return calculate_gs(ap, aap, dp)
-        
-        sorted_results = sorted(results, key=get_gs_from_result, reverse=True)
+        # Mesmo critério do ranking: para cada player, o registro (classe) de maior GS
+        best_by_user = {}
+        for record in await db.get_all_gearscores(valid_user_ids=[user_id for user_id, _ in top_players]):
+            best = best_by_user.get(record.user_id)
+            if best is None or record.gs > best.gs:
+                best_by_user[record.user_id] = record
         
         embed = discord.Embed(
             title="🏆 Ranking de Gearscore",
@@ -3011,30 +2847,19 @@ async def ranking_gearscore(interaction: discord.Interaction):
             timestamp=discord.utils.utcnow()
         )
         
-        for i, result in enumerate(sorted_results[:10], 1):  # Top 10
-            # Formatar dados dependendo do banco
-            if isinstance(result, dict):
-                family_name = result.get('family_name', 'N/A')
-                class_pvp = result.get('class_pvp', 'N/A')
-                ap = result.get('ap', 0)
-                aap = result.get('aap', 0)
-                dp = result.get('dp', 0)
-            else:
-                # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                family_name = result[2] if len(result) > 2 else 'N/A'
-                class_pvp = result[4] if len(result) > 4 else 'N/A'
-                ap = result[5] if len(result) > 5 else 0
-                aap = result[6] if len(result) > 6 else 0
-                dp = result[7] if len(result) > 7 else 0
-            
-            gearscore_total = calculate_gs(ap, aap, dp)
-            info = f"**{family_name}**\n"
-            info += f"Classe: {class_pvp}\n"
-            info += f"AP: {ap} | AAP: {aap} | DP: {dp}\n"
-            info += f"**Total: {gearscore_total}**"
+        position = 0
+        for user_id, _ in top_players:
+            result = best_by_user.get(user_id)
+            if result is None:
+                continue  # Registro removido entre a leitura do ranking e a consulta
+            position += 1
+            info = f"**{result.family_name}**\n"
+            info += f"Classe: {result.class_pvp}\n"
+            info += f"AP: {result.ap} | AAP: {result.aap} | DP: {result.dp}\n"
+            info += f"**Total: {result.gs}**"
             
-            medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"#{i}"
-            embed.add_field(name=f"{medal} {family_name}", value=info, inline=False)
+            medal = "🥇" if position == 1 else "🥈" if position == 2 else "🥉" if position == 3 else f"#{position}"
+            embed.add_field(name=f"{medal} {result.family_name}", value=info, inline=False)
         
         await interaction.followup.send(embed=embed, ephemeral=True)
         
@@ -3084,8 +2909,7 @@ async def membros_classe(interaction: discord.Interaction, classe: str):
         await interaction.response.defer(ephemeral=True)
         
         # Buscar apenas membros que têm o cargo da guilda
-        valid_user_ids = await get_guild_member_ids(interaction.guild)
-        members = db.get_class_members(classe, valid_user_ids=valid_user_ids)
+        members = await db.get_class_members(classe, guild_id=await sync_guild_membership(interaction.guild))
         
         if not members:
             await interaction.followup.send(
@@ -3095,19 +2919,7 @@ async def membros_classe(interaction: discord.Interaction, classe: str):
             return
         
         # Ordenar por GS (maior para menor)
-        def get_gs_from_member(member):
-            if isinstance(member, dict):
-                ap = member.get('ap', 0)
-                aap = member.get('aap', 0)
-                dp = member.get('dp', 0)
-            else:
-                # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                ap = member[5] if len(member) > 5 else 0
-                aap = member[6] if len(member) > 6 else 0
-                dp = member[7] if len(member) > 7 else 0
-            return calculate_gs(ap, aap, dp)
-        
-        sorted_members = sorted(members, key=get_gs_from_member, reverse=True)
+        sorted_members = sorted(members, key=lambda member: member.gs, reverse=True)
         
         # Criar embed principal
         embed = discord.Embed(
@@ -3119,47 +2931,11 @@ async def membros_classe(interaction: discord.Interaction, classe: str):
         
         # Adicionar informações de cada membro
         for i, member in enumerate(sorted_members, 1):
-            # Formatar dados dependendo do banco
-            if isinstance(member, dict):
-                family_name = member.get('family_name', 'N/A')
-                ap = member.get('ap', 0)
-                aap = member.get('aap', 0)
-                dp = member.get('dp', 0)
-                linkgear = member.get('linkgear', 'N/A')
-                updated_at = member.get('updated_at', 'N/A')
-            else:
-                # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                family_name = member[2] if len(member) > 2 else 'N/A'
-                ap = member[5] if len(member) > 5 else 0
-                aap = member[6] if len(member) > 6 else 0
-                dp = member[7] if len(member) > 7 else 0
-                linkgear = member[8] if len(member) > 8 else 'N/A'
-                updated_at = member[9] if len(member) > 9 else 'N/A'
-            
-            gs_total = calculate_gs(ap, aap, dp)
-            
-            # Formatar data de atualização
-            if updated_at and updated_at != 'N/A':
-                if hasattr(updated_at, 'strftime'):
-                    try:
-                        date_str = updated_at.strftime("%d/%m/%Y às %H:%M")
-                    except:
-                        date_str = str(updated_at)
-                elif isinstance(updated_at, str):
-                    try:
-                        from datetime import datetime
-                        if 'T' in updated_at:
-                            date_clean = updated_at.replace('Z', '+00:00').split('+')[0].split('.')[0]
-                            dt = datetime.fromisoformat(date_clean)
-                            date_str = dt.strftime("%d/%m/%Y às %H:%M")
-                        else:
-                            date_str = updated_at
-                    except:
-                        date_str = updated_at
-                else:
-                    date_str = str(updated_at)
-            else:
-                date_str = 'N/A'
+            family_name = member.family_name
+            ap, aap, dp = member.ap, member.aap, member.dp
+            linkgear = member.linkgear
+            gs_total = member.gs
+            date_str = member.updated_at.strftime("%d/%m/%Y às %H:%M") if member.updated_at else 'N/A'
             
             # Criar texto do membro
             member_info = f"**GS Total:** {gs_total}\n"
@@ -3236,7 +3012,7 @@ async def gearscore_dm(interaction: discord.Interaction):
     """Envia o gearscore do usuário via DM"""
     try:
         user_id = str(interaction.user.id)
-        results = db.get_gearscore(user_id)
+        results = await db.get_gearscore(user_id)
         
         if not results:
             await interaction.response.send_message(
@@ -3254,26 +3030,13 @@ async def gearscore_dm(interaction: discord.Interaction):
         # Enviar via DM (só pode ter 1 resultado agora)
         result = results[0]
         
-        # Formatar dados dependendo do banco
-        if isinstance(result, dict):
-            family_name = result.get('family_name', 'N/A')
-            class_pvp = result.get('class_pvp', 'N/A')
-            ap = result.get('ap', 0)
-            aap = result.get('aap', 0)
-            dp = result.get('dp', 0)
-            linkgear = result.get('linkgear', 'N/A')
-            updated_at = result.get('updated_at', 'N/A')
-        else:
-            # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-            family_name = result[2] if len(result) > 2 else 'N/A'
-            class_pvp = result[4] if len(result) > 4 else 'N/A'
-            ap = result[5] if len(result) > 5 else 0
-            aap = result[6] if len(result) > 6 else 0
-            dp = result[7] if len(result) > 7 else 0
-            linkgear = result[8] if len(result) > 8 else 'N/A'
-            updated_at = result[9] if len(result) > 9 else 'N/A'
+        family_name = result.family_name
+        class_pvp = result.class_pvp
+        ap, aap, dp = result.ap, result.aap, result.dp
+        linkgear = result.linkgear
+        updated_at = result.updated_at.strftime("%d/%m/%Y às %H:%M") if result.updated_at else 'N/A'
         
-        gs_total = calculate_gs(ap, aap, dp)
+        gs_total = result.gs
         embed = discord.Embed(
             title=f"📊 Gearscore - {class_pvp}",
             color=discord.Color.blue(),
@@ -3333,6 +3096,19 @@ async def voice_channel_autocomplete(
 # Tipos de eventos disponíveis
 TIPOS_EVENTO = ["GvG", "Treino"]
 
+# Relatórios de participação em cache por mês de referência (AAAA-MM); /lista e a limpeza mensal invalidam
+relatorio_cache = {}
+
+# Função helper para obter o relatório de participação de um mês (do cache quando possível)
+async def get_relatorio_participacoes_cached(mes_referencia: str = None):
+    """Retorna o relatório pivotado do mês (None = mês atual), consultando o banco só após um novo /lista"""
+    mes_referencia = mes_referencia or datetime.now().strftime("%Y-%m")
+    relatorio = relatorio_cache.get(mes_referencia)
+    if relatorio is None:
+        relatorio = await db.get_relatorio_participacoes(mes_referencia, TIPOS_EVENTO)
+        relatorio_cache[mes_referencia] = relatorio
+    return relatorio
+
 @bot.tree.command(name="lista", description="Cria uma lista dos membros em um canal de voz e registra participação")
 @app_commands.describe(
     sala="Canal de voz para listar os membros (digite para buscar)",
@@ -3403,21 +3179,23 @@ async def lista(interaction: discord.Interaction, sala: str, nome_lista: str, ti
         evento_registrado = False
         if tipo:
             try:
+                # Buscar family_name de todos os membros do canal em uma única consulta
+                family_names = await db.get_family_names_by_user_ids(
+                    [str(member.id) for member in members_in_voice]
+                )
+                
                 # Preparar lista de participantes
-                participantes = []
-                for member in members_in_voice:
-                    # Buscar family_name do registro
-                    user_data = db.get_user_current_data(str(member.id))
-                    family_name = user_data[0] if user_data else None
-                    
-                    participantes.append({
+                participantes = [
+                    {
                         'user_id': str(member.id),
-                        'family_name': family_name,
+                        'family_name': family_names.get(str(member.id)),
                         'display_name': member.display_name
-                    })
+                    }
+                    for member in members_in_voice
+                ]
                 
                 # Registrar evento
-                evento_id, qtd = db.registrar_evento(
+                evento_id, qtd = await db.registrar_evento(
                     tipo=tipo,
                     nome=nome_lista,
                     canal_voz=voice_channel.name,
@@ -3426,6 +3204,7 @@ async def lista(interaction: discord.Interaction, sala: str, nome_lista: str, ti
                     participantes=participantes
                 )
                 evento_registrado = True
+                relatorio_cache.clear()
                 logger.info(f"Evento '{nome_lista}' ({tipo}) registrado com {qtd} participantes por {interaction.user.display_name}")
             except Exception as e:
                 logger.error(f"Erro ao registrar evento: {e}")
@@ -3563,8 +3342,11 @@ async def lista(interaction: discord.Interaction, sala: str, nome_lista: str, ti
             )
 
 @bot.tree.command(name="relatorio_lista", description="[ADMIN] Mostra relatório de participação em eventos do mês")
-async def relatorio_lista(interaction: discord.Interaction):
-    """Mostra relatório de participação em eventos (GvG, Treino, etc) do mês atual"""
+@app_commands.describe(
+    mes="Mês do relatório no formato MM/AAAA (padrão: mês atual)"
+)
+async def relatorio_lista(interaction: discord.Interaction, mes: str = None):
+    """Mostra relatório de participação em eventos (GvG, Treino, etc) do mês atual ou de um mês anterior"""
     if not is_admin_user(interaction.user):
         await interaction.response.send_message(
             "❌ Apenas administradores podem usar este comando!",
@@ -3572,17 +3354,29 @@ async def relatorio_lista(interaction: discord.Interaction):
         )
         return
     
+    # Converter MM/AAAA para o mês de referência do banco (AAAA-MM)
+    mes_referencia = None
+    if mes:
+        try:
+            mes_referencia = datetime.strptime(mes.strip(), "%m/%Y").strftime("%Y-%m")
+        except ValueError:
+            await interaction.response.send_message(
+                "❌ Mês inválido! Use o formato MM/AAAA (ex: 03/2025).",
+                ephemeral=True
+            )
+            return
+    
     try:
         await interaction.response.defer(ephemeral=True)
         
-        # Buscar relatório do mês atual
-        relatorio = db.get_relatorio_participacoes()
+        # Buscar relatório do mês (meses anteriores vêm do resumo mensal)
+        relatorio = await get_relatorio_participacoes_cached(mes_referencia)
         
         if relatorio['total_eventos'] == 0:
             await interaction.followup.send(
                 "📊 **Relatório de Participação**\n\n"
-                "❌ Nenhum evento registrado neste mês ainda.\n\n"
-                "💡 Use `/lista` com o parâmetro `tipo` para registrar participações.",
+                + (f"❌ Nenhum evento registrado em {mes.strip()}.\n\n" if mes else "❌ Nenhum evento registrado neste mês ainda.\n\n")
+                + "💡 Use `/lista` com o parâmetro `tipo` para registrar participações.",
                 ephemeral=True
             )
             return
@@ -3623,10 +3417,11 @@ async def relatorio_lista(interaction: discord.Interaction):
         players_participacao = []
         players_removidos_count = 0
         
-        for user_id, dados in relatorio['participacoes_por_player'].items():
+        # Linhas já vêm ordenadas por total de participações (maior primeiro)
+        for player in relatorio['players']:
             # Verificar se o membro ainda tem o cargo da guilda
             try:
-                member = interaction.guild.get_member(int(user_id))
+                member = interaction.guild.get_member(int(player.user_id))
                 if not member or not has_guild_role(member):
                     # Player não tem mais o cargo, não incluir no relatório
                     players_removidos_count += 1
@@ -3636,31 +3431,22 @@ async def relatorio_lista(interaction: discord.Interaction):
                 players_removidos_count += 1
                 continue
             
-            total = sum(v for k, v in dados.items() if k not in ['display_name', 'family_name'])
-            players_participacao.append({
-                'user_id': user_id,
-                'display_name': dados.get('display_name', user_id),
-                'family_name': dados.get('family_name'),
-                'total': total,
-                'detalhes': dados
-            })
-        
-        # Ordenar por total de participações
-        players_participacao.sort(key=lambda x: x['total'], reverse=True)
+            players_participacao.append(player)
         
         # Top 20 participantes
         top_players_texto = ""
         for i, player in enumerate(players_participacao[:20], 1):
-            nome = player['family_name'] or player['display_name']
+            nome = player.family_name or player.display_name
             
-            # Montar detalhes por tipo
-            detalhes = []
-            for tipo in TIPOS_EVENTO:
-                if tipo in player['detalhes']:
-                    detalhes.append(f"{tipo}: {player['detalhes'][tipo]}")
+            # Montar detalhes por tipo (colunas na ordem de relatorio['tipos'])
+            detalhes = [
+                f"{tipo}: {quantidade}"
+                for tipo, quantidade in zip(relatorio['tipos'], player.por_tipo)
+                if quantidade
+            ]
             
             detalhes_str = " | ".join(detalhes) if detalhes else ""
-            top_players_texto += f"**{i}.** {nome} - **{player['total']}** ({detalhes_str})\n"
+            top_players_texto += f"**{i}.** {nome} - **{player.total}** ({detalhes_str}) - {player.taxa:.0%} de presença\n"
         
         if top_players_texto:
             # Dividir se muito grande
@@ -3674,15 +3460,17 @@ async def relatorio_lista(interaction: discord.Interaction):
         
         # Estatísticas
         if players_participacao:
-            media = sum(p['total'] for p in players_participacao) / len(players_participacao)
+            media = sum(p.total for p in players_participacao) / len(players_participacao)
+            media_taxa = sum(p.taxa for p in players_participacao) / len(players_participacao)
             embed.add_field(
                 name="📈 Estatísticas",
                 value=f"👥 **Total de players:** {len(players_participacao)}\n"
-                      f"📊 **Média de participações:** {media:.1f}",
+                      f"📊 **Média de participações:** {media:.1f}\n"
+                      f"✅ **Presença média:** {media_taxa:.0%}",
                 inline=False
             )
         
-        embed.set_footer(text=f"Relatório gerado por {interaction.user.display_name} | Reset no dia 1 de cada mês | Apenas membros com cargo da guilda")
+        embed.set_footer(text=f"Relatório gerado por {interaction.user.display_name} | Meses anteriores: /relatorio_lista mes:MM/AAAA | Apenas membros com cargo da guilda")
         
         await interaction.followup.send(embed=embed, ephemeral=True)
         
@@ -3764,21 +3552,16 @@ async def mover_sala(interaction: discord.Interaction, sala_origem: str, sala_de
             )
             return
         
-        # Mover membros
-        moved_count = 0
-        failed_members = []
-        
-        for member in members_to_move:
-            try:
-                await member.move_to(destination_channel, reason=f"Movido por {interaction.user.display_name}")
-                moved_count += 1
-            except discord.Forbidden:
-                failed_members.append((member, "Sem permissão para mover"))
-            except discord.HTTPException as e:
-                failed_members.append((member, str(e)))
-            except Exception as e:
-                failed_members.append((member, str(e)))
-                logger.warning(f"Erro ao mover {member.display_name} (ID: {member.id}): {str(e)}")
+        # Mover membros (em paralelo, com concorrência limitada e novas tentativas)
+        move_result = await move_members(
+            members_to_move,
+            destination_channel,
+            reason=f"Movido por {interaction.user.display_name}",
+            concurrency=VOICE_MOVE_CONCURRENCY
+        )
+        moved_count = len(move_result.moved)
+        failed_members = move_result.failed
+        logger.info(f"/mover_sala: {moved_count}/{move_result.total} movidos de {origin_channel.name} para {destination_channel.name} em {move_result.elapsed:.2f}s")
         
         # Criar embed com resultado
         embed = discord.Embed(
@@ -3802,7 +3585,7 @@ async def mover_sala(interaction: discord.Interaction, sala_origem: str, sala_de
         
         embed.add_field(
             name="✅ Movidos com Sucesso",
-            value=f"**{moved_count}** membro(s)",
+            value=f"**{moved_count}** membro(s) em {move_result.elapsed:.1f}s",
             inline=True
         )
         
@@ -3835,7 +3618,8 @@ async def mover_sala(interaction: discord.Interaction, sala_origem: str, sala_de
         # Enviar log de movimentação para o canal de logs
         await send_move_log_to_channel(
             bot, interaction, origin_channel, destination_channel,
-            moved_count, len(failed_members), failed_members
+            moved_count, len(failed_members), failed_members,
+            move_result=move_result
         )
         
     except ValueError:
@@ -3970,32 +3754,34 @@ async def dm_cargo(interaction: discord.Interaction, cargos: str, mensagem: str,
         # Footer nas DMs sempre mostra "Staff Mouz"
         embed.set_footer(text="Staff Mouz")
         
-        sent = 0
-        failed = 0
-        blocked_members = []  # Lista de quem não recebeu
-        success_members = []  # Lista de quem recebeu com sucesso
+        def build_message(member):
+            # Enviar com imagem se houver (nova instância do arquivo para cada envio)
+            if image_bytes:
+                image_file = discord.File(
+                    io.BytesIO(image_bytes),
+                    filename=image_filename
+                )
+                return {'embed': embed, 'file': image_file}
+            return {'embed': embed}
         
-        for member in members_with_roles:
-            try:
-                # Enviar com imagem se houver
-                if image_bytes:
-                    # Criar nova instância do arquivo para cada envio
-                    image_file = discord.File(
-                        io.BytesIO(image_bytes),
-                        filename=image_filename
-                    )
-                    await member.send(embed=embed, file=image_file)
-                else:
-                    await member.send(embed=embed)
-                sent += 1
-                success_members.append(member)
-            except discord.Forbidden:
-                failed += 1
-                blocked_members.append(member)
-            except Exception as e:
-                failed += 1
-                blocked_members.append(member)
-                logger.warning(f"Erro ao enviar DM para {member.display_name} (ID: {member.id}): {str(e)}")
+        status_message = await interaction.followup.send(
+            f"📤 Enviando DMs para **{len(members_with_roles)}** membro(s)...",
+            ephemeral=True,
+            wait=True
+        )
+        
+        result = await dispatch_dms(
+            members_with_roles,
+            build_message,
+            concurrency=DM_DISPATCH_CONCURRENCY,
+            progress_callback=make_dm_progress_callback(status_message, "📤 **Enviando DMs...**")
+        )
+        logger.info(f"/dm_cargo por {interaction.user.display_name}: {len(result.sent)} enviadas, {len(result.blocked)} bloqueadas, {len(result.failed)} falhas em {result.elapsed:.1f}s")
+        
+        success_members = result.sent  # Lista de quem recebeu com sucesso
+        blocked_members = result.not_delivered  # Lista de quem não recebeu
+        sent = len(success_members)
+        failed = len(blocked_members)
         
         # Criar relatório detalhado
         role_mentions = ', '.join([role.mention for role in roles])
@@ -4014,7 +3800,15 @@ async def dm_cargo(interaction: discord.Interaction, cargos: str, mensagem: str,
         
         report_embed.add_field(
             name="❌ Não Receberam",
-            value=f"**{failed}** membro(s) não receberam (DMs desabilitadas ou bot bloqueado)",
+            value=f"**{failed}** membro(s) não receberam\n"
+                  f"🚫 DMs desabilitadas/bot bloqueado: **{len(result.blocked)}**\n"
+                  f"⚠️ Outros erros: **{len(result.failed)}**",
+            inline=True
+        )
+        
+        report_embed.add_field(
+            name="⏱️ Duração",
+            value=f"**{result.elapsed:.1f}s**",
             inline=True
         )
         
@@ -4071,7 +3865,8 @@ async def dm_cargo(interaction: discord.Interaction, cargos: str, mensagem: str,
                     name="📊 Estatísticas",
                     value=f"**Total de membros:** {len(members_with_roles)}\n"
                           f"**✅ Receberam:** {sent}\n"
-                          f"**❌ Não receberam:** {failed}",
+                          f"**🚫 Bloqueados:** {len(result.blocked)}\n"
+                          f"**❌ Falhas:** {len(result.failed)}",
                     inline=False
                 )
                 
@@ -4262,8 +4057,7 @@ async def admin_lista_classe(interaction: discord.Interaction, classe: str):
         await interaction.response.defer(ephemeral=True)
         
         # Buscar apenas membros que têm o cargo da guilda
-        valid_user_ids = await get_guild_member_ids(interaction.guild)
-        members = db.get_class_members(classe, valid_user_ids=valid_user_ids)
+        members = await db.get_class_members(classe, guild_id=await sync_guild_membership(interaction.guild))
         
         if not members:
             await interaction.followup.send(
@@ -4281,19 +4075,9 @@ async def admin_lista_classe(interaction: discord.Interaction, classe: str):
         
         # Mostrar até 25 membros (limite do Discord)
         for i, member in enumerate(members[:25], 1):
-            if isinstance(member, dict):
-                family = member.get('family_name', 'N/A')
-                ap = int(member.get('ap', 0) or 0)
-                aap = int(member.get('aap', 0) or 0)
-                dp = int(member.get('dp', 0) or 0)
-            else:
-                # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                family = member[2] if len(member) > 2 else 'N/A'
-                ap = int(member[5] or 0) if len(member) > 5 else 0
-                aap = int(member[6] or 0) if len(member) > 6 else 0
-                dp = int(member[7] or 0) if len(member) > 7 else 0
-            
-            total_gs = calculate_gs(ap, aap, dp)
+            family = member.family_name
+            ap, aap, dp = member.ap, member.aap, member.dp
+            total_gs = member.gs
             embed.add_field(
                 name=f"{i}. {family}",
                 value=f"👤 {family}\n⚔️ AP: {ap} | 🔥 AAP: {aap} | 🛡️ DP: {dp}\n📊 **Total: {total_gs}**",
@@ -4338,7 +4122,7 @@ async def admin_progresso_player(interaction: discord.Interaction, usuario: disc
         await interaction.response.defer(ephemeral=True)
         
         # Buscar classe atual do usuário
-        current_class = db.get_user_current_class(user_id)
+        current_class = await db.get_user_current_class(user_id)
         if not current_class:
             await interaction.followup.send(
                 f"❌ {usuario.mention} ainda não possui um registro!",
@@ -4348,11 +4132,11 @@ async def admin_progresso_player(interaction: discord.Interaction, usuario: disc
         
         # Buscar histórico SEM filtro para mostrar todas as classes (incluindo mudanças)
         # Isso permite ver o histórico completo mesmo quando o player mudou de classe
-        history = db.get_user_history(user_id, None)
+        history = await db.get_user_history(user_id, None)
         
         if not history:
             # Verificar se o usuário tem registro atual
-            current_gear = db.get_gearscore(user_id)
+            current_gear = await db.get_gearscore(user_id)
             if current_gear:
                 await interaction.followup.send(
                     f"❌ Nenhum histórico encontrado para {usuario.mention}.\n\n"
@@ -4371,7 +4155,7 @@ async def admin_progresso_player(interaction: discord.Interaction, usuario: disc
             return
         
         # Calcular progressão
-        progress = db.get_user_progress(user_id, current_class)
+        progress = await db.get_user_progress(user_id, current_class)
         
         embed = discord.Embed(
             title=f"📈 Histórico de Progressão - {usuario.display_name}",
@@ -4385,14 +4169,17 @@ async def admin_progresso_player(interaction: discord.Interaction, usuario: disc
                 current_gs = progress.get('current_gs', 0)
                 progress_value = progress.get('progress', 0)
                 updates = progress.get('updates', 0)
+                peak_gs = progress.get('peak_gs', current_gs)
             else:
                 first_gs = progress[0] if len(progress) > 0 else 0
                 current_gs = progress[1] if len(progress) > 1 else 0
                 progress_value = progress[2] if len(progress) > 2 else 0
                 updates = progress[3] if len(progress) > 3 else 0
+                peak_gs = progress[6] if len(progress) > 6 else current_gs
             
-            embed.add_field(name="📊 Progressão Total", value=f"**{first_gs}** → **{current_gs}** (+{progress_value})", inline=False)
+            embed.add_field(name="📊 Progressão Total", value=f"**{first_gs}** → **{current_gs}** ({progress_value:+d})", inline=False)
             embed.add_field(name="🔄 Atualizações", value=f"**{updates}** registro(s)", inline=True)
+            embed.add_field(name="🏆 Maior GS", value=f"**{peak_gs}**", inline=True)
         
         # Mostrar últimas 10 atualizações
         recent_updates = history[:10]
@@ -4459,41 +4246,9 @@ async def admin_progresso_player(interaction: discord.Interaction, usuario: disc
                     total = 0
                     date = 'N/A'
             
-            # Formatar data e horário corretamente
-            if date == 'N/A' or date is None:
-                date_str = 'N/A'
-            elif hasattr(date, 'strftime'):
-                # Objeto datetime do PostgreSQL (datetime.datetime ou datetime.date)
-                try:
-                    date_str = date.strftime("%d/%m/%Y às %H:%M")
-                except:
-                    # Se não tiver hora, só data
-                    try:
-                        date_str = date.strftime("%d/%m/%Y")
-                    except:
-                        date_str = str(date)
-            elif isinstance(date, str):
-                # Tentar parsear se for string ISO ou timestamp
-                try:
-                    from datetime import datetime
-                    # Tentar diferentes formatos
-                    if 'T' in date:
-                        # Formato ISO: 2024-11-23T22:52:00 ou 2024-11-23T22:52:00.000000
-                        date_clean = date.replace('Z', '+00:00').split('+')[0].split('.')[0]
-                        dt = datetime.fromisoformat(date_clean)
-                        date_str = dt.strftime("%d/%m/%Y às %H:%M")
-                    elif date.replace('.', '').isdigit():
-                        # Timestamp Unix (pode ter decimais)
-                        dt = datetime.fromtimestamp(float(date))
-                        date_str = dt.strftime("%d/%m/%Y às %H:%M")
-                    else:
-                        date_str = date
-                except Exception as e:
-                    # Se falhar, usar a string original
-                    date_str = date
-            else:
-                # Tentar converter para string
-                date_str = str(date)
+            # Formatar data e horário (datetime com timezone vindo do banco)
+            dt = parse_timestamp(date) if date != 'N/A' else None
+            date_str = dt.strftime("%d/%m/%Y às %H:%M") if dt else 'N/A'
             
             updates_text += f"**{update_class}**: {total} GS ({ap}/{aap}/{dp}) - {date_str}\n"
         
@@ -4522,6 +4277,104 @@ async def admin_progresso_player(interaction: discord.Interaction, usuario: disc
                 ephemeral=True
             )
 
+@bot.tree.command(name="admin_progresso_guilda", description="[ADMIN] Mostra quem está evoluindo e quem está parado na guilda")
+@app_commands.describe(
+    periodo="Janela de comparação do GS (padrão: 30 dias)"
+)
+@app_commands.choices(periodo=[
+    app_commands.Choice(name="7 dias", value=7),
+    app_commands.Choice(name="30 dias", value=30),
+    app_commands.Choice(name="90 dias", value=90)
+])
+async def admin_progresso_guilda(interaction: discord.Interaction, periodo: int = 30):
+    """Mostra a progressão de todos os membros da guilda (apenas administradores)"""
+    if not is_admin_user(interaction.user):
+        await interaction.response.send_message(
+            "❌ Apenas administradores podem usar este comando!",
+            ephemeral=True
+        )
+        return
+    
+    if not interaction.guild:
+        await interaction.response.send_message(
+            "❌ Este comando só pode ser usado em um servidor!",
+            ephemeral=True
+        )
+        return
+    
+    try:
+        await interaction.response.defer(ephemeral=True)
+        
+        progression = await get_guild_progression(interaction.guild)
+        if not progression:
+            await interaction.followup.send(
+                "❌ Nenhum membro da guilda com registro de gearscore!",
+                ephemeral=True
+            )
+            return
+        
+        delta_field = {7: 'delta_7d', 30: 'delta_30d', 90: 'delta_90d'}[periodo]
+        now = utcnow()
+        
+        deltas = [getattr(p, delta_field) for p in progression]
+        evoluiram = sorted(
+            (p for p in progression if getattr(p, delta_field) > 0),
+            key=lambda p: getattr(p, delta_field), reverse=True
+        )
+        atualizaram = sum(1 for p in progression if (p.updates_30d if periodo <= 30 else p.updates_90d) > 0)
+        estagnados = sorted(
+            (p for p in progression if p.last_change and (now - p.last_change).days >= PROGRESSION_STAGNANT_DAYS),
+            key=lambda p: p.last_change
+        )
+        
+        embed = discord.Embed(
+            title=f"📈 Progressão da Guilda - Últimos {periodo} dias",
+            color=discord.Color.green(),
+            timestamp=discord.utils.utcnow()
+        )
+        
+        resumo = (
+            f"👥 Players analisados: **{len(progression)}**\n"
+            f"📊 Variação média: **{sum(deltas) / len(deltas):+.1f} GS**\n"
+            f"🚀 Evoluíram: **{len(evoluiram)}**\n"
+        )
+        if periodo in (30, 90):
+            resumo += f"🔄 Atualizaram no período: **{atualizaram}**\n"
+        resumo += f"💤 Sem mudança de GS há {PROGRESSION_STAGNANT_DAYS}+ dias: **{len(estagnados)}**"
+        embed.add_field(name="📋 Resumo", value=resumo, inline=False)
+        
+        if evoluiram:
+            top_text = "\n".join(
+                f"**{i}.** {p.family_name} ({p.class_pvp}) - {p.gs} GS (**{getattr(p, delta_field):+d}**)"
+                for i, p in enumerate(evoluiram[:10], 1)
+            )
+            embed.add_field(name="🚀 Maiores Evoluções", value=top_text[:1024], inline=False)
+        
+        if estagnados:
+            stagnant_text = "\n".join(
+                f"• {p.family_name} ({p.class_pvp}) - {p.gs} GS, há **{(now - p.last_change).days}** dias"
+                for p in estagnados[:10]
+            )
+            if len(estagnados) > 10:
+                stagnant_text += f"\n*... e mais {len(estagnados) - 10} player(s)*"
+            embed.add_field(name="💤 Parados Há Mais Tempo", value=stagnant_text[:1024], inline=False)
+        
+        embed.set_footer(text="Dados recalculados uma vez por dia")
+        await interaction.followup.send(embed=embed, ephemeral=True)
+    
+    except Exception as e:
+        logger.error(f"Erro ao calcular progressão da guilda: {e}")
+        if interaction.response.is_done():
+            await interaction.followup.send(
+                f"❌ Erro ao calcular progressão da guilda: {str(e)}",
+                ephemeral=True
+            )
+        else:
+            await interaction.response.send_message(
+                f"❌ Erro ao calcular progressão da guilda: {str(e)}",
+                ephemeral=True
+            )
+
 @bot.tree.command(name="admin_excluir_registro", description="[ADMIN] Exclui o registro de gearscore de um membro")
 @app_commands.describe(
     usuario="Usuário do Discord para excluir o registro",
@@ -4552,12 +4405,14 @@ async def admin_excluir_registro(interaction: discord.Interaction, usuario: disc
         user_id = str(usuario.id)
         
         # Buscar dados antes de excluir (para log)
-        current_data = db.get_user_current_data(user_id)
+        current_data = await db.get_user_current_data(user_id)
         
         # Excluir registro
-        success, message = db.delete_user_gearscore(user_id)
+        success, message = await db.delete_user_gearscore(user_id)
         
         if success:
+            ranking.remove(user_id)
+            class_stats.remove(user_id)
             logger.info(f"Comando /admin_excluir_registro executado por {interaction.user.display_name} (ID: {interaction.user.id}) - Excluiu registro de {usuario.display_name} (ID: {user_id})")
             
             # Remover cargo de registrado e adicionar cargo de não registrado
@@ -4656,7 +4511,7 @@ async def admin_alterar_registro(
         user_id = str(usuario.id)
         
         # Buscar dados atuais para mostrar no log
-        current_data = db.get_user_current_data(user_id)
+        current_data = await db.get_user_current_data(user_id)
         if not current_data:
             await interaction.followup.send(
                 f"❌ {usuario.mention} não possui registro de gearscore!\n"
@@ -4668,7 +4523,7 @@ async def admin_alterar_registro(
         old_family_name, old_character_name, old_class_pvp = current_data
         
         # Atualizar registro
-        success, message = db.admin_update_gearscore(
+        success, message = await db.admin_update_gearscore(
             user_id=user_id,
             family_name=nome_familia,
             character_name=nome_personagem,
@@ -4680,6 +4535,8 @@ async def admin_alterar_registro(
         )
         
         if success:
+            await refresh_ranking_entry(user_id)
+            
             # Montar lista de campos alterados
             changed_fields = []
             if nome_familia is not None:
@@ -4766,7 +4623,7 @@ async def admin_sincronizar_nomes(interaction: discord.Interaction):
             return
         
         # Buscar todos os registros do banco de dados
-        all_registered = db.get_all_gearscores(valid_user_ids=valid_user_ids)
+        all_registered = await db.get_all_gearscores(guild_id=await sync_guild_membership(interaction.guild))
         
         if not all_registered:
             await interaction.followup.send(
@@ -4783,14 +4640,8 @@ async def admin_sincronizar_nomes(interaction: discord.Interaction):
         
         # Atualizar nickname de cada membro
         for record in all_registered:
-            # Extrair dados do registro
-            if isinstance(record, dict):
-                user_id = record.get('user_id', '')
-                family_name = record.get('family_name', '')
-            else:
-                # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                user_id = record[1] if len(record) > 1 else ''
-                family_name = record[2] if len(record) > 2 else ''
+            user_id = record.user_id
+            family_name = record.family_name
             
             if not user_id or not family_name:
                 skipped_count += 1
@@ -4954,7 +4805,7 @@ async def gs_evento(interaction: discord.Interaction, mensagem_id: str):
         unique_names = list(dict.fromkeys(all_names))
         
         # Buscar GS de cada nome
-        gs_results = db.get_gearscores_by_family_names(unique_names)
+        gs_results = await db.get_gearscores_by_family_names(unique_names)
         
         # Calcular estatísticas
         found_players = []
@@ -4964,14 +4815,11 @@ async def gs_evento(interaction: discord.Interaction, mensagem_id: str):
         for name in unique_names:
             result = gs_results.get(name.lower())
             if result:
-                # Ordem: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7)
-                ap = result[5]
-                aap = result[6]
-                dp = result[7]
-                gs = max(ap, aap) + dp
-                class_pvp = result[4]
+                ap, aap, dp = result.ap, result.aap, result.dp
+                gs = result.gs
+                class_pvp = result.class_pvp
                 found_players.append({
-                    'name': result[2],  # family_name original do banco
+                    'name': result.family_name,  # family_name original do banco
                     'gs': gs,
                     'class': class_pvp,
                     'ap': ap,
@@ -5009,12 +4857,8 @@ async def gs_evento(interaction: discord.Interaction, mensagem_id: str):
                 for name in role_names:
                     result = gs_results.get(name.lower())
                     if result:
-                        ap = result[5]
-                        aap = result[6]
-                        dp = result[7]
-                        gs = max(ap, aap) + dp
-                        class_pvp = result[4]
-                        role_text += f"• **{result[2]}** - {gs} GS ({class_pvp})\n"
+                        gs = result.gs
+                        role_text += f"• **{result.family_name}** - {gs} GS ({result.class_pvp})\n"
                         role_gs_total += gs
                         role_count += 1
                     else:
@@ -5096,7 +4940,7 @@ class GSListaModal(discord.ui.Modal, title="📋 Buscar GS por Lista de Nomes"):
             return
         
         # Buscar GS de cada nome
-        gs_results = db.get_gearscores_by_family_names(names_list)
+        gs_results = await db.get_gearscores_by_family_names(names_list)
         
         # Calcular estatísticas
         found_players = []
@@ -5106,13 +4950,10 @@ class GSListaModal(discord.ui.Modal, title="📋 Buscar GS por Lista de Nomes"):
         for name in names_list:
             result = gs_results.get(name.lower())
             if result:
-                ap = result[5]
-                aap = result[6]
-                dp = result[7]
-                gs = max(ap, aap) + dp
-                class_pvp = result[4]
+                gs = result.gs
+                class_pvp = result.class_pvp
                 found_players.append({
-                    'name': result[2],
+                    'name': result.family_name,
                     'gs': gs,
                     'class': class_pvp
                 })
@@ -5207,7 +5048,7 @@ async def gs_media(interaction: discord.Interaction, nomes: str):
             return
         
         # Buscar GS de cada nome
-        gs_results = db.get_gearscores_by_family_names(names_list)
+        gs_results = await db.get_gearscores_by_family_names(names_list)
         
         # Calcular estatísticas
         found_players = []
@@ -5217,13 +5058,11 @@ async def gs_media(interaction: discord.Interaction, nomes: str):
         for name in names_list:
             result = gs_results.get(name.lower())
             if result:
-                ap = result[5]
-                aap = result[6]
-                dp = result[7]
-                gs = max(ap, aap) + dp
-                class_pvp = result[4]
+                ap, aap, dp = result.ap, result.aap, result.dp
+                gs = result.gs
+                class_pvp = result.class_pvp
                 found_players.append({
-                    'name': result[2],
+                    'name': result.family_name,
                     'gs': gs,
                     'class': class_pvp,
                     'ap': ap,
@@ -5354,83 +5193,27 @@ async def gs_abaixo_media(interaction: discord.Interaction):
             )
             return
         
-        # Buscar todos os gearscores
-        all_gearscores = db.get_all_gearscores(valid_user_ids=valid_user_ids)
+        # GS médio calculado no banco (sem trazer os registros)
+        guild_id = await sync_guild_membership(interaction.guild)
+        total_players, soma_gs = await db.get_gs_summary(guild_id=guild_id)
         
-        if not all_gearscores:
+        if not total_players:
             await interaction.followup.send(
                 "❌ Nenhum gearscore cadastrado ainda!",
                 ephemeral=True
             )
             return
         
-        # Processar dados e calcular GS médio
-        players_data = []
-        total_gs = 0
-        
-        for record in all_gearscores:
-            # Extrair dados do registro
-            if isinstance(record, dict):
-                user_id = record.get('user_id', '')
-                family_name = record.get('family_name', '')
-                class_pvp = record.get('class_pvp', '')
-                ap = record.get('ap', 0)
-                aap = record.get('aap', 0)
-                dp = record.get('dp', 0)
-            else:
-                # Ordem: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                user_id = record[1] if len(record) > 1 else ''
-                family_name = record[2] if len(record) > 2 else ''
-                class_pvp = record[4] if len(record) > 4 else ''
-                ap = record[5] if len(record) > 5 else 0
-                aap = record[6] if len(record) > 6 else 0
-                dp = record[7] if len(record) > 7 else 0
-            
-            gs = max(ap, aap) + dp
-            
-            # Buscar membro para verificar se ainda tem cargo
-            try:
-                member = interaction.guild.get_member(int(user_id))
-                if not member or not has_guild_role(member):
-                    continue  # Pular se não tem cargo
-            except (ValueError, AttributeError):
-                continue  # Pular se não conseguir verificar
-            
-            players_data.append({
-                'user_id': user_id,
-                'family_name': family_name,
-                'class_pvp': class_pvp,
-                'ap': ap,
-                'aap': aap,
-                'dp': dp,
-                'gs': gs
-            })
-            total_gs += gs
-        
-        if not players_data:
-            await interaction.followup.send(
-                "❌ Nenhum player com cargo da guilda encontrado!",
-                ephemeral=True
-            )
-            return
-        
-        # Calcular GS médio
-        avg_gs = total_gs // len(players_data)
-        
-        # Filtrar players abaixo da média
-        players_abaixo = [
-            p for p in players_data
-            if p['gs'] < avg_gs
-        ]
+        avg_gs = soma_gs // total_players
         
-        # Ordenar por GS (menor primeiro)
-        players_abaixo.sort(key=lambda x: x['gs'])
+        # Players abaixo da média, já ordenados por GS (menor primeiro) pelo índice de gs
+        players_abaixo = await db.get_gearscores_below(avg_gs, guild_id=guild_id)
         
         if not players_abaixo:
             await interaction.followup.send(
                 f"✅ **Todos os players estão acima ou na média!**\n\n"
                 f"📊 **GS Médio da Guilda:** {avg_gs}\n"
-                f"👥 **Total de players:** {len(players_data)}",
+                f"👥 **Total de players:** {total_players}",
                 ephemeral=True
             )
             return
@@ -5439,8 +5222,8 @@ async def gs_abaixo_media(interaction: discord.Interaction):
         embed = discord.Embed(
             title="📉 Players Abaixo do GS Médio",
             description=f"GS Médio da Guilda: **{avg_gs}**\n"
-                        f"Total de players: **{len(players_data)}**\n"
-                        f"Players abaixo da média: **{len(players_abaixo)}** ({len(players_abaixo)/len(players_data)*100:.1f}%)",
+                        f"Total de players: **{total_players}**\n"
+                        f"Players abaixo da média: **{len(players_abaixo)}** ({len(players_abaixo)/total_players*100:.1f}%)",
             color=discord.Color.orange(),
             timestamp=discord.utils.utcnow()
         )
@@ -5448,9 +5231,9 @@ async def gs_abaixo_media(interaction: discord.Interaction):
         # Criar lista de players
         players_text = ""
         for i, player in enumerate(players_abaixo, 1):
-            diff = avg_gs - player['gs']
-            players_text += f"**{i}.** {player['family_name']} ({player['class_pvp']})\n"
-            players_text += f"   GS: **{player['gs']}** (-{diff}) | Build: {player['ap']}/{player['aap']}/{player['dp']}\n\n"
+            diff = avg_gs - player.gs
+            players_text += f"**{i}.** {player.family_name} ({player.class_pvp})\n"
+            players_text += f"   GS: **{player.gs}** (-{diff}) | Build: {player.ap}/{player.aap}/{player.dp}\n\n"
         
         # Dividir em múltiplos campos se necessário
         if len(players_text) > 1024:
@@ -5458,9 +5241,9 @@ async def gs_abaixo_media(interaction: discord.Interaction):
             current_part = ""
             
             for i, player in enumerate(players_abaixo, 1):
-                diff = avg_gs - player['gs']
-                line = f"**{i}.** {player['family_name']} ({player['class_pvp']})\n"
-                line += f"   GS: **{player['gs']}** (-{diff}) | Build: {player['ap']}/{player['aap']}/{player['dp']}\n\n"
+                diff = avg_gs - player.gs
+                line = f"**{i}.** {player.family_name} ({player.class_pvp})\n"
+                line += f"   GS: **{player.gs}** (-{diff}) | Build: {player.ap}/{player.aap}/{player.dp}\n\n"
                 
                 if len(current_part + line) > 1024:
                     if current_part:
@@ -5534,10 +5317,10 @@ async def gs_abaixo_media(interaction: discord.Interaction):
 #         await interaction.response.defer(ephemeral=True)
 #         
 #         if tipo.value == "tudo":
-#             success, message = db.clear_all_data()
+#             success, message = await db.clear_all_data()
 #             action = "**TODOS OS DADOS** (Gearscore + Histórico)"
 #         else:
-#             success, message = db.clear_history_only()
+#             success, message = await db.clear_history_only()
 #             action = "**HISTÓRICO** (Gearscore mantido)"
 #         
 #         if success:
@@ -5593,8 +5376,7 @@ async def analise_classe(interaction: discord.Interaction, classe: str):
         await interaction.response.defer(ephemeral=True)
         
         # Buscar apenas membros que têm o cargo da guilda
-        valid_user_ids = await get_guild_member_ids(interaction.guild)
-        members = db.get_class_members(classe, valid_user_ids=valid_user_ids)
+        members = await db.get_class_members(classe, guild_id=await sync_guild_membership(interaction.guild))
         
         if not members:
             await interaction.followup.send(
@@ -5610,20 +5392,12 @@ async def analise_classe(interaction: discord.Interaction, classe: str):
         total_gs = 0
         
         for member in members:
-            if isinstance(member, dict):
-                ap = int(member.get('ap', 0) or 0)
-                aap = int(member.get('aap', 0) or 0)
-                dp = int(member.get('dp', 0) or 0)
-            else:
-                # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                ap = int(member[5] or 0) if len(member) > 5 else 0
-                aap = int(member[6] or 0) if len(member) > 6 else 0
-                dp = int(member[7] or 0) if len(member) > 7 else 0
+            ap, aap, dp = member.ap, member.aap, member.dp
             
             total_ap += ap
             total_aap += aap
             total_dp += dp
-            total_gs += calculate_gs(ap, aap, dp)  # MAX(AP, AAP) + DP
+            total_gs += member.gs  # MAX(AP, AAP) + DP
         
         count = len(members)
         avg_ap = int(total_ap / count) if count > 0 else 0
@@ -5649,19 +5423,8 @@ async def analise_classe(interaction: discord.Interaction, classe: str):
         top_5 = members[:5]
         top_text = ""
         for i, member in enumerate(top_5, 1):
-            if isinstance(member, dict):
-                family_name = member.get('family_name', 'N/A')
-                ap = int(member.get('ap', 0) or 0)
-                aap = int(member.get('aap', 0) or 0)
-                dp = int(member.get('dp', 0) or 0)
-                gs = calculate_gs(ap, aap, dp)
-            else:
-                # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                family_name = member[2] if len(member) > 2 else 'N/A'
-                ap = int(member[5] or 0) if len(member) > 5 else 0
-                aap = int(member[6] or 0) if len(member) > 6 else 0
-                dp = int(member[7] or 0) if len(member) > 7 else 0
-                gs = calculate_gs(ap, aap, dp)
+            family_name = member.family_name
+            gs = member.gs
             
             medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"#{i}"
             top_text += f"{medal} **{family_name}** - {gs} GS\n"
@@ -5673,19 +5436,7 @@ async def analise_classe(interaction: discord.Interaction, classe: str):
         
         # Criar relatório completo de todos os membros
         # Ordenar membros por GS (maior para menor)
-        def get_gs_from_member(member):
-            if isinstance(member, dict):
-                ap = int(member.get('ap', 0) or 0)
-                aap = int(member.get('aap', 0) or 0)
-                dp = int(member.get('dp', 0) or 0)
-            else:
-                # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                ap = int(member[5] or 0) if len(member) > 5 else 0
-                aap = int(member[6] or 0) if len(member) > 6 else 0
-                dp = int(member[7] or 0) if len(member) > 7 else 0
-            return calculate_gs(ap, aap, dp)
-        
-        sorted_members = sorted(members, key=get_gs_from_member, reverse=True)
+        sorted_members = sorted(members, key=lambda member: member.gs, reverse=True)
         
         # Criar embeds com relatório completo
         # Dividir em múltiplos embeds se necessário (limite de 25 campos por embed)
@@ -5712,22 +5463,10 @@ async def analise_classe(interaction: discord.Interaction, classe: str):
             chunk_members = sorted_members[embed_idx:embed_idx + members_per_embed]
             
             for i, member in enumerate(chunk_members, 1):
-                # Formatar dados dependendo do banco
-                if isinstance(member, dict):
-                    family_name = member.get('family_name', 'N/A')
-                    ap = int(member.get('ap', 0) or 0)
-                    aap = int(member.get('aap', 0) or 0)
-                    dp = int(member.get('dp', 0) or 0)
-                    linkgear = member.get('linkgear', 'N/A')
-                else:
-                    # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                    family_name = member[2] if len(member) > 2 else 'N/A'
-                    ap = int(member[5] or 0) if len(member) > 5 else 0
-                    aap = int(member[6] or 0) if len(member) > 6 else 0
-                    dp = int(member[7] or 0) if len(member) > 7 else 0
-                    linkgear = member[8] if len(member) > 8 else 'N/A'
-                
-                gs_total = calculate_gs(ap, aap, dp)
+                family_name = member.family_name
+                ap, aap, dp = member.ap, member.aap, member.dp
+                linkgear = member.linkgear
+                gs_total = member.gs
                 position = embed_idx + i
                 
                 # Criar texto do membro
@@ -5790,19 +5529,10 @@ async def admin_membros_sem_registro(interaction: discord.Interaction):
             return
         
         # Buscar todos os registros do banco de dados
-        all_registered = db.get_all_gearscores(valid_user_ids=valid_user_ids)
+        all_registered = await db.get_all_gearscores(guild_id=await sync_guild_membership(interaction.guild))
         
         # Extrair user_ids que têm registro
-        registered_user_ids = set()
-        for record in all_registered:
-            if isinstance(record, dict):
-                user_id = record.get('user_id', '')
-            else:
-                # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                user_id = record[1] if len(record) > 1 else ''
-            
-            if user_id:
-                registered_user_ids.add(str(user_id))
+        registered_user_ids = {record.user_id for record in all_registered if record.user_id}
         
         # Encontrar membros sem registro
         members_without_registry = []
@@ -5958,71 +5688,41 @@ async def admin_gs_desatualizados(interaction: discord.Interaction, dias: int =
             return
         
         # Buscar todos os registros do banco
-        all_registered = db.get_all_gearscores(valid_user_ids=guild_member_ids)
+        all_registered = await db.get_all_gearscores(guild_id=await sync_guild_membership(interaction.guild))
         
-        # Data limite para considerar desatualizado
-        now = datetime.now()
+        # Data limite para considerar desatualizado (updated_at vem do banco em UTC com timezone)
+        now = utcnow()
         limit_date = now - timedelta(days=dias)
         
         outdated_members = []
         
         for record in all_registered:
             try:
-                # Extrair dados do registro
-                if isinstance(record, dict):
-                    user_id = record.get('user_id', '')
-                    family_name = record.get('family_name', 'N/A')
-                    class_pvp = record.get('class_pvp', 'N/A')
-                    ap = record.get('ap', 0)
-                    aap = record.get('aap', 0)
-                    dp = record.get('dp', 0)
-                    updated_at = record.get('updated_at')
-                else:
-                    # Ordem das colunas: id(0), user_id(1), family_name(2), character_name(3), class_pvp(4), ap(5), aap(6), dp(7), linkgear(8), updated_at(9)
-                    user_id = str(record[1]) if len(record) > 1 else ''
-                    family_name = record[2] if len(record) > 2 else 'N/A'
-                    class_pvp = record[4] if len(record) > 4 else 'N/A'
-                    ap = record[5] if len(record) > 5 else 0
-                    aap = record[6] if len(record) > 6 else 0
-                    dp = record[7] if len(record) > 7 else 0
-                    updated_at = record[9] if len(record) > 9 else None
+                user_id = record.user_id
+                family_name = record.family_name
+                class_pvp = record.class_pvp
                 
-                if not user_id or not updated_at:
-                    continue
-                
-                # Converter updated_at para datetime
-                if isinstance(updated_at, str):
-                    for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f']:
-                        try:
-                            updated_datetime = datetime.strptime(updated_at.split('+')[0].split('Z')[0], fmt)
-                            break
-                        except:
-                            continue
-                    else:
-                        continue
-                elif hasattr(updated_at, 'replace'):
-                    updated_datetime = updated_at.replace(tzinfo=None) if updated_at.tzinfo else updated_at
-                else:
+                if not user_id or not record.updated_at:
                     continue
                 
                 # Verificar se está desatualizado
-                if updated_datetime >= limit_date:
+                if record.updated_at >= limit_date:
                     continue
                 
-                days_since_update = (now - updated_datetime).days
+                days_since_update = (now - record.updated_at).days
                 
                 member = interaction.guild.get_member(int(user_id))
                 if not member or not has_guild_role(member):
                     continue
                 
-                gs_total = calculate_gs(ap, aap, dp)
+                gs_total = record.gs
                 outdated_members.append({
                     'member': member,
                     'family_name': family_name,
                     'class_pvp': class_pvp,
                     'gs': gs_total,
                     'days': days_since_update,
-                    'last_update': updated_datetime
+                    'last_update': record.updated_at
                 })
                 
             except Exception as e:
@@ -6152,7 +5852,7 @@ class CriarCensoModal(discord.ui.Modal, title="📋 Criar Censo"):
                     campos_list = None
             
             # Criar censo com campos e exemplos de imagens
-            censo_id = db.criar_censo(
+            censo_id = await db.criar_censo(
                 self.nome.value,
                 data_limite_dt,
                 str(interaction.user.id),
@@ -6166,14 +5866,8 @@ class CriarCensoModal(discord.ui.Modal, title="📋 Criar Censo"):
             members_with_registry = set()
             
             if valid_user_ids:
-                all_registered = db.get_all_gearscores(valid_user_ids=valid_user_ids)
-                for record in all_registered:
-                    if isinstance(record, dict):
-                        user_id = record.get('user_id', '')
-                    else:
-                        user_id = record[1] if len(record) > 1 else ''
-                    if user_id:
-                        members_with_registry.add(str(user_id))
+                all_registered = await db.get_all_gearscores(guild_id=await sync_guild_membership(interaction.guild))
+                members_with_registry = {record.user_id for record in all_registered if record.user_id}
             
             # Aplicar tags
             sem_censo_role = interaction.guild.get_role(SEM_CENSO_ROLE_ID) if SEM_CENSO_ROLE_ID else None
@@ -6408,14 +6102,14 @@ class CensoView(discord.ui.View):
         # Salvar dados
         try:
             # Buscar dados do usuário (nome de família do registro)
-            user_data = db.get_user_current_data(str(interaction.user.id))
+            user_data = await db.get_user_current_data(str(interaction.user.id))
             family_name = user_data[0] if user_data else interaction.user.display_name
             
             # Adicionar nome de família aos dados do censo
             self.dados['family_name'] = family_name
             
             # Salvar resposta
-            db.salvar_resposta_censo(
+            await db.salvar_resposta_censo(
                 self.censo_id,
                 str(interaction.user.id),
                 family_name,
@@ -6471,7 +6165,7 @@ class CensoView(discord.ui.View):
                 timestamp = datetime.now(sao_paulo_tz)
                 
                 try:
-                    censo = db.get_censo_ativo()
+                    censo = await db.get_censo_ativo()
                     campos_censo = censo.get('campos', []) if censo else []
                     
                     # Se não houver campos personalizados, usar estrutura fixa
@@ -6770,14 +6464,14 @@ class CensoModal(discord.ui.Modal):
                 dados_censo[campo] = campo_value.strip() if campo_value else ''
             
             # Buscar dados do usuário para family_name (nome de família do registro)
-            user_data = db.get_user_current_data(str(interaction.user.id))
+            user_data = await db.get_user_current_data(str(interaction.user.id))
             family_name = user_data[0] if user_data else interaction.user.display_name
             
             # Adicionar nome de família aos dados do censo
             dados_censo['family_name'] = family_name
             
             # Salvar resposta
-            db.salvar_resposta_censo(
+            await db.salvar_resposta_censo(
                 self.censo_id,
                 str(interaction.user.id),
                 family_name,
@@ -6825,7 +6519,7 @@ class CensoModal(discord.ui.Modal):
             logger.info(f"Censo preenchido por {interaction.user.display_name} (ID: {interaction.user.id})")
             
             # Buscar censo para obter campos
-            censo = db.get_censo_ativo()
+            censo = await db.get_censo_ativo()
             campos_censo = censo.get('campos', list(dados_censo.keys())) if censo else list(dados_censo.keys())
             
             # Enviar para Google Sheets (se configurado) - em background
@@ -6886,7 +6580,7 @@ async def preencher_censo(interaction: discord.Interaction):
     """Abre o formulário para preencher o censo"""
     try:
         # Verificar se há censo ativo
-        censo = db.get_censo_ativo()
+        censo = await db.get_censo_ativo()
         
         if not censo:
             await interaction.response.send_message(
@@ -6899,26 +6593,7 @@ async def preencher_censo(interaction: discord.Interaction):
         from datetime import datetime
         sao_paulo_tz = timezone('America/Sao_Paulo')
         agora = datetime.now(sao_paulo_tz)
-        data_limite = censo['data_limite']
-        
-        # Converter data_limite para datetime se necessário
-        if isinstance(data_limite, str):
-            try:
-                data_limite = datetime.fromisoformat(data_limite.replace('Z', '+00:00'))
-            except:
-                # Tentar parse manual se fromisoformat falhar
-                try:
-                    data_limite = datetime.strptime(data_limite, "%Y-%m-%d %H:%M:%S")
-                    data_limite = sao_paulo_tz.localize(data_limite)
-                except:
-                    pass
-        
-        # Se data_limite não tem timezone, assumir que está em UTC e converter
-        if hasattr(data_limite, 'tzinfo') and data_limite.tzinfo is None:
-            data_limite = sao_paulo_tz.localize(data_limite)
-        elif hasattr(data_limite, 'tzinfo') and data_limite.tzinfo is not None:
-            # Converter para timezone de São Paulo
-            data_limite = data_limite.astimezone(sao_paulo_tz)
+        data_limite = parse_timestamp(censo['data_limite']).astimezone(sao_paulo_tz)
         
         if agora > data_limite:
             await interaction.response.send_message(
@@ -7114,7 +6789,7 @@ async def censo_status(interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
         
         # Buscar censo ativo
-        censo = db.get_censo_ativo()
+        censo = await db.get_censo_ativo()
         
         if not censo:
             await interaction.followup.send(
@@ -7124,7 +6799,7 @@ async def censo_status(interaction: discord.Interaction):
             return
         
         # Buscar quem preencheu
-        players_com_censo = db.get_players_com_censo(censo['id'])
+        players_com_censo = await db.get_players_com_censo(censo['id'])
         user_ids_com_censo = {p['user_id'] for p in players_com_censo}
         
         # Buscar todos os membros registrados
@@ -7132,14 +6807,8 @@ async def censo_status(interaction: discord.Interaction):
         members_with_registry = set()
         
         if valid_user_ids:
-            all_registered = db.get_all_gearscores(valid_user_ids=valid_user_ids)
-            for record in all_registered:
-                if isinstance(record, dict):
-                    user_id = record.get('user_id', '')
-                else:
-                    user_id = record[1] if len(record) > 1 else ''
-                if user_id:
-                    members_with_registry.add(str(user_id))
+            all_registered = await db.get_all_gearscores(guild_id=await sync_guild_membership(interaction.guild))
+            members_with_registry = {record.user_id for record in all_registered if record.user_id}
         
         # Separar quem preencheu e quem não preencheu
         preencheram = []
@@ -7154,22 +6823,8 @@ async def censo_status(interaction: discord.Interaction):
                     nao_preencheram.append(member)
         
         # Converter data_limite para timestamp
-        data_limite_ts = censo['data_limite']
-        if isinstance(data_limite_ts, str):
-            try:
-                data_limite_ts = datetime.fromisoformat(data_limite_ts.replace('Z', '+00:00'))
-            except:
-                try:
-                    data_limite_ts = datetime.strptime(data_limite_ts, "%Y-%m-%d %H:%M:%S")
-                    sao_paulo_tz = timezone('America/Sao_Paulo')
-                    data_limite_ts = sao_paulo_tz.localize(data_limite_ts)
-                except:
-                    pass
-        
-        if hasattr(data_limite_ts, 'timestamp'):
-            timestamp = int(data_limite_ts.timestamp())
-        else:
-            timestamp = int(datetime.now().timestamp())
+        data_limite_ts = parse_timestamp(censo['data_limite'])
+        timestamp = int((data_limite_ts or utcnow()).timestamp())
         
         # Criar embed
         embed = discord.Embed(
@@ -7246,7 +6901,7 @@ async def censo_reenviar_sheets(interaction: discord.Interaction):
         )
         return
     
-    if not GOOGLE_SHEETS_ENABLED or not GOOGLE_SHEETS_AVAILABLE:
+    if not GOOGLE_SHEETS_ENABLED or not GOOGLE_SHEETS_AVAILABLE or sheets_queue is None:
         await interaction.response.send_message(
             "❌ Google Sheets não está habilitado ou não está disponível!",
             ephemeral=True
@@ -7257,7 +6912,7 @@ async def censo_reenviar_sheets(interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
         
         # Buscar censo ativo
-        censo = db.get_censo_ativo()
+        censo = await db.get_censo_ativo()
         
         if not censo:
             await interaction.followup.send(
@@ -7267,7 +6922,7 @@ async def censo_reenviar_sheets(interaction: discord.Interaction):
             return
         
         # Buscar todas as respostas do censo
-        respostas = db.get_todas_respostas_censo(censo['id'])
+        respostas = await db.get_todas_respostas_censo(censo['id'])
         
         if not respostas:
             await interaction.followup.send(
@@ -7285,62 +6940,54 @@ async def censo_reenviar_sheets(interaction: discord.Interaction):
                 'Gear Image', 'Passiva Node Image'
             ]
         
-        # Reenviar cada resposta
+        # Montar a planilha inteira em memória (cabeçalho + uma linha por resposta)
         sucessos = 0
         erros = 0
         erros_detalhes = []
+        headers = build_censo_headers(campos_censo)
+        linhas = []
         
         for resposta in respostas:
+            user_id = resposta.get('user_id')
+            user_display_name = resposta.get('family_name') or f'User {user_id}'
             try:
-                user_id = resposta['user_id']
                 dados = resposta['dados']
                 preenchido_em = resposta['preenchido_em']
                 family_name = resposta.get('family_name', '')
                 
-                # Buscar nome do usuário no Discord
-                try:
-                    member = interaction.guild.get_member(int(user_id))
-                    user_display_name = member.display_name if member else resposta.get('family_name', f'User {user_id}')
-                except:
-                    user_display_name = resposta.get('family_name', f'User {user_id}')
+                # Buscar nome do usuário no Discord (cache local, sem chamadas à API)
+                member = interaction.guild.get_member(int(user_id))
+                if member:
+                    user_display_name = member.display_name
                 
                 # Adicionar family_name aos dados se não estiver
                 dados_com_family = dados.copy()
                 if not dados_com_family.get('family_name'):
                     dados_com_family['family_name'] = family_name
                 
-                # Converter preenchido_em para datetime se necessário
-                if isinstance(preenchido_em, str):
-                    from datetime import datetime
-                    sao_paulo_tz = timezone('America/Sao_Paulo')
-                    try:
-                        timestamp = datetime.fromisoformat(preenchido_em.replace('Z', '+00:00'))
-                        if timestamp.tzinfo is None:
-                            timestamp = sao_paulo_tz.localize(timestamp)
-                    except:
-                        timestamp = datetime.now(timezone('America/Sao_Paulo'))
-                else:
-                    timestamp = preenchido_em
+                timestamp = parse_timestamp(preenchido_em) or utcnow()
                 
-                # Enviar para Google Sheets
-                resultado = await enviar_para_google_sheets(
-                    dados_com_family,
-                    user_display_name,
-                    timestamp,
-                    campos_censo
-                )
-                
-                if resultado:
-                    sucessos += 1
-                    logger.info(f"Reenviado para Google Sheets: {user_display_name} (ID: {user_id})")
-                else:
-                    erros += 1
-                    erros_detalhes.append(f"{user_display_name} (ID: {user_id})")
+                linhas.append(build_censo_row(dados_com_family, user_display_name, timestamp, campos_censo))
                     
             except Exception as e:
                 erros += 1
-                erros_detalhes.append(f"{user_display_name if 'user_display_name' in locals() else 'Desconhecido'}: {str(e)}")
-                logger.error(f"Erro ao reenviar resposta de {user_id}: {e}")
+                erros_detalhes.append(f"{user_display_name}: {str(e)}")
+                logger.error(f"Erro ao montar linha da resposta de {user_id}: {e}")
+        
+        # Substituir todo o conteúdo da worksheet em uma única escrita
+        # (linhas ainda na fila de escrita são gravadas antes pela própria fila)
+        inicio = time.monotonic()
+        try:
+            sucessos = await sheets_queue.replace_all(headers, linhas)
+        except Exception as e:
+            logger.error(f"Erro ao gravar exportação completa no Google Sheets: {e}")
+            await interaction.followup.send(
+                f"❌ Erro ao gravar no Google Sheets: {str(e)}",
+                ephemeral=True
+            )
+            return
+        duracao = time.monotonic() - inicio
+        logger.info(f"✅ Exportação completa do censo '{censo['nome']}': {sucessos} linha(s) gravada(s) em {duracao:.2f}s")
         
         # Criar embed de resultado
         embed = discord.Embed(
@@ -7348,7 +6995,8 @@ async def censo_reenviar_sheets(interaction: discord.Interaction):
             description=f"**Censo:** {censo['nome']}\n\n"
                        f"✅ **Sucessos:** {sucessos}\n"
                        f"❌ **Erros:** {erros}\n"
-                       f"📝 **Total:** {len(respostas)}",
+                       f"📝 **Total:** {len(respostas)}\n"
+                       f"⏱️ **Tempo de escrita:** {duracao:.2f}s",
             color=discord.Color.green() if erros == 0 else discord.Color.orange(),
             timestamp=discord.utils.utcnow()
         )
@@ -7392,7 +7040,7 @@ async def censo_finalizar(interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
         
         # Buscar censo ativo
-        censo = db.get_censo_ativo()
+        censo = await db.get_censo_ativo()
         
         if not censo:
             await interaction.followup.send(
@@ -7402,7 +7050,7 @@ async def censo_finalizar(interaction: discord.Interaction):
             return
         
         # Buscar quem preencheu
-        players_com_censo = db.get_players_com_censo(censo['id'])
+        players_com_censo = await db.get_players_com_censo(censo['id'])
         user_ids_com_censo = {p['user_id'] for p in players_com_censo}
         
         # Buscar todos os membros registrados
@@ -7410,14 +7058,8 @@ async def censo_finalizar(interaction: discord.Interaction):
         members_with_registry = set()
         
         if valid_user_ids:
-            all_registered = db.get_all_gearscores(valid_user_ids=valid_user_ids)
-            for record in all_registered:
-                if isinstance(record, dict):
-                    user_id = record.get('user_id', '')
-                else:
-                    user_id = record[1] if len(record) > 1 else ''
-                if user_id:
-                    members_with_registry.add(str(user_id))
+            all_registered = await db.get_all_gearscores(guild_id=await sync_guild_membership(interaction.guild))
+            members_with_registry = {record.user_id for record in all_registered if record.user_id}
         
         # Aplicar tags
         censo_completo_role = interaction.guild.get_role(CENSO_COMPLETO_ROLE_ID) if CENSO_COMPLETO_ROLE_ID else None
@@ -7452,7 +7094,7 @@ async def censo_finalizar(interaction: discord.Interaction):
                 erros += 1
         
         # Finalizar censo no banco
-        db.finalizar_censo(censo['id'])
+        await db.finalizar_censo(censo['id'])
         
         embed = discord.Embed(
             title="✅ Censo Finalizado!",
@@ -0,0 +1,101 @@
+"""
+Migrações de schema versionadas.
+Cada backend define sua lista ordenada MIGRATIONS = [(versão, descrição, passos)] e
+chama o executor correspondente no init_database. A versão aplicada fica registrada
+(tabela/coleção schema_version), então um boot com o schema em dia faz só uma consulta.
+
+Passos SQL podem ser strings (executadas como estão) ou funções recebendo o cursor,
+para os casos que o dialeto não expressa em SQL idempotente (ex: ADD COLUMN no SQLite).
+Os passos devem ser idempotentes: a migração 1 é aplicada também em bancos que já
+tinham as tabelas antes do versionamento existir.
+"""
+from timestamps import utcnow
+
+
+def _get_sql_version(conn, cursor) -> int:
+    """Versão atual do schema (cria a tabela schema_version se ainda não existir)"""
+    try:
+        cursor.execute('SELECT MAX(version) FROM schema_version')
+        row = cursor.fetchone()
+        return (row[0] if row else None) or 0
+    except Exception:
+        conn.rollback()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                descricao TEXT,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+        return 0
+
+
+def run_sql_migrations(conn, migrations, placeholder: str = '?', lock_sql: str = None) -> int:
+    """
+    Aplica, em ordem e cada uma em sua transação, as migrações com versão maior que a registrada.
+    lock_sql: comando executado no início de cada migração para serializar instâncias
+        iniciando ao mesmo tempo (ex: pg_advisory_xact_lock no PostgreSQL); a versão
+        é relida depois do lock.
+    Retorna a versão final do schema.
+    """
+    cursor = conn.cursor()
+    try:
+        current = _get_sql_version(conn, cursor)
+        for version, descricao, steps in migrations:
+            if version <= current:
+                continue
+
+            if lock_sql:
+                cursor.execute(lock_sql)
+                cursor.execute('SELECT MAX(version) FROM schema_version')
+                row = cursor.fetchone()
+                if ((row[0] if row else None) or 0) >= version:
+                    conn.commit()
+                    current = version
+                    continue
+
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+
+            cursor.execute(
+                f'INSERT INTO schema_version (version, descricao) VALUES ({placeholder}, {placeholder})',
+                (version, descricao)
+            )
+            conn.commit()
+            current = version
+            print(f"✅ Migração de schema {version} aplicada: {descricao}")
+        return current
+    except Exception as e:
+        print(f"❌ Erro ao aplicar migração de schema: {e}")
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def run_mongo_migrations(database, migrations) -> int:
+    """
+    Versão para MongoDB: a versão fica no documento {_id: 'schema'} da coleção schema_version
+    e cada passo é uma função recebendo a instância do Database.
+    """
+    schema_version = database.db['schema_version']
+    doc = schema_version.find_one({'_id': 'schema'})
+    current = doc.get('version', 0) if doc else 0
+
+    for version, descricao, steps in migrations:
+        if version <= current:
+            continue
+        for step in steps:
+            step(database)
+        schema_version.update_one(
+            {'_id': 'schema'},
+            {'$set': {'version': version, 'descricao': descricao, 'applied_at': utcnow()}},
+            upsert=True
+        )
+        current = version
+        print(f"✅ Migração de schema {version} aplicada: {descricao}")
+    return current
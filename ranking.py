@@ -0,0 +1,164 @@
+"""
+Ranking de Gearscore mantido em memória.
+Carregado uma vez a partir do banco e atualizado a cada registro/atualização/exclusão,
+evitando buscar e ordenar todos os gearscores para descobrir a posição de um player.
+"""
+from bisect import bisect_left, insort
+
+
+class GearscoreRanking:
+    """
+    Mantém o GS atual de cada usuário e, por servidor, uma lista ordenada
+    (GS decrescente) apenas com os usuários que têm o cargo da guilda.
+
+    Posição = quantidade de players com GS estritamente maior + 1
+    (players empatados dividem a mesma posição).
+    """
+
+    def __init__(self):
+        self._gs = {}      # {user_id: gs} - todos os registros do banco
+        self._boards = {}  # {guild_id: {'members': set(user_id), 'keys': [(-gs, user_id)]}}
+        self.loaded = False
+
+    # ==================== CARGA ====================
+
+    def load(self, records):
+        """Carrega o GS de todos os registros (GearscoreRecord)"""
+        gs_by_user = {}
+        for record in records:
+            if not record.user_id:
+                continue
+            # Se houver mais de um registro por usuário, vale o maior GS
+            if record.gs > gs_by_user.get(record.user_id, -1):
+                gs_by_user[record.user_id] = record.gs
+
+        self._gs = gs_by_user
+        for guild_id, board in self._boards.items():
+            self._rebuild_board(board)
+        self.loaded = True
+
+    def set_members(self, guild_id, member_ids):
+        """Define os membros elegíveis de um servidor (normalmente vindos do índice de membros)"""
+        board = {'members': set(member_ids), 'keys': []}
+        self._rebuild_board(board)
+        self._boards[guild_id] = board
+
+    def _rebuild_board(self, board):
+        board['keys'] = sorted(
+            (-self._gs[user_id], user_id)
+            for user_id in board['members']
+            if user_id in self._gs
+        )
+
+    # ==================== ATUALIZAÇÕES ====================
+
+    def upsert(self, user_id, gs):
+        """Registra ou atualiza o GS de um usuário"""
+        user_id = str(user_id)
+        old_gs = self._gs.get(user_id)
+        if old_gs == gs:
+            return
+        self._gs[user_id] = gs
+        for board in self._boards.values():
+            if user_id not in board['members']:
+                continue
+            if old_gs is not None:
+                self._remove_key(board['keys'], (-old_gs, user_id))
+            insort(board['keys'], (-gs, user_id))
+
+    def remove(self, user_id):
+        """Remove o usuário do ranking (registro excluído)"""
+        user_id = str(user_id)
+        old_gs = self._gs.pop(user_id, None)
+        if old_gs is None:
+            return
+        for board in self._boards.values():
+            if user_id in board['members']:
+                self._remove_key(board['keys'], (-old_gs, user_id))
+
+    def set_member(self, guild_id, user_id, is_member):
+        """Inclui/exclui um usuário do ranking do servidor (ganhou/perdeu o cargo da guilda)"""
+        board = self._boards.get(guild_id)
+        if board is None:
+            return
+        user_id = str(user_id)
+        gs = self._gs.get(user_id)
+        if is_member and user_id not in board['members']:
+            board['members'].add(user_id)
+            if gs is not None:
+                insort(board['keys'], (-gs, user_id))
+        elif not is_member and user_id in board['members']:
+            board['members'].discard(user_id)
+            if gs is not None:
+                self._remove_key(board['keys'], (-gs, user_id))
+
+    def forget_guild(self, guild_id):
+        self._boards.pop(guild_id, None)
+
+    @staticmethod
+    def _remove_key(keys, key):
+        idx = bisect_left(keys, key)
+        if idx < len(keys) and keys[idx] == key:
+            del keys[idx]
+
+    # ==================== CONSULTAS ====================
+
+    def has_guild(self, guild_id):
+        return guild_id in self._boards
+
+    def get_gs(self, user_id):
+        return self._gs.get(str(user_id))
+
+    def total_players(self, guild_id):
+        board = self._boards.get(guild_id)
+        return len(board['keys']) if board else 0
+
+    def count_above(self, guild_id, gs, exclude_user_id=None):
+        """Quantidade de players do servidor com GS estritamente maior que gs"""
+        board = self._boards.get(guild_id)
+        if not board:
+            return 0
+        count = bisect_left(board['keys'], (-gs, ''))
+        if exclude_user_id is not None:
+            own_gs = self._gs.get(str(exclude_user_id))
+            if own_gs is not None and own_gs > gs and str(exclude_user_id) in board['members']:
+                count -= 1
+        return count
+
+    def position(self, guild_id, user_id, gs=None):
+        """
+        Retorna posição, total, players acima/abaixo e percentil do usuário.
+        Se gs for informado e diferente do GS atual, calcula a posição que o
+        usuário teria com esse GS (usado para comparar com o GS anterior).
+        Retorna None se o usuário não está no ranking do servidor.
+        """
+        board = self._boards.get(guild_id)
+        user_id = str(user_id)
+        if not board or user_id not in board['members'] or user_id not in self._gs:
+            return None
+
+        total_players = len(board['keys'])
+        if gs is None:
+            gs = self._gs[user_id]
+
+        players_acima = self.count_above(guild_id, gs, exclude_user_id=user_id)
+        posicao = players_acima + 1
+        players_abaixo = total_players - posicao
+
+        # Percentil (0-100, onde 100 é o melhor)
+        percentil = int(round((total_players - posicao + 1) / total_players * 100))
+
+        return {
+            'posicao': posicao,
+            'total_players': total_players,
+            'players_acima': players_acima,
+            'players_abaixo': players_abaixo,
+            'percentil': percentil
+        }
+
+    def top(self, guild_id, limit=10):
+        """Retorna [(user_id, gs)] dos melhores players do servidor"""
+        board = self._boards.get(guild_id)
+        if not board:
+            return []
+        return [(user_id, -neg_gs) for neg_gs, user_id in board['keys'][:limit]]
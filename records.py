@@ -0,0 +1,146 @@
+"""
+Registros tipados retornados pela camada de banco de dados.
+Os três backends (SQLite, PostgreSQL e MongoDB) convertem suas linhas/documentos para
+GearscoreRecord, então o bot acessa sempre os mesmos atributos (record.gs, record.updated_at...)
+sem precisar diferenciar dict de tupla nem recalcular o GS.
+"""
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from timestamps import parse_timestamp
+
+
+class GearscoreRecord(NamedTuple):
+    """
+    Registro de gearscore de um personagem.
+    Mantém a ordem das colunas da tabela (id, user_id, ..., updated_at) para continuar
+    compatível com desempacotamento por posição, com o GS já calculado no final.
+    """
+    id: object
+    user_id: str
+    family_name: str
+    character_name: Optional[str]
+    class_pvp: str
+    ap: int
+    aap: int
+    dp: int
+    linkgear: str
+    updated_at: Optional[datetime]  # Sempre com timezone (UTC)
+    gs: int
+
+    @classmethod
+    def from_row(cls, row):
+        """Cria a partir de uma linha SQL: id, user_id, family_name, character_name, class_pvp, ap, aap, dp, linkgear, updated_at"""
+        ap = row[5] or 0
+        aap = row[6] or 0
+        dp = row[7] or 0
+        return cls(
+            row[0], str(row[1]), row[2], row[3], row[4],
+            ap, aap, dp, row[8],
+            parse_timestamp(row[9]),
+            max(ap, aap) + dp
+        )
+
+    @classmethod
+    def from_document(cls, doc):
+        """Cria a partir de um documento do MongoDB"""
+        ap = doc.get('ap', 0) or 0
+        aap = doc.get('aap', 0) or 0
+        dp = doc.get('dp', 0) or 0
+        return cls(
+            doc.get('_id'), str(doc.get('user_id', '')), doc.get('family_name', ''),
+            doc.get('character_name'), doc.get('class_pvp', ''),
+            ap, aap, dp, doc.get('linkgear', ''),
+            parse_timestamp(doc.get('updated_at')),
+            max(ap, aap) + dp
+        )
+
+
+class ClassStatistics(NamedTuple):
+    """
+    Estatísticas agregadas de uma classe (médias já convertidas para float).
+    min_gs/max_gs só são preenchidos pelos agregados em memória (class_stats.py).
+    """
+    class_pvp: str
+    total: int
+    avg_gs: float
+    avg_ap: float
+    avg_aap: float
+    avg_dp: float
+    min_gs: int = 0
+    max_gs: int = 0
+
+    @classmethod
+    def from_row(cls, row):
+        """Cria a partir de uma linha SQL: class_pvp, total, avg_gs, avg_ap, avg_aap, avg_dp"""
+        return cls(row[0], int(row[1] or 0), *(float(value or 0) for value in row[2:6]))
+
+    @classmethod
+    def from_document(cls, doc):
+        """Cria a partir do resultado da agregação do MongoDB"""
+        return cls(
+            doc.get('class_pvp', 'Desconhecida'), int(doc.get('total', 0) or 0),
+            float(doc.get('avg_gs', 0) or 0), float(doc.get('avg_ap', 0) or 0),
+            float(doc.get('avg_aap', 0) or 0), float(doc.get('avg_dp', 0) or 0)
+        )
+
+
+class ProgressionStats(NamedTuple):
+    """
+    Progressão de um personagem na classe atual (get_progression_analytics).
+    As variações comparam o GS atual com o GS em vigor N dias atrás
+    (ou com o primeiro GS registrado, se o personagem é mais recente que isso).
+    """
+    user_id: str
+    family_name: str
+    class_pvp: str
+    gs: int
+    delta_7d: int
+    delta_30d: int
+    delta_90d: int
+    updates_30d: int
+    updates_90d: int
+    last_change: Optional[datetime]  # Última vez que o GS mudou (UTC)
+    updated_at: Optional[datetime]   # Último /registro ou /atualizar (UTC)
+
+    @classmethod
+    def from_row(cls, row):
+        """Cria a partir de uma linha SQL na ordem dos campos"""
+        return cls(
+            str(row[0]), row[1], row[2],
+            *(int(value or 0) for value in row[3:9]),
+            parse_timestamp(row[9]), parse_timestamp(row[10])
+        )
+
+    @classmethod
+    def from_document(cls, doc):
+        """Cria a partir do resultado da agregação do MongoDB"""
+        return cls(
+            str(doc.get('user_id', '')), doc.get('family_name', ''), doc.get('class_pvp', ''),
+            *(int(doc.get(field, 0) or 0) for field in ('gs', 'delta_7d', 'delta_30d', 'delta_90d', 'updates_30d', 'updates_90d')),
+            parse_timestamp(doc.get('last_change')), parse_timestamp(doc.get('updated_at'))
+        )
+
+
+class ParticipationRow(NamedTuple):
+    """
+    Linha do relatório de participação (get_relatorio_participacoes): um player, com as
+    participações de cada tipo de evento na ordem dos tipos pedidos.
+    """
+    user_id: str
+    display_name: str
+    family_name: Optional[str]
+    por_tipo: tuple
+    total: int
+    taxa: float  # Participações / eventos do mês (0 a 1, pode passar de 1 se entrou duas vezes no mesmo evento)
+
+    @classmethod
+    def from_row(cls, row, quantidade_tipos):
+        """Cria a partir de uma linha SQL: user_id, display_name, family_name, <um total por tipo>, total, taxa"""
+        user_id = str(row[0])
+        family_name = row[2]
+        return cls(
+            user_id, row[1] or family_name or user_id, family_name,
+            tuple(int(value or 0) for value in row[3:3 + quantidade_tipos]),
+            int(row[3 + quantidade_tipos] or 0), float(row[4 + quantidade_tipos] or 0)
+        )
@@ -0,0 +1,82 @@
+"""
+Índice em memória dos membros que têm o cargo da guilda.
+Construído uma vez por servidor (on_ready) e mantido pelos eventos
+on_member_update / on_member_join / on_member_remove, evitando percorrer
+guild.members a cada comando.
+"""
+
+
+class RosterIndex:
+    """Mantém, por servidor, o conjunto de user_ids (str) com o cargo da guilda"""
+
+    def __init__(self, role_id: int):
+        self.role_id = role_id
+        self._members = {}    # {guild_id: set(user_id)}
+        self._snapshots = {}  # {guild_id: frozenset(user_id)} - invalidado a cada alteração
+
+    def _has_role(self, member) -> bool:
+        return any(role.id == self.role_id for role in member.roles)
+
+    def is_built(self, guild) -> bool:
+        return guild is not None and guild.id in self._members
+
+    def build(self, guild) -> int:
+        """(Re)constrói o índice do servidor percorrendo os membros uma única vez"""
+        member_ids = set()
+        if guild.get_role(self.role_id):
+            for member in guild.members:
+                if self._has_role(member):
+                    member_ids.add(str(member.id))
+        self._members[guild.id] = member_ids
+        self._snapshots.pop(guild.id, None)
+        return len(member_ids)
+
+    def update_member(self, member) -> None:
+        """Adiciona ou remove o membro do índice conforme ele tenha o cargo"""
+        if not member or not member.guild or member.guild.id not in self._members:
+            return
+        member_ids = self._members[member.guild.id]
+        user_id = str(member.id)
+        if self._has_role(member):
+            if user_id not in member_ids:
+                member_ids.add(user_id)
+                self._snapshots.pop(member.guild.id, None)
+        elif user_id in member_ids:
+            member_ids.discard(user_id)
+            self._snapshots.pop(member.guild.id, None)
+
+    def remove_member(self, member) -> None:
+        """Remove o membro do índice (saiu/foi expulso do servidor)"""
+        if not member or not member.guild or member.guild.id not in self._members:
+            return
+        user_id = str(member.id)
+        if user_id in self._members[member.guild.id]:
+            self._members[member.guild.id].discard(user_id)
+            self._snapshots.pop(member.guild.id, None)
+
+    def contains(self, guild, user_id) -> bool:
+        """Verifica em O(1) se o usuário tem o cargo da guilda"""
+        if guild is None:
+            return False
+        if guild.id not in self._members:
+            self.build(guild)
+        return str(user_id) in self._members[guild.id]
+
+    def get_member_ids(self, guild) -> frozenset:
+        """Retorna os IDs com cargo da guilda (constrói o índice se ainda não existir)"""
+        if guild is None:
+            return frozenset()
+        if guild.id not in self._members:
+            self.build(guild)
+        snapshot = self._snapshots.get(guild.id)
+        if snapshot is None:
+            snapshot = frozenset(self._members[guild.id])
+            self._snapshots[guild.id] = snapshot
+        return snapshot
+
+    def forget(self, guild) -> None:
+        """Descarta o índice de um servidor (bot removido do servidor)"""
+        if guild is None:
+            return
+        self._members.pop(guild.id, None)
+        self._snapshots.pop(guild.id, None)
@@ -0,0 +1,259 @@
+"""
+Escrita no Google Sheets para o censo.
+- SheetsClient: cliente gspread autenticado uma única vez, com worksheet e cabeçalho em cache
+- SheetsWriteQueue: fila assíncrona que junta várias respostas em um único append_rows,
+  disparado por intervalo de tempo ou quando a fila atinge o tamanho do lote;
+  também faz a exportação completa (replace_all), reescrevendo a worksheet em uma única escrita
+
+As chamadas do gspread são síncronas; rodam em thread para não travar o event loop.
+"""
+import asyncio
+import logging
+import os
+
+from pytz import timezone
+
+from timestamps import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+SHEETS_SCOPES = [
+    'https://spreadsheets.google.com/feeds',
+    'https://www.googleapis.com/auth/drive'
+]
+
+# Mapeamento dos campos da estrutura fixa do censo para as chaves dos dados
+CAMPO_MAPPING = {
+    'Nome Discord': 'nome_discord',
+    'Classe': 'classe',
+    'Awk/Succ': 'awk_succ',
+    'AP MAIN': 'ap_main',
+    'AP AWK': 'ap_awk',
+    'Defesa': 'defesa',
+    'Edania': 'edania',
+    'Funções': 'funcoes',
+    'Gear Image': 'gear_image_url',
+    'Passiva Node Image': 'passiva_node_image_url'
+}
+
+
+def build_censo_headers(campos: list) -> list:
+    """Cabeçalhos: Data/Hora, Nome Discord, Nome de Família e depois os campos do censo"""
+    campos_sem_duplicado = [c for c in campos if c != 'Nome Discord']
+    return ['Data/Hora', 'Nome Discord', 'Nome de Família'] + campos_sem_duplicado
+
+
+def build_censo_row(censo_data: dict, user_display_name: str, timestamp, campos: list) -> list:
+    """Monta a linha da planilha para uma resposta do censo (mesma ordem de build_censo_headers)"""
+    # Datas do banco vêm em UTC; a planilha mostra o horário de Brasília
+    timestamp = parse_timestamp(timestamp).astimezone(timezone('America/Sao_Paulo'))
+
+    # Buscar nome de família dos dados ou do censo_data
+    family_name = censo_data.get('family_name') or censo_data.get('nome_familia') or ''
+
+    row_data = [
+        timestamp.strftime('%d/%m/%Y %H:%M:%S'),
+        user_display_name,
+        family_name
+    ]
+
+    # Adicionar valores dos campos na ordem definida
+    for campo in campos:
+        if campo in CAMPO_MAPPING:
+            chave_dados = CAMPO_MAPPING[campo]
+            valor = censo_data.get(chave_dados, '')
+
+            # Processar valores especiais
+            if chave_dados == 'funcoes' and isinstance(valor, list):
+                valor = ', '.join([f.replace("nao", "Não").title() for f in valor])
+            elif valor is None:
+                valor = ''
+
+            row_data.append(str(valor) if valor else '')
+        else:
+            # Campo personalizado (buscar direto)
+            valor = censo_data.get(campo, '')
+            row_data.append(str(valor) if valor else '')
+
+    return row_data
+
+
+class SheetsClient:
+    """Cliente gspread de longa duração (autentica e abre a planilha uma única vez)"""
+
+    def __init__(self, credentials_path: str, spreadsheet_id: str, worksheet_name: str):
+        self.credentials_path = credentials_path
+        self.spreadsheet_id = spreadsheet_id
+        self.worksheet_name = worksheet_name
+        self._worksheet = None
+        self._header = None  # Cabeçalho conhecido da primeira linha
+
+    def reset(self):
+        """Descarta cliente e cache (ex: após erro de autenticação)"""
+        self._worksheet = None
+        self._header = None
+
+    def get_worksheet(self):
+        if self._worksheet is not None:
+            return self._worksheet
+
+        import gspread
+        from google.oauth2.service_account import Credentials
+
+        if not os.path.exists(self.credentials_path):
+            raise FileNotFoundError(f"Arquivo de credenciais não encontrado: {self.credentials_path}")
+
+        creds = Credentials.from_service_account_file(self.credentials_path, scopes=SHEETS_SCOPES)
+        client = gspread.authorize(creds)
+        spreadsheet = client.open_by_key(self.spreadsheet_id)
+
+        try:
+            worksheet = spreadsheet.worksheet(self.worksheet_name)
+        except gspread.exceptions.WorksheetNotFound:
+            worksheet = spreadsheet.add_worksheet(title=self.worksheet_name, rows=1000, cols=20)
+            logger.info(f"Worksheet '{self.worksheet_name}' criada")
+
+        self._worksheet = worksheet
+        logger.info(f"Cliente do Google Sheets conectado (planilha {self.spreadsheet_id}, worksheet '{self.worksheet_name}')")
+        return worksheet
+
+    def ensure_headers(self, headers: list):
+        """Garante que a primeira linha é o cabeçalho esperado (lê a planilha apenas se o cache não bater)"""
+        if self._header == headers:
+            return
+
+        worksheet = self.get_worksheet()
+        first_row = worksheet.row_values(1)
+
+        if not first_row:
+            worksheet.insert_row(headers, 1)
+            logger.info(f"Cabeçalhos adicionados (planilha vazia): {headers}")
+        elif first_row[0] != 'Data/Hora':
+            worksheet.insert_row(headers, 1)
+            logger.info(f"Cabeçalhos adicionados: {headers}")
+        elif first_row != headers:
+            logger.info(f"Cabeçalhos diferentes detectados. Atualizando de {first_row} para {headers}")
+            worksheet.delete_rows(1)
+            worksheet.insert_row(headers, 1)
+
+        self._header = list(headers)
+
+    def append_rows(self, headers: list, rows: list):
+        """Garante o cabeçalho e adiciona todas as linhas em uma única chamada"""
+        self.ensure_headers(headers)
+        self.get_worksheet().append_rows(rows)
+
+    def replace_all(self, headers: list, rows: list) -> int:
+        """
+        Substitui todo o conteúdo da worksheet (cabeçalho + linhas) em uma única escrita.
+        Retorna a quantidade de linhas de dados escritas.
+        """
+        worksheet = self.get_worksheet()
+        matrix = [list(headers)] + [list(row) for row in rows]
+        num_cols = max(len(row) for row in matrix)
+
+        # Ajustar a grade ao tamanho exato (remove linhas/colunas antigas) e limpar
+        worksheet.resize(rows=len(matrix), cols=num_cols)
+        worksheet.clear()
+        worksheet.update(range_name='A1', values=matrix)
+
+        self._header = list(headers)
+        return len(rows)
+
+
+class SheetsWriteQueue:
+    """
+    Fila de escrita assíncrona para o Google Sheets.
+    Respostas enfileiradas são gravadas em lote (append_rows) a cada flush_interval
+    segundos ou assim que a fila atingir batch_size linhas.
+    """
+
+    def __init__(self, client: SheetsClient, flush_interval: float = 5.0, batch_size: int = 50):
+        self.client = client
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending = []  # [(headers, row, future)]
+        self._wakeup = None
+        self._flush_lock = None
+        self._task = None
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Erro no flush da fila do Google Sheets: {e}")
+
+    def enqueue(self, headers: list, row: list) -> asyncio.Future:
+        """Enfileira uma linha. O future recebe True/False quando o lote for gravado"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((list(headers), row, future))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return future
+
+    async def flush(self):
+        """Grava imediatamente tudo que está na fila"""
+        if not self._pending:
+            return
+        self._ensure_started()
+        async with self._flush_lock:
+            await self._flush_pending()
+
+    async def replace_all(self, headers: list, rows: list) -> int:
+        """
+        Reescreve a worksheet inteira (exportação completa) em uma única escrita.
+        Linhas ainda na fila são gravadas antes, para não serem perdidas nem duplicadas.
+        """
+        self._ensure_started()
+        async with self._flush_lock:
+            await self._flush_pending()
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(None, self.client.replace_all, headers, rows)
+            except Exception:
+                self.client.reset()
+                raise
+
+    async def _flush_pending(self):
+        """Grava as linhas pendentes (chamado com o _flush_lock adquirido)"""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        # Agrupar linhas consecutivas com o mesmo cabeçalho (normalmente um único grupo)
+        groups = []
+        for headers, row, future in pending:
+            if groups and groups[-1][0] == headers:
+                groups[-1][1].append(row)
+                groups[-1][2].append(future)
+            else:
+                groups.append((headers, [row], [future]))
+
+        loop = asyncio.get_running_loop()
+        for headers, rows, futures in groups:
+            ok = False
+            for attempt in range(2):
+                try:
+                    await loop.run_in_executor(None, self.client.append_rows, headers, rows)
+                    ok = True
+                    logger.info(f"✅ {len(rows)} linha(s) adicionada(s) no Google Sheets em lote")
+                    break
+                except Exception as e:
+                    logger.error(f"❌ Erro ao gravar lote de {len(rows)} linha(s) no Google Sheets (tentativa {attempt + 1}): {e}")
+                    # Reautenticar na próxima tentativa (token expirado, worksheet removida, etc)
+                    self.client.reset()
+            for future in futures:
+                if not future.done():
+                    future.set_result(ok)
@@ -0,0 +1,61 @@
+"""
+Normalização de datas na fronteira com o banco de dados.
+Todos os backends devolvem datetime com timezone (UTC):
+- SQLite: conversor registrado para colunas TIMESTAMP (texto ISO -> parse_timestamp)
+- PostgreSQL: colunas TIMESTAMPTZ (o psycopg2 já devolve com timezone)
+- MongoDB: cliente com tz_aware=True
+
+Datas sem timezone vindas do banco são consideradas UTC (CURRENT_TIMESTAMP / utcnow).
+"""
+import re
+from datetime import datetime, timezone
+
+UTC = timezone.utc
+
+# Fração de segundos com quantidade de dígitos diferente de 3 ou 6 (ex: "12:00:00.12345")
+_FRACTION_RE = re.compile(r'\.(\d+)')
+
+
+def utcnow() -> datetime:
+    """Agora, em UTC e com timezone"""
+    return datetime.now(UTC)
+
+
+def parse_timestamp(value):
+    """
+    Converte qualquer valor de data vindo do banco para datetime com timezone.
+    Aceita datetime (com ou sem timezone), texto ISO 8601 (com 'T' ou espaço, 'Z' ou offset)
+    e bytes (conversores do SQLite). Retorna None para valores vazios ou inválidos.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo is not None else value.replace(tzinfo=UTC)
+    if isinstance(value, bytes):
+        value = value.decode()
+
+    text = str(value).strip()
+    if not text:
+        return None
+    if text.endswith('Z'):
+        text = text[:-1] + '+00:00'
+
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        # Normalizar a fração de segundos para 6 dígitos e tentar de novo
+        try:
+            parsed = datetime.fromisoformat(
+                _FRACTION_RE.sub(lambda m: '.' + m.group(1)[:6].ljust(6, '0'), text, count=1)
+            )
+        except ValueError:
+            return None
+
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=UTC)
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Converte para UTC sem timezone (formato gravado nas colunas TIMESTAMP)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(UTC).replace(tzinfo=None)
+    return value
@@ -0,0 +1,82 @@
+"""
+Movimentação de membros entre salas de voz em paralelo.
+Usado por /mover_sala: as movimentações são disparadas com concorrência limitada
+(o discord.py respeita os buckets de rate limit da rota de edição de membro) e
+falhas transitórias (429/5xx) são tentadas novamente.
+"""
+import asyncio
+import logging
+import time
+
+import discord
+
+from dm_dispatcher import retry_after
+
+logger = logging.getLogger(__name__)
+
+# Código de erro do Discord: "Target user is not connected to voice"
+USER_NOT_IN_VOICE = 40032
+
+
+class VoiceMoveResult:
+    """Resultado de uma movimentação em massa"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.moved = []   # [(member, latência em segundos)]
+        self.failed = []  # [(member, motivo)]
+        self.elapsed = 0.0
+
+    @property
+    def latencies(self) -> list:
+        return [latency for _, latency in self.moved]
+
+    @property
+    def avg_latency(self) -> float:
+        return sum(self.latencies) / len(self.moved) if self.moved else 0.0
+
+    @property
+    def max_latency(self) -> float:
+        return max(self.latencies) if self.moved else 0.0
+
+
+async def move_members(members, destination_channel, reason: str = None,
+                       concurrency: int = 10, max_retries: int = 2) -> VoiceMoveResult:
+    """Move todos os membros para destination_channel com no máximo `concurrency` movimentações simultâneas"""
+    members = list(members)
+    result = VoiceMoveResult(len(members))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    started = time.monotonic()
+
+    async def move_one(member):
+        async with semaphore:
+            member_started = time.monotonic()
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    await member.move_to(destination_channel, reason=reason)
+                    result.moved.append((member, time.monotonic() - member_started))
+                    return
+                except discord.Forbidden:
+                    result.failed.append((member, "Sem permissão para mover"))
+                    return
+                except discord.HTTPException as e:
+                    if e.code == USER_NOT_IN_VOICE:
+                        result.failed.append((member, "Saiu da sala de voz"))
+                        return
+                    if attempt <= max_retries and (e.status == 429 or e.status >= 500):
+                        wait = retry_after(e, 1.0) if e.status == 429 else 0.5 * attempt
+                        logger.warning(f"Movimentação de {member.display_name} (ID: {member.id}) recebeu HTTP {e.status}, tentando novamente em {wait:.1f}s")
+                        await asyncio.sleep(wait)
+                        continue
+                    result.failed.append((member, str(e)))
+                    return
+                except Exception as e:
+                    result.failed.append((member, str(e)))
+                    logger.warning(f"Erro ao mover {member.display_name} (ID: {member.id}): {str(e)}")
+                    return
+
+    await asyncio.gather(*(move_one(member) for member in members))
+    result.elapsed = time.monotonic() - started
+    return result